@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
+
+With DB_POOL enabled each ASGI server process opens its own connection pool on
+first use, so the pool is never shared across a fork.
 """
 
 import os
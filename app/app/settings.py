@@ -20,13 +20,26 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
+# Deployment profile, selected with the DJANGO_ENV environment variable.
+# 'development' (the default) keeps the quick-start settings below,
+# 'production' applies the performance profile at the end of this file.
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-&-dazrwnm^xi)eo%@0m_92f-gowlo*6+@ptkcmj5u4!22^_om9'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-&-dazrwnm^xi)eo%@0m_92f-gowlo*6+@ptkcmj5u4!22^_om9'
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also makes every connection record each SQL query in memory.
+DEBUG = not PRODUCTION
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',')
+    if host
+]
 
 
 # Application definition
@@ -41,6 +54,7 @@ INSTALLED_APPS = [
     'core',
     'user',
     'event',
+    'catalogue',
     'djmoney',
     'drf_spectacular', 
     'rest_framework',
@@ -49,16 +63,21 @@ INSTALLED_APPS = [
     'django_countries',
 ]
 
+# Session, CSRF, auth and message middleware are skipped for the token
+# authenticated API paths below and only run for the admin.
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.AdminSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.AdminCsrfViewMiddleware',
+    'core.middleware.AdminAuthenticationMiddleware',
+    'core.middleware.AdminMessageMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+API_PATH_PREFIXES = ('/api/',)
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -94,6 +113,47 @@ DATABASES = {
 }
 
 
+# Read replicas, one alias per host in DB_REPLICA_HOSTS (comma separated),
+# sharing the primary's credentials. List and report API reads go to a
+# replica unless the user wrote within REPLICA_STICKY_SECONDS; the
+# stickiness is tracked in the default cache, which should be shared
+# between workers when replicas are used.
+DATABASE_REPLICAS = []
+
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        HOST=host,
+        TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+# Optional connection pooling (DB_POOL=true), using Django's native pool
+# for the psycopg 3 backend. Every uWSGI worker or ASGI process holds its
+# own pool of DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections, and each
+# connection is health checked when it is taken from the pool.
+DB_POOL = os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes')
+
+if DB_POOL:
+    from psycopg_pool import ConnectionPool
+
+    for alias in ['default', *DATABASE_REPLICAS]:
+        DATABASES[alias]['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 4)),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                'check': ConnectionPool.check_connection,
+            },
+        }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -115,11 +175,11 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Rest framework authentication
 # https://www.django-rest-framework.org/api-guide/authentication/
+# No session authentication, API paths run without session middleware.
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.TokenAuthentication',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
@@ -158,3 +218,80 @@ AUTH_USER_MODEL = 'core.User'
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True
 }
+
+
+# Admin changelists on PostgreSQL use the planner's row estimate instead of
+# COUNT(*) once a table or filtered result passes this many rows.
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get('ADMIN_ESTIMATED_COUNT_THRESHOLD', 50000)
+)
+
+# Days a tray needs to travel between hospitals. A tray booked at another
+# hospital within this many days of a date is not offered as available.
+TRAY_TRANSIT_DAYS = int(os.environ.get('TRAY_TRANSIT_DAYS', 1))
+
+# Days between ordering stock and it arriving, and the z-score of the
+# service level safety stock is sized for (1.65 covers demand over 95%
+# of lead times). See event.forecasting.
+REORDER_LEAD_TIME_DAYS = int(os.environ.get('REORDER_LEAD_TIME_DAYS', 7))
+REORDER_SERVICE_Z = float(os.environ.get('REORDER_SERVICE_Z', 1.65))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'pmed-default'),
+    }
+}
+
+# Cached responses, facets and reports are invalidated by bumping version
+# counters in the default cache, which only reaches every worker when the
+# cache is shared (Redis or Memcached). With the per-process LocMemCache
+# they are kept for LOCAL_CACHE_SECONDS at most instead.
+LOCAL_CACHE_SECONDS = int(os.environ.get('LOCAL_CACHE_SECONDS', 30))
+
+
+# Production performance profile
+# https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+
+if PRODUCTION:
+    # Keep connections open between requests, checking them before reuse.
+    # A connection pool replaces persistent connections when enabled.
+    for alias in ['default', *DATABASE_REPLICAS]:
+        DATABASES[alias].update({
+            'CONN_MAX_AGE': 0 if DB_POOL else int(
+                os.environ.get('DB_CONN_MAX_AGE', 60)
+            ),
+            'CONN_HEALTH_CHECKS': True,
+        })
+
+    # Compile templates once per worker instead of once per render.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+    # Never log SQL, even if a backend logger is switched to DEBUG.
+    LOGGING = {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {
+            'console': {'class': 'logging.StreamHandler'},
+        },
+        'root': {'handlers': ['console'], 'level': 'WARNING'},
+        'loggers': {
+            'django.db.backends': {
+                'handlers': ['console'],
+                'level': 'WARNING',
+                'propagate': False,
+            },
+        },
+    }
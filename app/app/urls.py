@@ -36,7 +36,8 @@ urlpatterns = [
         name='api-docs'
     ),
     path('api/user/', include('user.urls'), name='user'),
-    path('api/event/', include('event.urls'), name='event')
+    path('api/event/', include('event.urls'), name='event'),
+    path('api/catalogue/', include('catalogue.urls'), name='catalogue'),
 ]
 
 if settings.DEBUG:
@@ -5,6 +5,9 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/wsgi/
+
+With DB_POOL enabled each uWSGI worker opens its own connection pool on
+first use, so the pool is never shared across a fork.
 """
 
 import os
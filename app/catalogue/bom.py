@@ -0,0 +1,75 @@
+"""
+Tray type bills of materials.
+
+A tray type's template lists every product that belongs on the tray and
+how many. It is built with two queries, the tray type and its items
+joined to their products, and kept in a per-process dictionary. Each
+entry records the 'tray_types' and 'products' cache versions it was
+built under (see core.cache), so a TrayItem, TrayType or Product change
+makes every process sharing the cache rebuild on its next read. A
+per-process cache never sees other workers' bumps, so entries are then
+also rebuilt once older than ``settings.LOCAL_CACHE_SECONDS``.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from core.cache import cache_is_local, cache_version
+from core.models import TrayItem, TrayType
+from .serializers import TrayTypeBomSerializer
+
+
+# Oldest templates are dropped once a process holds this many
+MAX_TEMPLATES = 512
+
+_templates = {}
+
+_templates_lock = threading.Lock()
+
+
+def template_version():
+    """Return the cache versions a template depends on."""
+    return (cache_version('tray_types'), cache_version('products'))
+
+
+def build_template(tray_type_id):
+    """
+    Build the bill of materials for a tray type in two queries.
+
+    Raises:
+        TrayType.DoesNotExist: If there is no such tray type.
+    """
+    tray_type = TrayType.objects.prefetch_related(Prefetch(
+        'tray_items',
+        queryset=TrayItem.objects.select_related('product').order_by(
+            'product__catalogue_id'
+        ),
+    )).get(pk=tray_type_id)
+    return TrayTypeBomSerializer(tray_type).data
+
+
+def tray_type_template(tray_type_id):
+    """Return the tray type's template, rebuilding it when stale."""
+    version = template_version()
+    now = time.monotonic()
+    cached = _templates.get(tray_type_id)
+    if cached is not None and cached[0] == version and not (
+        cache_is_local() and now - cached[1] > settings.LOCAL_CACHE_SECONDS
+    ):
+        return cached[2]
+
+    template = build_template(tray_type_id)
+    with _templates_lock:
+        _templates.pop(tray_type_id, None)
+        if len(_templates) >= MAX_TEMPLATES:
+            _templates.pop(next(iter(_templates)))
+        _templates[tray_type_id] = (version, now, template)
+    return template
+
+
+def clear_templates():
+    """Forget every template held by this process."""
+    with _templates_lock:
+        _templates.clear()
@@ -0,0 +1,88 @@
+"""
+Cached, versioned responses for the read-only catalogue endpoints.
+
+The rendered JSON of list and detail responses is cached under the
+current versions of every cache namespace the endpoint reads (see
+core.cache); core.signals bumps a namespace whenever one of its models
+is saved or deleted. A warm hit is answered from the cache without
+touching the ORM or the serializer, and clients holding the strong
+ETag get a 304 instead of the body.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from core.cache import cache_timeout, cache_version
+
+
+# The keys change with every version bump, so entries can live long in a
+# shared cache (see core.cache.cache_timeout)
+RESPONSE_CACHE_SECONDS = 24 * 60 * 60
+
+
+class CachedReadMixin:
+    """Serve list and retrieve from the rendered response cache.
+
+    ``cache_namespaces`` names every namespace whose models appear in
+    the response, e.g. tray types also list their products.
+    """
+    cache_namespaces = ()
+
+    def response_cache_key(self, request):
+        """Return the key for this request under the current versions."""
+        versions = ':'.join(
+            f'{namespace}.{cache_version(namespace)}'
+            for namespace in self.cache_namespaces
+        )
+        # Image URLs are absolute, so the host is part of the response
+        path = f'{request.get_host()}{request.get_full_path()}'
+        digest = hashlib.md5(path.encode()).hexdigest()
+        return f'catalogue-response:{versions}:{digest}'
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        """Return the cached rendering of a handler, filling it on a miss.
+
+        Only JSON renderings are cached, the browsable API and errors go
+        through the normal flow.
+        """
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(
+                request, response, *args, **kwargs
+            )
+            response.render()
+            content = response.content
+            etag = f'"{hashlib.sha256(content).hexdigest()}"'
+            cached = (content, response['Content-Type'], etag)
+            cache.set(key, cached, cache_timeout(RESPONSE_CACHE_SECONDS))
+
+        content, content_type, etag = cached
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        # Token authenticated data, clients revalidate with the ETag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,142 @@
+"""
+Facet counts for catalogue browsing.
+
+Every facet is counted from one grouped query over the filtered
+products, grouped by category, subtype, price band and profile at once.
+The grouped rows are few (subtypes x bands x profiles), so rolling them
+up into the separate facets in Python is cheap. Results are cached per
+filter signature under the 'products' cache version, which core.signals
+bumps whenever a product changes.
+"""
+import hashlib
+from collections import Counter
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+
+from core.cache import cache_timeout, versioned_key
+from core.categories import category_tree
+
+
+FACET_CACHE_SECONDS = 60 * 60
+
+# Query parameters that change the facet counts
+FACET_PARAMS = ('category', 'subtype', 'search')
+
+# Base price bands as (lower, upper) bounds, the last one is open ended
+PRICE_BANDS = ((0, 50), (50, 100), (100, 250), (250, 500), (500, None))
+
+
+def price_band():
+    """Return an expression numbering the price band of each product."""
+    whens = []
+    for index, (lower, upper) in enumerate(PRICE_BANDS):
+        bounds = {'base_price__gte': lower}
+        if upper is not None:
+            bounds['base_price__lt'] = upper
+        whens.append(When(then=Value(index), **bounds))
+    return Case(*whens, output_field=IntegerField())
+
+
+def band_label(lower, upper):
+    return f'{lower}+' if upper is None else f'{lower}-{upper}'
+
+
+def facet_cache_key(query_params):
+    """Return the cache key for the facet filters in the query string."""
+    signature = '&'.join(
+        f'{param}={query_params.get(param, "").strip().lower()}'
+        for param in FACET_PARAMS
+    )
+    digest = hashlib.md5(signature.encode()).hexdigest()
+    return versioned_key('products', 'facets', digest)
+
+
+def count_facets(queryset):
+    """
+    Count the products per category, subtype, price band and profile.
+
+    Args:
+        queryset (QuerySet): The filtered products.
+
+    Returns:
+        dict: Counts keyed by id, band index and profile.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(price_band=price_band())
+        .values('category_id', 'subtype_id', 'price_band', 'profile')
+        .annotate(count=Count('pk'))
+    )
+    categories, subtypes = Counter(), Counter()
+    bands, profiles = Counter(), Counter()
+    for row in rows:
+        count = row['count']
+        categories[row['category_id']] += count
+        subtypes[row['subtype_id']] += count
+        bands[row['price_band']] += count
+        profiles[row['profile']] += count
+
+    return {
+        'count': sum(categories.values()),
+        'categories': dict(categories),
+        'subtypes': dict(subtypes),
+        'price_bands': dict(bands),
+        'profiles': dict(profiles),
+    }
+
+
+def format_facets(counts):
+    """Name the counted ids using the cached category tree."""
+    categories, subtypes = [], []
+    for category in category_tree():
+        if category['id'] in counts['categories']:
+            categories.append({
+                'id': category['id'],
+                'name': category['name'],
+                'count': counts['categories'][category['id']],
+            })
+        for subtype in category['subtypes']:
+            if subtype['id'] in counts['subtypes']:
+                subtypes.append({
+                    'id': subtype['id'],
+                    'name': subtype['name'],
+                    'category': category['id'],
+                    'count': counts['subtypes'][subtype['id']],
+                })
+
+    return {
+        'count': counts['count'],
+        'categories': categories,
+        'subtypes': subtypes,
+        'price_bands': [
+            {
+                'label': band_label(lower, upper),
+                'min': lower,
+                'max': upper,
+                'count': counts['price_bands'].get(index, 0),
+            }
+            for index, (lower, upper) in enumerate(PRICE_BANDS)
+        ],
+        'profiles': [
+            {'profile': profile, 'count': count}
+            for profile, count in sorted(counts['profiles'].items())
+        ],
+    }
+
+
+def product_facets(queryset, query_params):
+    """
+    Return the formatted facets, counting them on a cache miss.
+
+    Args:
+        queryset (QuerySet): Products already filtered by the request.
+            Only evaluated when the counts are not cached.
+        query_params (QueryDict): The request's query parameters.
+    """
+    key = facet_cache_key(query_params)
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(queryset)
+        cache.set(key, counts, cache_timeout(FACET_CACHE_SECONDS))
+    return format_facets(counts)
@@ -0,0 +1,34 @@
+"""
+Filters for the product catalogue API.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class CategoryFilter(BaseFilterBackend):
+    """API ``?category=`` and ``?subtype=`` filters on the id columns."""
+    params = ('category', 'subtype')
+
+    def filter_queryset(self, request, queryset, view):
+        for param in self.params:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                value = int(value)
+            except ValueError:
+                raise ValidationError({param: 'A valid integer is required.'})
+            queryset = queryset.filter(**{f'{param}_id': value})
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': param,
+                'required': False,
+                'in': 'query',
+                'description': f'Only return products with this {param} id.',
+                'schema': {'type': 'integer'},
+            }
+            for param in self.params
+        ]
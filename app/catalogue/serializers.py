@@ -0,0 +1,146 @@
+"""
+Serializers for the product catalogue API.
+"""
+from rest_framework import serializers
+
+from core.models import Hospital, Product, Tray, TrayItem, TrayType
+
+
+class ProductSerializer(serializers.ModelSerializer):
+    """Serializer for catalogue products."""
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'catalogue_id', 'digimed_id', 'category', 'subtype',
+            'item_type', 'description', 'base_price', 'vat_price', 'image',
+        ]
+        read_only_fields = fields
+
+
+class TrayItemSerializer(serializers.ModelSerializer):
+    """Serializer for a product and its quantity in a tray type."""
+    digimed_id = serializers.CharField(source='product.digimed_id')
+    item_type = serializers.CharField(source='product.item_type')
+
+    class Meta:
+        model = TrayItem
+        fields = ['product', 'digimed_id', 'item_type', 'quantity']
+        read_only_fields = fields
+
+
+class TrayTypeSerializer(serializers.ModelSerializer):
+    """Serializer for tray types with their bill of materials."""
+    items = TrayItemSerializer(source='tray_items', many=True)
+
+    class Meta:
+        model = TrayType
+        fields = ['id', 'name', 'description', 'items']
+        read_only_fields = fields
+
+
+class BomProductSerializer(serializers.ModelSerializer):
+    """Serializer for the product details in a bill of materials."""
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'catalogue_id', 'digimed_id', 'item_type', 'description',
+            'base_price', 'vat_price',
+        ]
+        read_only_fields = fields
+
+
+class BomItemSerializer(serializers.ModelSerializer):
+    """Serializer for one line of a tray type's bill of materials."""
+    product = BomProductSerializer()
+
+    class Meta:
+        model = TrayItem
+        fields = ['product', 'quantity']
+        read_only_fields = fields
+
+
+class TrayTypeBomSerializer(serializers.ModelSerializer):
+    """Serializer for everything that belongs on a tray type."""
+    items = BomItemSerializer(source='tray_items', many=True)
+    item_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = TrayType
+        fields = ['id', 'name', 'description', 'item_count', 'items']
+        read_only_fields = fields
+
+    def get_item_count(self, tray_type) -> int:
+        """Return the number of pieces on a full tray."""
+        return sum(item.quantity for item in tray_type.tray_items.all())
+
+
+class TraySerializer(serializers.ModelSerializer):
+    """Serializer for physical trays."""
+    tray_type_name = serializers.CharField(source='tray_type.name')
+
+    class Meta:
+        model = Tray
+        fields = ['id', 'code', 'tray_type', 'tray_type_name']
+        read_only_fields = fields
+
+
+class HospitalSerializer(serializers.ModelSerializer):
+    """Serializer for hospitals."""
+
+    class Meta:
+        model = Hospital
+        fields = [
+            'id', 'name', 'street', 'city', 'state', 'postal_code',
+            'country',
+        ]
+        read_only_fields = fields
+
+
+class SubtypeSerializer(serializers.Serializer):
+    """Serializer for a subtype in the category tree."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class CategorySerializer(serializers.Serializer):
+    """Serializer for a category and its subtypes."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    subtypes = SubtypeSerializer(many=True)
+
+
+class CategoryFacetSerializer(serializers.Serializer):
+    """Serializer for a category facet count."""
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    count = serializers.IntegerField()
+
+
+class SubtypeFacetSerializer(CategoryFacetSerializer):
+    """Serializer for a subtype facet count."""
+    category = serializers.IntegerField()
+
+
+class PriceBandFacetSerializer(serializers.Serializer):
+    """Serializer for a base price band facet count."""
+    label = serializers.CharField()
+    min = serializers.IntegerField()
+    max = serializers.IntegerField(allow_null=True)
+    count = serializers.IntegerField()
+
+
+class ProfileFacetSerializer(serializers.Serializer):
+    """Serializer for a profile size facet count."""
+    profile = serializers.DecimalField(max_digits=4, decimal_places=1)
+    count = serializers.IntegerField()
+
+
+class FacetsSerializer(serializers.Serializer):
+    """Serializer for every facet of the filtered catalogue."""
+    count = serializers.IntegerField()
+    categories = CategoryFacetSerializer(many=True)
+    subtypes = SubtypeFacetSerializer(many=True)
+    price_bands = PriceBandFacetSerializer(many=True)
+    profiles = ProfileFacetSerializer(many=True)
@@ -0,0 +1,115 @@
+"""
+Tests for the tray type bill of materials API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from catalogue.bom import clear_templates
+from core.models import Product, TrayItem, TrayType
+
+
+def bom_url(tray_type_id):
+    """Create and return a bill of materials URL."""
+    return reverse('catalogue:traytype-bom', args=[tray_type_id])
+
+
+def create_product(catalogue_id, item_type='Screw'):
+    """Create and return a product."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal('2.0'),
+        item_type=item_type,
+        description=f'{item_type} {catalogue_id}',
+        base_price=Decimal('10.00'),
+        vat_price=Decimal('11.50'),
+    )
+
+
+class TrayTypeBomApiTests(TestCase):
+    """Test the bill of materials endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        clear_templates()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.tray_type = TrayType.objects.create(
+            name='Mandible Set', description='Mandible plating set',
+        )
+        for n, item_type in enumerate(('Plate', 'Screw', 'Drill')):
+            TrayItem.objects.create(
+                tray_type=self.tray_type,
+                product=create_product(10000000 + n, item_type),
+                quantity=n + 1,
+            )
+
+    def test_auth_required(self):
+        """Test auth is required for the bill of materials."""
+        res = APIClient().get(bom_url(self.tray_type.id))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bill_of_materials(self):
+        """Test every item is listed with its product details."""
+        res = self.client.get(bom_url(self.tray_type.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Mandible Set')
+        self.assertEqual(res.data['item_count'], 6)
+        self.assertEqual(
+            [(i['product']['item_type'], i['quantity'])
+             for i in res.data['items']],
+            [('Plate', 1), ('Screw', 2), ('Drill', 3)],
+        )
+        self.assertEqual(
+            res.data['items'][0]['product']['digimed_id'], '10-000-000'
+        )
+
+    def test_built_in_two_queries_then_cached(self):
+        """Test a cold template costs two queries and a warm one none."""
+        with self.assertNumQueries(2):
+            self.client.get(bom_url(self.tray_type.id))
+        with self.assertNumQueries(0):
+            res = self.client.get(bom_url(self.tray_type.id))
+
+        self.assertEqual(len(res.data['items']), 3)
+
+    def test_tray_item_change_rebuilds(self):
+        """Test changing an item invalidates the cached template."""
+        self.client.get(bom_url(self.tray_type.id))
+
+        item = self.tray_type.tray_items.get(quantity=3)
+        item.quantity = 10
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        res = self.client.get(bom_url(self.tray_type.id))
+
+        self.assertEqual(res.data['item_count'], 13)
+
+    def test_local_cache_entries_expire(self):
+        """Test a per-process cache rebuilds templates once they age."""
+        self.client.get(bom_url(self.tray_type.id))
+        # Another worker's change, this process's versions are unchanged
+        TrayItem.objects.filter(quantity=3).update(quantity=10)
+
+        with override_settings(LOCAL_CACHE_SECONDS=0):
+            res = self.client.get(bom_url(self.tray_type.id))
+
+        self.assertEqual(res.data['item_count'], 13)
+
+    def test_unknown_tray_type(self):
+        """Test an unknown tray type returns 404."""
+        res = self.client.get(bom_url(self.tray_type.id + 100))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,154 @@
+"""
+Tests for the cached, versioned catalogue endpoints.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Hospital, Product, Tray, TrayItem, TrayType
+
+
+PRODUCTS_URL = reverse('catalogue:product-list')
+TRAY_TYPES_URL = reverse('catalogue:traytype-list')
+TRAYS_URL = reverse('catalogue:tray-list')
+HOSPITALS_URL = reverse('catalogue:hospital-list')
+
+
+def create_product(catalogue_id=12345678, **params):
+    """Create and return a product."""
+    defaults = {
+        'profile': Decimal('1.0'),
+        'item_type': 'Screw',
+        'description': 'Cortical screw',
+        'base_price': Decimal('10.00'),
+        'vat_price': Decimal('11.50'),
+    }
+    defaults.update(params)
+    return Product.objects.create(catalogue_id=catalogue_id, **defaults)
+
+
+class CatalogueCacheTests(TestCase):
+    """Test the catalogue responses are cached and versioned."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.product = create_product()
+        self.tray_type = TrayType.objects.create(
+            name='Mandible Set', description='Mandible plating set',
+        )
+        TrayItem.objects.create(
+            tray_type=self.tray_type, product=self.product, quantity=4,
+        )
+        self.tray = Tray.objects.create(
+            code='MAN-001', tray_type=self.tray_type,
+        )
+        self.hospital = Hospital.objects.create(
+            name='General Hospital', street='1 Main St', city='Town',
+            state='State', postal_code='12345', country='ZA',
+        )
+
+    def test_endpoints_list_catalogue(self):
+        """Test every catalogue endpoint lists its rows."""
+        res = self.client.get(TRAY_TYPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        items = res.json()['results'][0]['items']
+        self.assertEqual(items[0]['digimed_id'], '12-345-678')
+        self.assertEqual(items[0]['quantity'], 4)
+
+        res = self.client.get(TRAYS_URL)
+        self.assertEqual(
+            res.json()['results'][0]['tray_type_name'], 'Mandible Set'
+        )
+
+        res = self.client.get(HOSPITALS_URL)
+        self.assertEqual(res.json()['results'][0]['country'], 'ZA')
+
+    def test_warm_hit_skips_database(self):
+        """Test a cached response runs no queries."""
+        first = self.client.get(TRAY_TYPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(TRAY_TYPES_URL)
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_detail_cached(self):
+        """Test detail responses are cached separately."""
+        url = reverse('catalogue:hospital-detail', args=[self.hospital.id])
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+
+        self.assertEqual(res.json()['name'], 'General Hospital')
+
+    def test_etag_not_modified(self):
+        """Test a matching If-None-Match gets a 304 without a body."""
+        etag = self.client.get(HOSPITALS_URL)['ETag']
+
+        res = self.client.get(HOSPITALS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+        self.assertIn('Authorization', res['Vary'])
+
+    def test_stale_etag_gets_body(self):
+        """Test a different ETag gets the full response."""
+        res = self.client.get(HOSPITALS_URL, HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['count'], 1)
+
+    def test_save_bumps_model_version(self):
+        """Test saving a model refreshes only the responses using it."""
+        etag = self.client.get(TRAYS_URL)['ETag']
+        hospitals_etag = self.client.get(HOSPITALS_URL)['ETag']
+
+        self.tray_type.name = 'Mandible Set II'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tray_type.save()
+
+        res = self.client.get(TRAYS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.json()['results'][0]['tray_type_name'], 'Mandible Set II'
+        )
+        with self.assertNumQueries(0):
+            res = self.client.get(HOSPITALS_URL)
+        self.assertEqual(res['ETag'], hospitals_etag)
+
+    def test_product_delete_refreshes_tray_types(self):
+        """Test tray types follow changes to their products."""
+        self.client.get(TRAY_TYPES_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        res = self.client.get(TRAY_TYPES_URL)
+
+        self.assertEqual(res.json()['results'][0]['items'], [])
+
+    def test_browsable_api_not_cached(self):
+        """Test only JSON renderings are cached."""
+        res = self.client.get(PRODUCTS_URL, HTTP_ACCEPT='text/html')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(PRODUCTS_URL)
+        self.assertGreater(len(queries), 0)
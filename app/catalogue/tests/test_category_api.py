@@ -0,0 +1,99 @@
+"""
+Tests for the product category API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, ProductCategory, ProductSubtype
+
+
+CATEGORIES_URL = reverse('catalogue:categories')
+PRODUCTS_URL = reverse('catalogue:product-list')
+
+
+def create_product(catalogue_id, item_type):
+    """Create and return a product of the given item type."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal('1.0'),
+        item_type=item_type,
+        description=f'A {item_type}',
+        base_price=Decimal('10.00'),
+        vat_price=Decimal('11.50'),
+    )
+
+
+class CategoryApiTests(TestCase):
+    """Test the category tree and category filters."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """Test auth is required for the category tree."""
+        res = APIClient().get(CATEGORIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_category_tree(self):
+        """Test the migrated categories are listed with their subtypes."""
+        res = self.client.get(CATEGORIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tree = {c['name']: [s['name'] for s in c['subtypes']]
+                for c in res.json()}
+        self.assertEqual(tree['Plates'], ['Plate', 'Titanium Mesh'])
+        self.assertEqual(tree['Other'], ['Screw'])
+
+    def test_category_tree_cached(self):
+        """Test the tree is only queried once until it changes."""
+        self.client.get(CATEGORIES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(CATEGORIES_URL)
+        self.assertNotIn('Implants', [c['name'] for c in res.json()])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            category = ProductCategory.objects.create(name='Implants')
+            ProductSubtype.objects.create(category=category, name='Pin')
+        res = self.client.get(CATEGORIES_URL)
+
+        implants = [c for c in res.json() if c['name'] == 'Implants']
+        self.assertEqual(implants[0]['subtypes'][0]['name'], 'Pin')
+
+    def test_filter_by_category_and_subtype(self):
+        """Test products filter on the category and subtype ids."""
+        plate = create_product(10000001, 'Plate')
+        mesh = create_product(10000002, 'Titanium Mesh')
+        create_product(10000003, 'Drill')
+
+        res = self.client.get(
+            PRODUCTS_URL, {'category': plate.category_id}
+        )
+        self.assertEqual(
+            [p['id'] for p in res.json()['results']], [plate.id, mesh.id]
+        )
+
+        res = self.client.get(PRODUCTS_URL, {'subtype': mesh.subtype_id})
+        self.assertEqual(
+            [p['id'] for p in res.json()['results']], [mesh.id]
+        )
+
+    def test_filter_invalid_category(self):
+        """Test a non numeric category is rejected."""
+        res = self.client.get(PRODUCTS_URL, {'category': 'plates'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
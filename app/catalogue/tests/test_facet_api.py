@@ -0,0 +1,112 @@
+"""
+Tests for the product facet API.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.categories import category_tree
+from core.models import Product
+
+
+FACETS_URL = reverse('catalogue:product-facets')
+
+
+def create_product(catalogue_id, item_type, base_price, profile='1.0'):
+    """Create and return a product."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal(profile),
+        item_type=item_type,
+        description=f'Locking {item_type}',
+        base_price=Decimal(base_price),
+        vat_price=Decimal(base_price) * Decimal('1.15'),
+    )
+
+
+class FacetApiTests(TestCase):
+    """Test the facet counts endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+        self.plate = create_product(10000001, 'Plate', '40.00', '2.0')
+        create_product(10000002, 'Plate', '120.00', '2.0')
+        create_product(10000003, 'Titanium Mesh', '600.00', '1.5')
+        create_product(10000004, 'Drill', '75.00', '1.5')
+
+    def by_name(self, facets):
+        return {facet['name']: facet['count'] for facet in facets}
+
+    def test_auth_required(self):
+        """Test auth is required for facets."""
+        res = APIClient().get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_facet_counts(self):
+        """Test every facet is counted over the whole catalogue."""
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 4)
+        self.assertEqual(
+            self.by_name(res.data['categories']),
+            {'Plates': 3, 'Instruments': 1},
+        )
+        self.assertEqual(
+            self.by_name(res.data['subtypes']),
+            {'Plate': 2, 'Titanium Mesh': 1, 'Drill': 1},
+        )
+        self.assertEqual(
+            {band['label']: band['count'] for band in res.data['price_bands']},
+            {'0-50': 1, '50-100': 1, '100-250': 1, '250-500': 0, '500+': 1},
+        )
+        self.assertEqual(
+            [(p['profile'], p['count']) for p in res.data['profiles']],
+            [('1.5', 2), ('2.0', 2)],
+        )
+
+    def test_facets_follow_filters(self):
+        """Test the counts cover only the filtered products."""
+        res = self.client.get(FACETS_URL, {
+            'category': self.plate.category_id, 'search': 'plate',
+        })
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(self.by_name(res.data['subtypes']), {'Plate': 2})
+
+    def test_facets_counted_in_one_query_and_cached(self):
+        """Test a miss runs one grouped query and a hit runs none."""
+        category_tree()
+
+        with self.assertNumQueries(1):
+            self.client.get(FACETS_URL, {'search': 'locking'})
+        with self.assertNumQueries(0):
+            res = self.client.get(FACETS_URL, {'search': ' Locking '})
+
+        self.assertEqual(res.data['count'], 4)
+
+    def test_product_change_invalidates(self):
+        """Test saving a product refreshes the cached counts."""
+        self.client.get(FACETS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            create_product(10000005, 'Drill', '80.00')
+        res = self.client.get(FACETS_URL)
+
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(
+            self.by_name(res.data['categories'])['Instruments'], 2
+        )
@@ -0,0 +1,252 @@
+"""
+Tests for the product catalogue API.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, tag
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product
+from core.search import update_product_search
+
+
+PRODUCTS_URL = reverse('catalogue:product-list')
+
+
+def detail_url(product_id):
+    """Create and return a product detail URL."""
+    return reverse('catalogue:product-detail', args=[product_id])
+
+
+def scan_url(digimed_id):
+    """Create and return a scanner lookup URL."""
+    return reverse('catalogue:product-scan', args=[digimed_id])
+
+
+def create_product(**params):
+    """Create and return a product."""
+    defaults = {
+        'catalogue_id': 12345678,
+        'profile': Decimal('2.0'),
+        'item_type': 'Screw',
+        'description': 'Self tapping cortical screw',
+        'base_price': Decimal('10.00'),
+        'vat_price': Decimal('11.50'),
+    }
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class PublicProductApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to read the catalogue."""
+        res = APIClient().get(PRODUCTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateProductApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_products_paginated(self):
+        """Test the catalogue is paginated in catalogue order."""
+        for catalogue_id in (30000000, 10000000, 20000000):
+            create_product(catalogue_id=catalogue_id)
+
+        res = self.client.get(PRODUCTS_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['count'], 3)
+        self.assertEqual(
+            [p['catalogue_id'] for p in res.json()['results']],
+            [10000000, 20000000],
+        )
+        self.assertIsNotNone(res.json()['next'])
+
+    def test_retrieve_product(self):
+        """Test a product shows its formatted Digimed ID."""
+        product = create_product()
+
+        res = self.client.get(detail_url(product.id))
+
+        self.assertEqual(res.json()['digimed_id'], '12-345-678')
+
+    def test_read_only(self):
+        """Test the catalogue cannot be changed through the API."""
+        res = self.client.post(PRODUCTS_URL, {'item_type': 'Screw'})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_search_description_prefix(self):
+        """Test searching matches the start of description words."""
+        screw = create_product()
+        create_product(
+            catalogue_id=87654321, item_type='Drill',
+            description='Cannulated drill bit',
+        )
+
+        res = self.client.get(PRODUCTS_URL, {'search': 'CORT'})
+
+        self.assertEqual(
+            [p['id'] for p in res.json()['results']], [screw.id]
+        )
+
+    def test_search_digimed_id(self):
+        """Test searching by the formatted or plain Digimed ID."""
+        screw = create_product()
+        create_product(catalogue_id=87654321)
+
+        for term in ('12-345-678', '12345678', '12-345'):
+            res = self.client.get(PRODUCTS_URL, {'search': term})
+            self.assertEqual(
+                [p['id'] for p in res.json()['results']], [screw.id], term
+            )
+
+    def test_search_full_digimed_id_exact(self):
+        """Test a complete Digimed ID is matched exactly."""
+        screw = create_product()
+        create_product(catalogue_id=12345679)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PRODUCTS_URL, {'search': '12-345-678'})
+
+        self.assertEqual(
+            [p['id'] for p in res.json()['results']], [screw.id]
+        )
+
+    def test_scan_formatted_digimed_id(self):
+        """Test scanning a Digimed ID returns its product."""
+        screw = create_product()
+        create_product(catalogue_id=87654321)
+
+        res = self.client.get(scan_url('12-345-678'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['id'], screw.id)
+        self.assertEqual(res.json()['digimed_id'], '12-345-678')
+
+    def test_scan_plain_catalogue_id(self):
+        """Test scanning an unformatted catalogue ID."""
+        screw = create_product()
+
+        res = self.client.get(scan_url('12345678'))
+
+        self.assertEqual(res.json()['id'], screw.id)
+
+    def test_scan_unknown_digimed_id(self):
+        """Test scanning an unknown Digimed ID returns 404."""
+        res = self.client.get(scan_url('99-999-999'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_order_by_digimed_id(self):
+        """Test the catalogue can be sorted by Digimed ID."""
+        create_product(catalogue_id=9000000)
+        create_product(catalogue_id=10000000)
+
+        res = self.client.get(PRODUCTS_URL, {'ordering': '-digimed_id'})
+
+        self.assertEqual(
+            [p['digimed_id'] for p in res.json()['results']],
+            ['90-000-00', '10-000-000'],
+        )
+
+    def test_search_ranks_item_type_above_description(self):
+        """Test a match on the item type outranks the description."""
+        mention = create_product(
+            catalogue_id=11111111, item_type='Screw',
+            description='Screw for a locking plate',
+        )
+        plate = create_product(
+            catalogue_id=22222222, item_type='Plate',
+            description='Straight locking plate',
+        )
+
+        res = self.client.get(PRODUCTS_URL, {'search': 'plate'})
+
+        self.assertEqual(
+            [p['id'] for p in res.json()['results']], [plate.id, mention.id]
+        )
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test saved and deleted products are re-indexed."""
+        product = create_product()
+        product.description = 'Titanium mesh sheet'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        res = self.client.get(PRODUCTS_URL, {'search': 'cortical'})
+        self.assertEqual(res.json()['count'], 0)
+        res = self.client.get(PRODUCTS_URL, {'search': 'titanium'})
+        self.assertEqual(res.json()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        res = self.client.get(PRODUCTS_URL, {'search': 'titanium'})
+        self.assertEqual(res.json()['count'], 0)
+
+
+@tag('slow')
+class CatalogueSearchSpeedTests(TestCase):
+    """Test ranked search stays fast on a 100k product catalogue."""
+
+    SKUS = 100000
+    WORDS = [f'word{n}' for n in range(2000)]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(1)
+        types = ['Plate', 'Screw', 'Drill', 'Rack', 'Scissors']
+        Product.objects.bulk_create(
+            [
+                Product(
+                    catalogue_id=10000000 + n,
+                    profile=Decimal('1.0'),
+                    item_type=rng.choice(types),
+                    description=' '.join(rng.sample(cls.WORDS, 8)),
+                    base_price=Decimal('1.00'),
+                    vat_price=Decimal('1.15'),
+                )
+                for n in range(cls.SKUS)
+            ],
+            batch_size=5000,
+        )
+        # bulk_create skips the signals, index everything at once
+        update_product_search(Product.objects.all())
+        cls.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+
+    def test_ranked_search_page_is_fast(self):
+        """Test a ranked, counted page is served in a few milliseconds."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        timings = []
+        for word in self.WORDS[:20]:
+            start = time.perf_counter()
+            res = client.get(PRODUCTS_URL, {'search': f'{word} plate'})
+            timings.append(time.perf_counter() - start)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertGreater(res.json()['count'], 0)
+
+        self.assertLess(statistics.median(timings), 0.05)
@@ -0,0 +1,22 @@
+"""
+URL mappings for the catalogue app.
+"""
+from . import views
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+
+router = DefaultRouter()
+router.register('products', views.ProductViewSet)
+router.register('tray-types', views.TrayTypeViewSet)
+router.register('trays', views.TrayViewSet)
+router.register('hospitals', views.HospitalViewSet)
+
+app_name = 'catalogue'
+
+urlpatterns = [
+    path(
+        'categories/', views.CategoryTreeView.as_view(), name='categories'
+    ),
+    path('', include(router.urls)),
+]
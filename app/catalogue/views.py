@@ -0,0 +1,127 @@
+"""
+Views for the product catalogue API.
+"""
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from drf_spectacular.utils import extend_schema
+from rest_framework import filters, permissions, viewsets, views
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from core.categories import category_tree
+from core.models import (
+    Hospital, Product, Tray, TrayItem, TrayType, format_digimed,
+)
+from core.search import ProductSearchFilter
+from . import serializers
+from .bom import tray_type_template
+from .caching import CachedReadMixin
+from .facets import product_facets
+from .filters import CategoryFilter
+
+
+class CataloguePagination(PageNumberPagination):
+    """Page through the catalogue, 25 products at a time by default."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class CatalogueViewSet(CachedReadMixin, viewsets.ReadOnlyModelViewSet):
+    """Base for the read-only, response cached catalogue endpoints."""
+    pagination_class = CataloguePagination
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class ProductViewSet(CatalogueViewSet):
+    """Read-only product catalogue with ranked full-text search."""
+    serializer_class = serializers.ProductSerializer
+    cache_namespaces = ('products',)
+    # The search vector is only read by the database
+    queryset = Product.objects.defer('search_vector').order_by(
+        'catalogue_id'
+    )
+    filter_backends = [
+        CategoryFilter, ProductSearchFilter, filters.OrderingFilter,
+    ]
+    ordering_fields = ['catalogue_id', 'digimed_id']
+
+    @action(
+        detail=False,
+        url_path=r'scan/(?P<digimed_id>\d[\d-]*)',
+        url_name='scan',
+    )
+    def scan(self, request, digimed_id=None):
+        """Return the product for a scanned Digimed ID.
+
+        The formatted ID (``12-345-678``) is looked up with one probe of
+        the digimed_id index, a plain catalogue ID is formatted first.
+        """
+        if '-' not in digimed_id:
+            digimed_id = format_digimed(digimed_id)
+        product = get_object_or_404(self.get_queryset(), digimed_id=digimed_id)
+        serializer = self.get_serializer(product)
+        return Response(serializer.data)
+
+    @extend_schema(responses=serializers.FacetsSerializer)
+    @action(detail=False, url_path='facets', url_name='facets')
+    def facets(self, request):
+        """Return facet counts for the current category and search filter.
+
+        The filtered queryset is only run on a cache miss.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = product_facets(queryset, request.query_params)
+        return Response(serializers.FacetsSerializer(facets).data)
+
+
+class TrayTypeViewSet(CatalogueViewSet):
+    """Tray types with the products and quantities they hold."""
+    serializer_class = serializers.TrayTypeSerializer
+    cache_namespaces = ('tray_types', 'products')
+    # Items and their products come back in one joined query
+    queryset = TrayType.objects.prefetch_related(Prefetch(
+        'tray_items', queryset=TrayItem.objects.select_related('product')
+    )).order_by('name', 'id')
+
+    @extend_schema(responses=serializers.TrayTypeBomSerializer)
+    @action(detail=True, url_path='bom', url_name='bom')
+    def bom(self, request, pk=None):
+        """Return the full bill of materials with product details.
+
+        Served from the per-process template cache, see catalogue.bom.
+        """
+        try:
+            template = tray_type_template(int(pk))
+        except (TrayType.DoesNotExist, ValueError):
+            raise Http404
+        return Response(template)
+
+
+class TrayViewSet(CatalogueViewSet):
+    """Physical trays and their tray type."""
+    serializer_class = serializers.TraySerializer
+    cache_namespaces = ('trays', 'tray_types')
+    queryset = Tray.objects.select_related('tray_type').order_by('code')
+
+
+class HospitalViewSet(CatalogueViewSet):
+    """Hospitals events can be booked at."""
+    serializer_class = serializers.HospitalSerializer
+    cache_namespaces = ('hospitals',)
+    queryset = Hospital.objects.order_by('name')
+
+
+class CategoryTreeView(views.APIView):
+    """Product categories with their subtypes, served from the cache."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(responses=serializers.CategorySerializer(many=True))
+    def get(self, request):
+        return Response(category_tree())
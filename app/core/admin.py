@@ -2,18 +2,25 @@
 Django admin customisation
 """
 
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError
 from django.utils.translation import gettext_lazy as _
 
+from core.categories import category_tree
 from core.models import (
     User, Hospital, Doctor, 
-    Product, TrayType, TrayItem, Tray
+    Product, ProductCategory, ProductSubtype, TrayType, TrayItem, Tray
 )
+from core.search import IndexedSearchAdminMixin, search_products
+from event.provisioning import provision_numbered_trays, sync_trays
 
 
 @admin.register(User)
-class CustomUserAdmin(BaseUserAdmin):
+class CustomUserAdmin(IndexedSearchAdminMixin, BaseUserAdmin):
     """Define the admin pages for users"""
     
     # Fields to display in the user list view
@@ -95,6 +102,7 @@ class DoctorAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'get_firstname', 'get_surname', 'practice_number', 'is_verified'
     )
+    list_select_related = ('user',)
     list_filter = ('is_verified',)
     search_fields = (
         'practice_number', 'user__firstname', 'user__surname',
@@ -119,40 +127,98 @@ class TrayItemInline(admin.TabularInline):  # or admin.StackedInline
     min_num = 1  # Ensures at least one product is added
     fields = ('product', 'quantity')
 
+    def get_queryset(self, request):
+        """TrayItem.__str__ reads the tray type and the product"""
+        return super().get_queryset(request).select_related(
+            'tray_type', 'product'
+        )
+
+
+class CategoryFilter(admin.SimpleListFilter):
+    """Filter products on the indexed category column"""
+    title = _('Category')
+    parameter_name = 'category'
+
+    def lookups(self, request, model_admin):
+        """List the categories from the cached category tree"""
+        return [
+            (category['id'], category['name'])
+            for category in category_tree()
+        ]
+
+    def queryset(self, request, queryset):
+        """Filter queryset based on selection"""
+        if self.value():
+            return queryset.filter(category_id=self.value())
+        return queryset
+
 
-# Custom filter for Item Type since choices are nested
 class ItemTypeFilter(admin.SimpleListFilter):
+    """Filter products on the indexed subtype column"""
     title = _('Item Type')
-    parameter_name = 'item_type'
+    parameter_name = 'subtype'
 
     def lookups(self, request, model_admin):
-        """Flattens TYPE_CHOICES for filtering"""
-        choices = []
-        for category, sub_choices in Product.TYPE_CHOICES.items():
-            for key, value in sub_choices.items():
-                choices.append((key, f"{category} - {value}"))
-        return choices
+        """List the subtypes from the cached category tree"""
+        return [
+            (subtype['id'], f"{category['name']} - {subtype['name']}")
+            for category in category_tree()
+            for subtype in category['subtypes']
+        ]
 
     def queryset(self, request, queryset):
         """Filter queryset based on selection"""
         if self.value():
-            return queryset.filter(item_type=self.value())
+            return queryset.filter(subtype_id=self.value())
         return queryset
 
+
+class ProductSubtypeInline(admin.TabularInline):
+    model = ProductSubtype
+    extra = 1
+
+
+@admin.register(ProductCategory)
+class ProductCategoryAdmin(admin.ModelAdmin):
+    list_display = ('name',)
+    search_fields = ('name',)
+    inlines = [ProductSubtypeInline]
+
+
 # Admin class for Product model
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'catalogue_id', 'get_digimed', 'item_type', 'description', 'base_price', 'vat_price')
+    list_display = (
+        'id', 'catalogue_id', 'digimed_id', 'item_type', 'description',
+        'base_price', 'vat_price',
+    )
     search_fields = ('catalogue_id', 'item_type', 'description')
-    list_filter = (ItemTypeFilter,)
+    list_filter = (CategoryFilter, ItemTypeFilter)
     ordering = ('catalogue_id',)
-    readonly_fields = ('get_digimed',)  # Ensures Digimed ID is displayed but not editable
+    # The database computes the Digimed ID, save() sets the item type
+    # from the subtype
+    readonly_fields = ('digimed_id', 'item_type')
     list_per_page = 20  # Pagination for better admin usability
 
-    def get_digimed(self, obj):
-        return obj.get_digimed()
+    def get_search_results(self, request, queryset, search_term):
+        """Search the full-text index instead of scanning descriptions."""
+        return search_products(queryset, search_term), False
 
-    get_digimed.short_description = 'Digimed ID'  # Display name in admin
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Products added in the admin need a subtype."""
+        if db_field.name == 'subtype':
+            # ProductSubtype.__str__ reads the category
+            kwargs['queryset'] = ProductSubtype.objects.select_related(
+                'category'
+            )
+            kwargs['required'] = True
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class ProvisionActionForm(ActionForm):
+    """Tray codes for the provisioning action, e.g. MAN- and 20."""
+    prefix = forms.CharField(max_length=20, required=False)
+    count = forms.IntegerField(min_value=1, max_value=1000, required=False)
 
 
 @admin.register(TrayType)
@@ -161,11 +227,78 @@ class TrayTypeAdmin(admin.ModelAdmin):
     search_fields = ('name',)
     ordering = ('name',)
     inlines = [TrayItemInline]  # Embeds Product-Quantity table inside TrayType admin
+    # Bulk provisioning from the template, see event.provisioning
+    action_form = ProvisionActionForm
+    actions = ['provision_trays', 'sync_trays']
+
+    @admin.action(description='Provision new trays from the template')
+    def provision_trays(self, request, queryset):
+        """Create prefix + count trays of the one selected tray type."""
+        form = self.action_form(request.POST)
+        form.fields['action'].choices = self.get_action_choices(request)
+        if len(queryset) != 1 or not form.is_valid():
+            self.message_user(
+                request, 'Select one tray type and give a prefix and count.',
+                messages.ERROR,
+            )
+            return
+        prefix = form.cleaned_data['prefix']
+        count = form.cleaned_data['count']
+        if not prefix or not count:
+            self.message_user(
+                request, 'Give a prefix and count for the new trays.',
+                messages.ERROR,
+            )
+            return
+
+        try:
+            trays = provision_numbered_trays(
+                queryset[0], prefix, count, request.user
+            )
+        except IntegrityError:
+            self.message_user(
+                request,
+                f'Tray codes starting {prefix} kept being taken, try again.',
+                messages.ERROR,
+            )
+            return
+        self.message_user(
+            request,
+            f'Provisioned {len(trays)} trays: '
+            f'{trays[0].code} to {trays[-1].code}.',
+            messages.SUCCESS,
+        )
+
+    @admin.action(description='Re-sync existing trays with the template')
+    def sync_trays(self, request, queryset):
+        """Reset the inventory of every tray of the selected types."""
+        for tray_type in queryset:
+            result = sync_trays(tray_type, request.user)
+            self.message_user(
+                request,
+                f'{tray_type.name}: synced {result.trays} trays, '
+                f'{result.created} rows added, {result.updated} updated, '
+                f'{result.deleted} removed.',
+                messages.SUCCESS,
+            )
 
 @admin.register(Tray)
 class TrayAdmin(admin.ModelAdmin):
-    list_display = ('code', 'tray_type')
+    list_display = ('code', 'tray_type', 'current_location')
+    # The location is the TrayLocation row kept by event.locations
+    list_select_related = ('tray_type', 'location__hospital')
     search_fields = ('code',)
     list_filter = ('tray_type',)
     autocomplete_fields = ['tray_type']
     ordering = ('code',)
+
+    @admin.display(description='Location', ordering='location__hospital')
+    def current_location(self, obj):
+        """Read the tray's TrayLocation row, joined in with the page"""
+        try:
+            location = obj.location
+        except ObjectDoesNotExist:
+            return '-'
+        if location.hospital is None:
+            return '-'
+        return f'{location.hospital.name} ({location.event_date})'
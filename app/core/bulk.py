@@ -0,0 +1,175 @@
+"""
+Bulk provisioning helpers for onboarding whole staff lists at once.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+
+from core.models import Doctor
+
+
+BATCH_SIZE = 500
+
+
+def _init_worker():
+    """Make sure Django is configured in freshly spawned worker processes."""
+    django.setup()
+
+
+def hash_passwords(passwords, processes=None):
+    """
+    Hash a list of raw passwords, spreading the work over a process pool.
+
+    Args:
+        passwords (list): Raw passwords, ``None`` for an unusable password.
+        processes (int, optional): Pool size. Defaults to the CPU count.
+            A value of 1 hashes in the current process.
+
+    Returns:
+        list: Encoded password hashes in the same order as ``passwords``.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+
+    chunksize = max(1, len(passwords) // (processes * 4))
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker
+    ) as executor:
+        return list(
+            executor.map(make_password, passwords, chunksize=chunksize)
+        )
+
+
+def check_practice_numbers(rows):
+    """
+    Check the doctor rows' practice numbers are new and not repeated.
+
+    Args:
+        rows (list): The user rows to import.
+
+    Raises:
+        ValueError: Naming the offending rows, numbered from 1.
+    """
+    rows_by_number = {}
+    for n, row in enumerate(rows, start=1):
+        if row.get('practice_number') is not None:
+            rows_by_number.setdefault(row['practice_number'], []).append(n)
+
+    repeated = [
+        f'{number} (rows {", ".join(map(str, found))})'
+        for number, found in rows_by_number.items() if len(found) > 1
+    ]
+    if repeated:
+        raise ValueError(
+            f'The import repeats practice numbers: {"; ".join(repeated)}'
+        )
+    existing = sorted(Doctor.objects.filter(
+        practice_number__in=list(rows_by_number)
+    ).values_list('practice_number', flat=True))
+    if existing:
+        taken = ', '.join(
+            f'{number} (row {rows_by_number[number][0]})'
+            for number in existing
+        )
+        raise ValueError(f'Practice numbers already registered: {taken}')
+
+
+def bulk_import_users(rows, processes=None):
+    """
+    Create users, and doctor profiles where requested, in bulk.
+
+    Each row is a dict with ``email`` and ``password`` and optionally
+    ``firstname``, ``surname``, ``phone_number`` and ``is_staff``. Rows
+    carrying a ``practice_number`` also get a ``Doctor`` profile, using the
+    optional ``comments`` and ``is_verified`` keys.
+
+    Args:
+        rows (list): The user rows to import.
+        processes (int, optional): Pool size used for password hashing.
+
+    Raises:
+        ValueError: If an email is missing, repeated or already registered,
+            or a practice number is repeated or already registered.
+
+    Returns:
+        dict: Counts of created users and doctors, elapsed seconds and
+        the users/s throughput.
+    """
+    User = get_user_model()
+    start = time.perf_counter()
+
+    emails = []
+    for row in rows:
+        if not row.get('email'):
+            raise ValueError(
+                'An email address is required for user registration.'
+            )
+        emails.append(User.objects.normalize_email(row['email']))
+
+    if len(set(emails)) != len(emails):
+        raise ValueError('The import contains duplicate email addresses.')
+    existing = list(
+        User.objects.filter(email__in=emails).values_list('email', flat=True)
+    )
+    if existing:
+        raise ValueError(
+            f'Users already exist for: {", ".join(sorted(existing))}'
+        )
+
+    check_practice_numbers(rows)
+
+    hashes = hash_passwords(
+        [row.get('password') for row in rows], processes=processes
+    )
+
+    users = [
+        User(
+            email=email,
+            password=password_hash,
+            firstname=row.get('firstname'),
+            surname=row.get('surname'),
+            phone_number=row.get('phone_number'),
+            is_staff=row.get('is_staff', False),
+        )
+        for row, email, password_hash in zip(rows, emails, hashes)
+    ]
+
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+            user_ids = dict(User.objects.filter(
+                email__in=emails
+            ).values_list('email', 'id'))
+            doctors = [
+                Doctor(
+                    user_id=user_ids[email],
+                    practice_number=row['practice_number'],
+                    comments=row.get('comments') or '',
+                    is_verified=row.get('is_verified', False),
+                )
+                for row, email in zip(rows, emails)
+                if row.get('practice_number') is not None
+            ]
+            Doctor.objects.bulk_create(doctors, batch_size=BATCH_SIZE)
+    except IntegrityError:
+        # Registered by another request since the checks above
+        raise ValueError(
+            'Some of these users or practice numbers were registered '
+            'during the import, nothing was imported.'
+        )
+
+    elapsed = time.perf_counter() - start
+    return {
+        'users': len(users),
+        'doctors': len(doctors),
+        'seconds': round(elapsed, 3),
+        'users_per_second': (
+            round(len(users) / elapsed, 1) if elapsed else None
+        ),
+    }
@@ -0,0 +1,72 @@
+"""
+Versioned cache keys.
+
+Cached results put a version number for their namespace into the key.
+Bumping the version when the underlying rows change makes every older
+entry unreachable at once, without knowing or deleting their keys.
+
+A version bump only reaches the workers sharing the cache. With the
+per-process LocMemCache each worker keeps its own versions, so entries
+are cached for at most ``settings.LOCAL_CACHE_SECONDS`` (see
+cache_timeout) and another worker's write shows after that long.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _version_key(namespace):
+    return f'cache-version:{namespace}'
+
+
+def cache_version(namespace):
+    """
+    Return the current version number of a cache namespace.
+
+    A missing version, never set or evicted, starts from the current
+    time so it cannot collide with a version used before.
+    """
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Invalidate every entry cached under the namespace."""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, *parts):
+    """Return a cache key tied to the namespace's current version."""
+    return ':'.join(
+        (namespace, str(cache_version(namespace)), *map(str, parts))
+    )
+
+
+def cache_is_local():
+    """Return whether the default cache is private to this process."""
+    return isinstance(caches['default'], LocMemCache)
+
+
+def cache_timeout(timeout):
+    """
+    Return how long to cache a versioned entry meant to live ``timeout``.
+
+    Shared caches keep the timeout, None meaning forever. A per-process
+    cache never sees other workers' version bumps, so it is capped at
+    ``settings.LOCAL_CACHE_SECONDS``.
+    """
+    if not cache_is_local():
+        return timeout
+    if timeout is None:
+        return settings.LOCAL_CACHE_SECONDS
+    return min(timeout, settings.LOCAL_CACHE_SECONDS)
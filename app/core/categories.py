@@ -0,0 +1,47 @@
+"""
+Cached product category tree.
+
+Categories and subtypes change rarely but are read by every catalogue
+filter, so the tree is built with one query and cached under the
+'categories' cache version, which core.signals bumps when a category or
+subtype is saved or deleted (see core.cache).
+"""
+from django.core.cache import cache
+
+from .cache import cache_timeout, versioned_key
+from .models import ProductCategory
+
+
+CACHE_NAMESPACE = 'categories'
+
+
+def build_category_tree():
+    """
+    Return every category with its subtypes, ordered by name.
+
+    Returns:
+        list: ``{'id', 'name', 'subtypes': [{'id', 'name'}]}`` dicts.
+    """
+    tree = {}
+    rows = ProductCategory.objects.order_by(
+        'name', 'subtypes__name'
+    ).values_list('id', 'name', 'subtypes__id', 'subtypes__name')
+    for category_id, category_name, subtype_id, subtype_name in rows:
+        category = tree.setdefault(category_id, {
+            'id': category_id, 'name': category_name, 'subtypes': [],
+        })
+        # Categories without subtypes come back with a NULL subtype
+        if subtype_id is not None:
+            category['subtypes'].append(
+                {'id': subtype_id, 'name': subtype_name}
+            )
+    return list(tree.values())
+
+
+def category_tree():
+    """Return the category tree, building and caching it when missing."""
+    return cache.get_or_set(
+        versioned_key(CACHE_NAMESPACE, 'tree'),
+        build_category_tree,
+        cache_timeout(None),
+    )
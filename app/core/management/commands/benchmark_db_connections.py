@@ -0,0 +1,82 @@
+"""
+Django command to benchmark connection setup with and without pooling.
+"""
+import copy
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.db.utils import load_backend
+
+
+class Command(BaseCommand):
+    """Time request-sized connect, query, close cycles against Postgres.
+
+    Each cycle mirrors what a request does with CONN_MAX_AGE = 0: open a
+    connection, run a query and close it again. With pooling enabled the
+    close hands the connection back to the pool instead.
+    """
+    help = 'Benchmark connection setup latency with and without a pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cycles', type=int, default=200,
+            help='Number of connect/query/close cycles per mode.'
+        )
+        parser.add_argument(
+            '--pool-size', type=int, default=4,
+            help='Maximum pool size used for the pooled run.'
+        )
+
+    def make_connection(self, alias, pool_size=None):
+        """Build a standalone connection to the default database."""
+        settings_dict = copy.deepcopy(connections['default'].settings_dict)
+        settings_dict['CONN_MAX_AGE'] = 0
+        options = settings_dict.setdefault('OPTIONS', {})
+        options.pop('pool', None)
+        if pool_size:
+            options['pool'] = {'min_size': 1, 'max_size': pool_size}
+        backend = load_backend(settings_dict['ENGINE'])
+
+        return backend.DatabaseWrapper(settings_dict, alias)
+
+    def time_cycles(self, connection, cycles):
+        """Return the mean milliseconds per connect/query/close cycle."""
+        # Warm up once so the pool, if any, is already open.
+        connection.ensure_connection()
+        connection.close()
+
+        start = time.perf_counter()
+        for _ in range(cycles):
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.close()
+
+        return (time.perf_counter() - start) * 1000 / cycles
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if connections['default'].vendor != 'postgresql':
+            raise CommandError('This benchmark needs a PostgreSQL database.')
+        if not is_psycopg3:
+            raise CommandError('Connection pooling needs psycopg 3.')
+
+        cycles = options['cycles']
+        direct = self.make_connection('benchmark_direct')
+        pooled = self.make_connection(
+            'benchmark_pooled', pool_size=options['pool_size']
+        )
+        try:
+            direct_ms = self.time_cycles(direct, cycles)
+            pooled_ms = self.time_cycles(pooled, cycles)
+        finally:
+            direct.close()
+            pooled.close_pool()
+
+        self.stdout.write(f'{cycles} connect/query/close cycles')
+        self.stdout.write(f'New connection per cycle: {direct_ms:.3f} ms')
+        self.stdout.write(f'Pooled connection:        {pooled_ms:.3f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'Connection setup saved: {direct_ms - pooled_ms:.3f} ms/request'
+        ))
@@ -0,0 +1,91 @@
+"""
+Django command to benchmark the API middleware pipeline.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+
+# The stock Django pipeline that ran for every request before the API
+# paths were exempted from the session based middleware.
+FULL_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+class Command(BaseCommand):
+    """Compare EventViewSet.list latency with the full and lean pipelines.
+
+    A throwaway staff user and token are created inside a transaction that
+    is rolled back once the benchmark finishes.
+    """
+    help = 'Benchmark per-request middleware overhead on the event list API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=2000,
+            help='Number of timed requests per pipeline.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=100,
+            help='Untimed requests sent before each run.'
+        )
+
+    def time_requests(self, middleware, token, url, count, warmup):
+        """Return the mean milliseconds per request for a pipeline."""
+        with override_settings(
+            MIDDLEWARE=middleware,
+            ALLOWED_HOSTS=['testserver'],
+        ):
+            client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+            for _ in range(warmup):
+                client.get(url)
+            start = time.perf_counter()
+            for _ in range(count):
+                client.get(url)
+            elapsed = time.perf_counter() - start
+
+        return elapsed * 1000 / count
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        url = reverse('event:event-list')
+        count = options['requests']
+        warmup = options['warmup']
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email='middleware-benchmark@example.com',
+                password=None,
+                is_staff=True,
+            )
+            token = Token.objects.create(user=user).key
+
+            full = self.time_requests(
+                FULL_MIDDLEWARE, token, url, count, warmup
+            )
+            lean = self.time_requests(
+                settings.MIDDLEWARE, token, url, count, warmup
+            )
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'GET {url} x {count}')
+        self.stdout.write(f'Full middleware pipeline: {full:.3f} ms/request')
+        self.stdout.write(f'Lean API pipeline:        {lean:.3f} ms/request')
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {full - lean:.3f} ms/request '
+            f'({(full - lean) / full * 100:.1f}%)'
+        ))
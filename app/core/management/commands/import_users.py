@@ -0,0 +1,66 @@
+"""
+Django command to import a staff list of users from a CSV file.
+"""
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bulk import bulk_import_users
+
+
+class Command(BaseCommand):
+    """Bulk import users (and doctor profiles) from a CSV file.
+
+    The CSV needs ``email`` and ``password`` columns and may add
+    ``firstname``, ``surname``, ``phone_number``, ``is_staff``,
+    ``practice_number``, ``comments`` and ``is_verified``.
+    """
+    help = 'Bulk import users from a CSV file, hashing passwords in parallel.'
+
+    BOOLEAN_COLUMNS = ('is_staff', 'is_verified')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', help='Path to the CSV staff list.')
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Password hashing processes (defaults to the CPU count).'
+        )
+
+    def read_rows(self, path):
+        """Read the CSV file into import rows, dropping empty values."""
+        try:
+            with open(path, newline='', encoding='utf-8') as handle:
+                rows = []
+                for record in csv.DictReader(handle):
+                    row = {
+                        k: v for k, v in record.items()
+                        if v not in ('', None)
+                    }
+                    for column in self.BOOLEAN_COLUMNS:
+                        if column in row:
+                            row[column] = row[column].strip().lower() in (
+                                '1', 'true', 'yes', 'y'
+                            )
+                    if 'practice_number' in row:
+                        row['practice_number'] = int(row['practice_number'])
+                    rows.append(row)
+                return rows
+        except OSError as exc:
+            raise CommandError(f'Unable to read {path}: {exc}')
+        except ValueError as exc:
+            raise CommandError(f'Invalid practice number in {path}: {exc}')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rows = self.read_rows(options['csv_file'])
+        self.stdout.write(f'Importing {len(rows)} users.')
+        try:
+            result = bulk_import_users(rows, processes=options['processes'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['users']} users "
+            f"({result['doctors']} doctors) in {result['seconds']}s "
+            f"- {result['users_per_second']} users/s"
+        ))
@@ -0,0 +1,67 @@
+"""
+Path aware middleware for the token authenticated API.
+
+The API authenticates every request with a token, so the session, CSRF,
+auth and message middleware only do useful work for the admin. These
+subclasses skip themselves for paths under ``settings.API_PATH_PREFIXES``
+and behave exactly like their Django parents everywhere else.
+
+ReplicaPinMiddleware runs for every request, so a write through any view
+or the admin pins its user to the primary database.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+from core.routers import track_writes
+
+
+def is_api_request(request):
+    """Return True if the request targets a token authenticated API path."""
+    prefixes = getattr(settings, 'API_PATH_PREFIXES', ('/api/',))
+    return request.path_info.startswith(tuple(prefixes))
+
+
+class SkipForAPIMixin:
+    """Bypass the wrapped middleware entirely for API requests."""
+
+    def __call__(self, request):
+        if is_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class AdminSessionMiddleware(SkipForAPIMixin, SessionMiddleware):
+    """Session middleware that leaves API requests session-less."""
+
+
+class AdminCsrfViewMiddleware(SkipForAPIMixin, CsrfViewMiddleware):
+    """CSRF middleware that ignores token authenticated API requests."""
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_api_request(request):
+            return None
+        return super().process_view(
+            request, callback, callback_args, callback_kwargs
+        )
+
+
+class AdminAuthenticationMiddleware(SkipForAPIMixin, AuthenticationMiddleware):
+    """Session based authentication for the admin only."""
+
+
+class AdminMessageMiddleware(SkipForAPIMixin, MessageMiddleware):
+    """Message storage for the admin only."""
+
+
+class ReplicaPinMiddleware:
+    """Pin users who write to the primary, see core.routers."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with track_writes(request):
+            return self.get_response(request)
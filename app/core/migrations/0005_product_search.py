@@ -0,0 +1,105 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:01
+"""
+Full-text search for products.
+
+PostgreSQL stores a tsvector on each product behind a GIN index. SQLite
+keeps the searchable text in an FTS5 table keyed by the product id.
+"""
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat, Substr
+
+
+# A frozen copy of core.search's index format, so later changes to that
+# module leave this migration alone
+PRODUCT_FTS_TABLE = 'core_product_fts'
+
+PRODUCT_SEARCH_CONFIG = 'english'
+
+
+def digimed_text():
+    catalogue_id = Cast('catalogue_id', output_field=CharField())
+    return Concat(
+        Substr(catalogue_id, 1, 2), Value(' '),
+        Substr(catalogue_id, 3, 3), Value(' '),
+        Substr(catalogue_id, 6), Value(' '),
+        catalogue_id,
+        output_field=CharField(),
+    )
+
+
+def populate_product_search(products, connection):
+    if connection.vendor == 'postgresql':
+        products.update(search_vector=(
+            SearchVector(
+                digimed_text(), weight='A', config=PRODUCT_SEARCH_CONFIG
+            )
+            + SearchVector(
+                'item_type', weight='B', config=PRODUCT_SEARCH_CONFIG
+            )
+            + SearchVector(
+                'description', weight='C', config=PRODUCT_SEARCH_CONFIG
+            )
+        ))
+        return
+    rows = list(
+        products.annotate(digimed=digimed_text())
+        .values_list('pk', 'description', 'item_type', 'digimed')
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {PRODUCT_FTS_TABLE} '
+            f'(rowid, description, item_type, digimed) '
+            f'VALUES (%s, %s, %s, %s)',
+            rows,
+        )
+
+
+def create_product_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS core_product_search_vector_gin '
+            'ON core_product USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        # Prefix indexes keep the 'word*' queries fast.
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCT_FTS_TABLE} '
+            f"USING fts5(description, item_type, digimed, prefix='2 3')"
+        )
+    else:
+        return
+    Product = apps.get_model('core', 'Product')
+    populate_product_search(
+        Product.objects.using(schema_editor.connection.alias).all(),
+        schema_editor.connection,
+    )
+
+
+def drop_product_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS core_product_search_vector_gin'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {PRODUCT_FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_product_search, drop_product_search),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:04
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_product_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='digimed_id',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.functions.text.Concat(django.db.models.functions.text.Substr(django.db.models.functions.comparison.Cast('catalogue_id', models.CharField()), 1, 2), models.Value('-'), django.db.models.functions.text.Substr(django.db.models.functions.comparison.Cast('catalogue_id', models.CharField()), 3, 3), models.Value('-'), django.db.models.functions.text.Substr(django.db.models.functions.comparison.Cast('catalogue_id', models.CharField()), 6)), output_field=models.CharField(max_length=16), verbose_name='Digimed ID'),
+        ),
+    ]
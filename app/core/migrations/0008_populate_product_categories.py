@@ -0,0 +1,51 @@
+"""
+Move the nested Product.TYPE_CHOICES into the category lookup tables
+and point every product at its subtype and category.
+"""
+from django.db import migrations
+
+
+# Product.TYPE_CHOICES when the lookup tables were introduced
+CATEGORIES = {
+    'Plates': ('Plate', 'Titanium Mesh'),
+    'Instruments': (
+        'Scissors', 'Drill', 'Screwdriver', 'Screwdriver Holding Device',
+    ),
+    'Containers': ('Container', 'Rack', 'Tray'),
+    'Other': ('Screw',),
+}
+
+
+def populate_categories(apps, schema_editor):
+    ProductCategory = apps.get_model('core', 'ProductCategory')
+    ProductSubtype = apps.get_model('core', 'ProductSubtype')
+    Product = apps.get_model('core', 'Product')
+
+    for category_name, subtype_names in CATEGORIES.items():
+        category, _ = ProductCategory.objects.get_or_create(
+            name=category_name
+        )
+        for subtype_name in subtype_names:
+            subtype, _ = ProductSubtype.objects.get_or_create(
+                name=subtype_name, defaults={'category': category}
+            )
+            # One UPDATE per subtype rather than saving each product
+            Product.objects.filter(item_type=subtype_name).update(
+                subtype=subtype, category=subtype.category_id
+            )
+
+
+def clear_categories(apps, schema_editor):
+    Product = apps.get_model('core', 'Product')
+    Product.objects.update(subtype=None, category=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_product_categories'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_categories, clear_categories),
+    ]
@@ -6,7 +6,9 @@ import uuid
 from functools import partial
 from django.db import models
 from django.db.models import Q
+from django.db.models.functions import Cast, Concat, Substr
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -152,6 +154,40 @@ class Doctor(models.Model):
         super().save(*args, **kwargs)
 
     
+def format_digimed(catalogue_id):
+    """Format a catalogue ID as a Digimed ID, e.g. ``12-345-678``."""
+    str_id = str(catalogue_id)
+    return f'{str_id[:2]}-{str_id[2:5]}-{str_id[5:]}'
+
+
+class ProductCategory(models.Model):
+    """Top level product category, e.g. Plates or Instruments"""
+    name = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        verbose_name_plural = "Product Categories"
+        ordering = ('name',)
+
+    def __str__(self):
+        return self.name
+
+
+class ProductSubtype(models.Model):
+    """Product type within a category, e.g. Titanium Mesh"""
+    category = models.ForeignKey(
+        ProductCategory,
+        on_delete=models.PROTECT,
+        related_name='subtypes',
+    )
+    name = models.CharField(max_length=64, unique=True)
+
+    class Meta:
+        ordering = ('category__name', 'name')
+
+    def __str__(self):
+        return f"{self.category.name} - {self.name}"
+
+
 class Product(models.Model):
     TYPE_CHOICES = {
         "Plates": {
@@ -178,7 +214,23 @@ class Product(models.Model):
     """Items allocated for each procedure"""
     catalogue_id = models.IntegerField()
     profile = models.DecimalField(max_digits=4, decimal_places=1) 
-    item_type = models.TextField(choices=TYPE_CHOICES) # normalize
+    # Kept in step with subtype for older clients, see save()
+    item_type = models.TextField(choices=TYPE_CHOICES)
+    category = models.ForeignKey(
+        ProductCategory,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='products',
+    )
+    subtype = models.ForeignKey(
+        ProductSubtype,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='products',
+    )
     description = models.TextField()
     base_price = models.DecimalField(max_digits=8, decimal_places=2)
     vat_price = models.DecimalField(max_digits=8, decimal_places=2)
@@ -186,12 +238,76 @@ class Product(models.Model):
         null=True, 
         upload_to=partial(model_image_file_path, model='product')
     )
+    # Full-text search document on PostgreSQL, kept up to date by
+    # core.signals. SQLite indexes products in an FTS5 table instead.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # The formatted Digimed ID, computed and stored by the database so
+    # scans and sorting use the index instead of formatting in Python.
+    digimed_id = models.GeneratedField(
+        expression=Concat(
+            Substr(Cast('catalogue_id', models.CharField()), 1, 2),
+            models.Value('-'),
+            Substr(Cast('catalogue_id', models.CharField()), 3, 3),
+            models.Value('-'),
+            Substr(Cast('catalogue_id', models.CharField()), 6),
+        ),
+        output_field=models.CharField(max_length=16),
+        db_persist=True,
+        db_index=True,
+        verbose_name='Digimed ID',
+    )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        product._saved_type = product._type_fields()
+        return product
+
+    def _type_fields(self):
+        return (
+            self.__dict__.get('subtype_id'),
+            self.__dict__.get('item_type'),
+            self.__dict__.get('category_id'),
+        )
+
+    def save(self, *args, **kwargs):
+        """Keep the subtype, its category and item_type in step.
+
+        Products saved with only an item_type, or whose item_type
+        changed while the subtype did not, pick up the matching subtype.
+        Otherwise the subtype decides the item_type. The category is
+        copied from the subtype so category filters read a single
+        indexed column. Saves leaving all three unchanged skip the
+        subtype lookup.
+        """
+        if self._type_fields() != getattr(self, '_saved_type', None):
+            self._sync_subtype()
+        super().save(*args, **kwargs)
+        self._saved_type = self._type_fields()
+
+    def _sync_subtype(self):
+        saved_subtype_id, saved_item_type, _ = getattr(
+            self, '_saved_type', (None, None, None)
+        )
+        if self.item_type and (
+            self.subtype_id is None
+            or (
+                self.item_type != saved_item_type
+                and self.subtype_id == saved_subtype_id
+            )
+        ):
+            self.subtype = ProductSubtype.objects.filter(
+                name=self.item_type
+            ).first()
+        if self.subtype_id is not None:
+            self.item_type = self.subtype.name
+            self.category_id = self.subtype.category_id
+        else:
+            self.category = None
 
     def get_digimed(self):
-        str_id = str(self.catalogue_id)
-        digimed_id = f'{str_id[:2]}-{str_id[2:5]}-{str_id[5:]}'
-        return digimed_id
+        """Format the Digimed ID, also for products not saved yet."""
+        return format_digimed(self.catalogue_id)
 
     def __str__(self):
         digimed_id = self.get_digimed()
@@ -0,0 +1,97 @@
+"""
+Pagination for large admin changelists.
+
+Counting every row of a big table on each changelist page can take
+longer than fetching the page itself. On PostgreSQL these helpers trust
+the planner's row estimate once it passes
+``settings.ADMIN_ESTIMATED_COUNT_THRESHOLD`` and only count exactly
+below it. Other databases always count exactly.
+"""
+import json
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset):
+    """
+    Return the PostgreSQL planner's row estimate for a queryset.
+
+    Unfiltered querysets read ``pg_class.reltuples``, anything else asks
+    ``EXPLAIN`` for the planned row count.
+
+    Args:
+        queryset (QuerySet): The queryset to estimate.
+
+    Returns:
+        int: The estimated row count, or None if no estimate is available.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    if not queryset.query.where and not queryset.query.distinct:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table is first vacuumed or analyzed.
+        if row and row[0] >= 0:
+            return int(row[0])
+
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def fast_count(queryset):
+    """Return the estimate above the threshold, an exact count below it."""
+    estimate = estimate_count(queryset)
+    if (
+        estimate is not None
+        and estimate >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+    ):
+        return estimate
+    return queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the planner's estimate for large querysets."""
+
+    @cached_property
+    def count(self):
+        return fast_count(self.object_list)
+
+
+class EstimatedCountChangeList(ChangeList):
+    """Changelist that shows an estimated total instead of counting it."""
+
+    def get_results(self, request):
+        super().get_results(request)
+
+        if self.has_active_filters or self.query:
+            full_result_count = fast_count(self.root_queryset)
+        else:
+            # Nothing filters the rows, the page count is the total.
+            full_result_count = self.result_count
+
+        self.full_result_count = full_result_count
+        self.show_full_result_count = True
+        self.show_admin_actions = bool(full_result_count)
+
+
+class EstimatedCountAdminMixin:
+    """Use estimated counts for both changelist totals.
+
+    ``show_full_result_count`` stays off so Django never runs the exact
+    total count, the changelist fills the total in from the estimate.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return EstimatedCountChangeList
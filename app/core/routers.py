@@ -0,0 +1,120 @@
+"""
+Database routing for read replicas.
+
+Reads are only sent to a replica inside a ``replica_reads`` block, which
+the list and report API views open once the user is authenticated.
+Everything else, including the admin, keeps reading from the primary.
+Any write made by an authenticated user pins them to the primary for
+``settings.REPLICA_STICKY_SECONDS`` so they always read their own writes:
+inside a ``replica_reads`` block, or anywhere in a request wrapped by
+``track_writes``, which core.middleware.ReplicaPinMiddleware opens for
+every request.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+@dataclass
+class RoutingState:
+    """Routing decisions for the current request."""
+    user_id: int = None
+    use_replica: bool = False
+    pinned: bool = False
+    request: object = None
+
+    def writer_id(self):
+        """Return the id of the user the writes are made for, if any."""
+        if self.user_id:
+            return self.user_id
+        # Read at write time, API views only authenticate inside the view
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user.pk
+        return None
+
+
+_routing_state = ContextVar('replica_routing_state', default=None)
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Send the user's reads to the primary for the stickiness window."""
+    cache.set(
+        _pin_key(user_id), True, timeout=settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def is_pinned(user_id):
+    """Return True if the user wrote within the stickiness window."""
+    return bool(cache.get(_pin_key(user_id)))
+
+
+@contextmanager
+def replica_reads(user=None, use_replica=True):
+    """
+    Route the reads made in this block to a replica.
+
+    Args:
+        user (User, optional): The user the reads are made for. Users who
+            wrote recently keep reading from the primary.
+        use_replica (bool): False only tracks writes for stickiness.
+    """
+    user_id = getattr(user, 'pk', None)
+    state = RoutingState(
+        user_id=user_id,
+        use_replica=use_replica and not (user_id and is_pinned(user_id)),
+    )
+    token = _routing_state.set(state)
+    try:
+        yield state
+    finally:
+        _routing_state.reset(token)
+
+
+@contextmanager
+def track_writes(request):
+    """Pin the user the request is authenticated as once it writes."""
+    token = _routing_state.set(RoutingState(request=request))
+    try:
+        yield
+    finally:
+        _routing_state.reset(token)
+
+
+class ReplicaRouter:
+    """Send flagged reads to a replica and every write to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _routing_state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or not state.use_replica or not replicas:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _routing_state.get()
+        if state is not None and not state.pinned:
+            user_id = state.writer_id()
+            if user_id:
+                pin_to_primary(user_id)
+                state.pinned = True
+                state.use_replica = False
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas hold the same data as the primary."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Replicas receive their schema from the primary."""
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,240 @@
+"""
+Indexed text search shared by the admin and the API.
+
+On PostgreSQL every word is matched with ``icontains``, which the
+``pg_trgm`` GIN indexes on ``UPPER(column)`` serve without a sequential
+scan. Other databases fall back to a prefix-only ``istartswith`` match,
+which SQLite serves from ``COLLATE NOCASE`` indexes.
+
+Products additionally get ranked full-text search, see
+``search_products``.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import CharField, F, Q, Value
+from django.db.models.functions import Cast, Concat, Substr
+from django.utils.text import smart_split, unescape_string_literal
+
+from rest_framework.filters import BaseFilterBackend
+
+
+def search_lookup(queryset):
+    """Return the indexed lookup used for the queryset's database."""
+    if connections[queryset.db].vendor == 'postgresql':
+        return 'icontains'
+    return 'istartswith'
+
+
+def search_queryset(queryset, search_fields, search_term):
+    """
+    Filter a queryset to rows where every word matches a search field.
+
+    Args:
+        queryset (QuerySet): The queryset to filter.
+        search_fields (iterable): Field paths to match, e.g.
+            ``event__doctor__user__surname``.
+        search_term (str): The words to look for.
+
+    Returns:
+        QuerySet: The filtered queryset.
+    """
+    search_fields = list(search_fields)
+    if not search_fields or not search_term:
+        return queryset
+
+    lookup = search_lookup(queryset)
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        queryset = queryset.filter(reduce(operator.or_, (
+            Q(**{f'{field}__{lookup}': bit}) for field in search_fields
+        )))
+    return queryset
+
+
+class IndexedSearchAdminMixin:
+    """Admin search over ``search_fields`` using the indexed lookups."""
+
+    def get_search_results(self, request, queryset, search_term):
+        queryset = search_queryset(
+            queryset, self.get_search_fields(request), search_term
+        )
+        return queryset, False
+
+
+class IndexedSearchFilter(BaseFilterBackend):
+    """API ``?search=`` filter over the view's ``search_fields``."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        search_term = request.query_params.get(self.search_param, '')
+        return search_queryset(
+            queryset, getattr(view, 'search_fields', ()), search_term
+        )
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Words matched against the searchable fields.',
+            'schema': {'type': 'string'},
+        }]
+
+
+# Product full-text search
+#
+# PostgreSQL stores a weighted tsvector in Product.search_vector, served
+# by a GIN index. SQLite keeps the same text in the core_product_fts FTS5
+# table, keyed by the product id. Either way every search word matches
+# the start of an indexed word and results come back best match first.
+
+PRODUCT_FTS_TABLE = 'core_product_fts'
+
+PRODUCT_SEARCH_CONFIG = 'english'
+
+WORD_RE = re.compile(r'\w+')
+
+# A complete formatted Digimed ID, looked up exactly in its own index
+DIGIMED_RE = re.compile(r'\d{2}-\d{3}-\d+')
+
+
+def digimed_text():
+    """
+    Return the Digimed ID of each product as separate search words.
+
+    ``12345678`` is indexed as ``12 345 678 12345678``, so both the
+    formatted ID (``12-345-678``) and the plain catalogue ID are found.
+    """
+    catalogue_id = Cast('catalogue_id', output_field=CharField())
+    return Concat(
+        Substr(catalogue_id, 1, 2), Value(' '),
+        Substr(catalogue_id, 3, 3), Value(' '),
+        Substr(catalogue_id, 6), Value(' '),
+        catalogue_id,
+        output_field=CharField(),
+    )
+
+
+def product_search_vector():
+    """Return the weighted search vector expression for products."""
+    return (
+        SearchVector(
+            digimed_text(), weight='A', config=PRODUCT_SEARCH_CONFIG
+        )
+        + SearchVector(
+            'item_type', weight='B', config=PRODUCT_SEARCH_CONFIG
+        )
+        + SearchVector(
+            'description', weight='C', config=PRODUCT_SEARCH_CONFIG
+        )
+    )
+
+
+def update_product_search(products):
+    """
+    Refresh the full-text index for the given products.
+
+    Args:
+        products (QuerySet): The products to index.
+    """
+    connection = connections[products.db]
+    if connection.vendor == 'postgresql':
+        products.update(search_vector=product_search_vector())
+    elif connection.vendor == 'sqlite':
+        rows = list(
+            products.annotate(digimed=digimed_text())
+            .values_list('pk', 'description', 'item_type', 'digimed')
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {PRODUCT_FTS_TABLE} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {PRODUCT_FTS_TABLE} '
+                f'(rowid, description, item_type, digimed) '
+                f'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+
+def remove_product_search(product_ids, using='default'):
+    """Drop deleted products from the SQLite FTS5 table."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {PRODUCT_FTS_TABLE} WHERE rowid = %s',
+            [(pk,) for pk in product_ids],
+        )
+
+
+def search_products(queryset, search_term):
+    """
+    Filter products by full-text search, best matches first.
+
+    Args:
+        queryset (QuerySet): The products to search.
+        search_term (str): The words to look for, each one matching the
+            start of a word in the description, item type or Digimed ID.
+            A complete Digimed ID is looked up exactly instead.
+
+    Returns:
+        QuerySet: The matching products ordered by descending rank.
+    """
+    search_term = search_term.strip()
+    if DIGIMED_RE.fullmatch(search_term):
+        return queryset.filter(digimed_id=search_term)
+
+    words = WORD_RE.findall(search_term.lower())
+    if not words:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            ' & '.join(f'{word}:*' for word in words),
+            search_type='raw',
+            config=PRODUCT_SEARCH_CONFIG,
+        )
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', 'pk')
+
+    if vendor == 'sqlite':
+        # The FTS5 table has no model, join it in directly. bm25 scores
+        # lower for better matches, the column weights mirror A, B, C.
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.extra(
+            tables=[PRODUCT_FTS_TABLE],
+            where=[
+                f'{PRODUCT_FTS_TABLE}.rowid = core_product.id',
+                f'{PRODUCT_FTS_TABLE} MATCH %s',
+            ],
+            params=[match],
+            select={
+                'rank': f'-bm25({PRODUCT_FTS_TABLE}, 0.2, 0.4, 1.0)',
+            },
+        ).order_by('-rank', 'pk')
+
+    return search_queryset(
+        queryset, ('description', 'item_type'), search_term
+    ).order_by('catalogue_id')
+
+
+class ProductSearchFilter(IndexedSearchFilter):
+    """API ``?search=`` filter ranking products by full-text match."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_term = request.query_params.get(self.search_param, '')
+        return search_products(queryset, search_term)
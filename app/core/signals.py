@@ -0,0 +1,57 @@
+"""
+Signals keeping the product full-text index and the cached catalogue
+data in sync.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_cache_version
+from .models import (
+    Hospital, Product, ProductCategory, ProductSubtype,
+    Tray, TrayItem, TrayType,
+)
+from .search import remove_product_search, update_product_search
+
+
+# Cache namespace (see core.cache) bumped when each model changes
+CACHE_NAMESPACES = {
+    Product: 'products',
+    TrayType: 'tray_types',
+    TrayItem: 'tray_types',
+    Tray: 'trays',
+    Hospital: 'hospitals',
+    ProductCategory: 'categories',
+    ProductSubtype: 'categories',
+}
+
+
+def bump_namespace(sender, using, **kwargs):
+    """Bump the model's cache version once the write commits.
+
+    Bumping before the commit would let a concurrent request cache the
+    old rows under the new version.
+    """
+    transaction.on_commit(
+        partial(bump_cache_version, CACHE_NAMESPACES[sender]), using=using
+    )
+
+
+for model in CACHE_NAMESPACES:
+    uid = f'bump-cache-version-{model.__name__}'
+    post_save.connect(bump_namespace, sender=model, dispatch_uid=uid)
+    post_delete.connect(bump_namespace, sender=model, dispatch_uid=uid)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, using, **kwargs):
+    update_product_search(
+        Product.objects.using(using).filter(pk=instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using, **kwargs):
+    remove_product_search([instance.pk], using=using)
@@ -2,9 +2,14 @@
 Test module for django admin modifications.
 """
 
+from decimal import Decimal
+
 from django.urls import reverse
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from core.models import Product
 
 
 class AdminSiteTests(TestCase): 
@@ -45,3 +50,44 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
 
+
+class ProductAdminTests(TestCase):
+    """Tests for the product admin filters."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        defaults = {
+            'profile': Decimal('1.0'),
+            'description': 'A test product',
+            'base_price': Decimal('10.00'),
+            'vat_price': Decimal('11.50'),
+        }
+        self.plate = Product.objects.create(
+            catalogue_id=10000001, item_type='Plate', **defaults
+        )
+        self.drill = Product.objects.create(
+            catalogue_id=10000002, item_type='Drill', **defaults
+        )
+
+    def test_filter_by_subtype(self):
+        """Test the item type filter uses the subtype id."""
+        url = reverse('admin:core_product_changelist')
+
+        res = self.client.get(url, {'subtype': self.plate.subtype_id})
+
+        self.assertEqual(list(res.context['cl'].result_list), [self.plate])
+        self.assertContains(res, 'Plates - Titanium Mesh')
+
+    def test_filter_by_category(self):
+        """Test the category filter uses the category id."""
+        url = reverse('admin:core_product_changelist')
+
+        res = self.client.get(url, {'category': self.drill.category_id})
+
+        self.assertEqual(list(res.context['cl'].result_list), [self.drill])
@@ -0,0 +1,66 @@
+"""
+Tests for the versioned cache keys.
+"""
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import (
+    bump_cache_version,
+    cache_timeout,
+    cache_version,
+    versioned_key,
+)
+
+
+class VersionedCacheTests(SimpleTestCase):
+    """Test namespace versions invalidate cached entries."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_stable(self):
+        """Test the version only changes when bumped."""
+        self.assertEqual(cache_version('things'), cache_version('things'))
+
+    def test_bump_changes_keys(self):
+        """Test bumping moves the namespace to new keys."""
+        before = versioned_key('things', 'list')
+        bump_cache_version('things')
+
+        self.assertNotEqual(versioned_key('things', 'list'), before)
+        self.assertEqual(
+            cache_version('things'), int(before.split(':')[1]) + 1
+        )
+
+    def test_bump_only_affects_namespace(self):
+        """Test other namespaces keep their keys."""
+        other = versioned_key('others', 'list')
+        bump_cache_version('things')
+
+        self.assertEqual(versioned_key('others', 'list'), other)
+
+    def test_evicted_version_does_not_reuse_keys(self):
+        """Test a lost version restarts above the old one."""
+        before = cache_version('things')
+        cache.clear()
+
+        self.assertGreater(cache_version('things'), before)
+
+
+class CacheTimeoutTests(SimpleTestCase):
+    """Test versioned entries are kept briefly in a per-process cache."""
+
+    @override_settings(LOCAL_CACHE_SECONDS=30)
+    def test_local_cache_capped(self):
+        """Test the local memory cache keeps entries 30 seconds at most."""
+        self.assertEqual(cache_timeout(24 * 60 * 60), 30)
+        self.assertEqual(cache_timeout(None), 30)
+        self.assertEqual(cache_timeout(10), 10)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }})
+    def test_shared_cache_keeps_timeout(self):
+        """Test other backends keep the requested timeout."""
+        self.assertEqual(cache_timeout(24 * 60 * 60), 24 * 60 * 60)
+        self.assertIsNone(cache_timeout(None))
@@ -1,10 +1,19 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import skipIf, skipUnless
 from unittest.mock import patch
 
-from psycopg2 import OperationalError as Psycopg2Error
+from psycopg import OperationalError as PsycopgError
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Doctor
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -26,8 +35,8 @@ class CommandTests(SimpleTestCase):
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         """Test waiting for database when encountering connection errors."""
 
-        # Simulate database connection errors followed by a successful connection
-        patched_check.side_effect = [Psycopg2Error] * 2 + \
+        # Simulate connection errors followed by a successful connection
+        patched_check.side_effect = [PsycopgError] * 2 + \
             [OperationalError] * 3 + [True]
 
         # Call the management command to wait for the database
@@ -39,3 +48,62 @@ class CommandTests(SimpleTestCase):
         # Assert that the final call was made with the default database
         patched_check.assert_called_with(databases=['default'])
 
+
+class ImportUsersCommandTests(TestCase):
+    """Test the import_users command."""
+
+    def test_import_users_from_csv(self):
+        """Test importing a CSV staff list creates users and doctors."""
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as csv_file:
+            csv_file.write(
+                'email,password,firstname,surname,practice_number,'
+                'is_verified\n'
+                'one@example.com,testpass123,One,User,,\n'
+                'two@example.com,testpass123,Two,User,7788,true\n'
+            )
+        self.addCleanup(os.remove, csv_file.name)
+        out = StringIO()
+
+        call_command('import_users', csv_file.name, processes=1, stdout=out)
+
+        self.assertIn('Imported 2 users (1 doctors)', out.getvalue())
+        doctor = Doctor.objects.get(practice_number=7788)
+        self.assertTrue(doctor.is_verified)
+        self.assertTrue(doctor.user.check_password('testpass123'))
+
+    def test_import_users_existing_email_error(self):
+        """Test importing an existing email raises a command error."""
+        get_user_model().objects.create_user('one@example.com', 'test123')
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', delete=False
+        ) as csv_file:
+            csv_file.write('email,password\none@example.com,testpass123\n')
+        self.addCleanup(os.remove, csv_file.name)
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'import_users', csv_file.name,
+                processes=1, stdout=StringIO()
+            )
+
+
+class BenchmarkDbConnectionsCommandTests(TestCase):
+    """Test the benchmark_db_connections command."""
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL.')
+    def test_benchmark_reports_both_modes(self):
+        """Test the benchmark times direct and pooled connections."""
+        out = StringIO()
+
+        call_command('benchmark_db_connections', cycles=3, stdout=out)
+
+        self.assertIn('New connection per cycle', out.getvalue())
+        self.assertIn('Pooled connection', out.getvalue())
+
+    @skipIf(connection.vendor == 'postgresql', 'Runs without PostgreSQL.')
+    def test_benchmark_requires_postgres(self):
+        """Test the benchmark refuses to run against other databases."""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_db_connections', cycles=1)
@@ -0,0 +1,78 @@
+"""
+Tests for the path aware API middleware.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+
+EVENTS_URL = reverse('event:event-list')
+
+
+class APIMiddlewareTests(TestCase):
+    """Test session based middleware only runs outside the API."""
+
+    def setUp(self):
+        self.staff_user = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='testpass123',
+            is_staff=True,
+            is_superuser=True,
+        )
+        self.token = Token.objects.create(user=self.staff_user)
+
+    def test_api_request_skips_session_middleware(self):
+        """Test API requests get no session, messages or CSRF cookie."""
+        client = Client(enforce_csrf_checks=True)
+
+        res = client.get(
+            EVENTS_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(hasattr(res.wsgi_request, 'session'))
+        self.assertFalse(hasattr(res.wsgi_request, '_messages'))
+        self.assertNotIn('sessionid', res.cookies)
+
+    def test_api_post_not_blocked_by_csrf(self):
+        """Test token authenticated writes skip the CSRF middleware."""
+        client = Client(enforce_csrf_checks=True)
+
+        res = client.post(
+            EVENTS_URL, {},
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+        self.assertEqual(res.status_code, 400)
+
+    def test_admin_keeps_session_middleware(self):
+        """Test the admin still uses sessions and CSRF protection."""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.staff_user)
+
+        res = client.get(reverse('admin:index'))
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(hasattr(res.wsgi_request, 'session'))
+        self.assertEqual(res.wsgi_request.user, self.staff_user)
+
+        res = client.post(reverse('admin:logout'))
+        self.assertEqual(res.status_code, 403)
+
+    def test_benchmark_middleware_command(self):
+        """Test the benchmark reports both pipelines."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_middleware', requests=5, warmup=1, stdout=out
+        )
+
+        self.assertIn('Full middleware pipeline', out.getvalue())
+        self.assertIn('Lean API pipeline', out.getvalue())
+        self.assertFalse(get_user_model().objects.filter(
+            email='middleware-benchmark@example.com'
+        ).exists())
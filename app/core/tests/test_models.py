@@ -9,11 +9,13 @@ from decimal import Decimal
 from django.urls import reverse
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 from datetime import timezone
 
 from core.models import (
-    Hospital, Doctor, Product, 
+    Hospital, Doctor, Product, ProductSubtype,
     TrayType, TrayItem, Tray,
     model_image_file_path, 
 )
@@ -270,6 +272,94 @@ class ModelAdminTests(TestCase):
         product_str = f'{product.item_type} ({digimed_id})'
         self.assertEqual(str(product), product_str)
 
+    def test_product_subtype_from_item_type(self):
+        """Test a product saved with an item type gets its subtype."""
+        product = Product.objects.create(
+            catalogue_id=123456,
+            profile=0.1,
+            item_type='Titanium Mesh',
+            description='A test product',
+            base_price=Decimal('100.00'),
+            vat_price=Decimal('115.00'),
+        )
+
+        self.assertEqual(product.subtype.name, 'Titanium Mesh')
+        self.assertEqual(product.category.name, 'Plates')
+
+    def test_product_subtype_sets_item_type(self):
+        """Test changing the subtype updates item type and category."""
+        product = Product.objects.create(
+            catalogue_id=123456,
+            profile=0.1,
+            item_type='Plate',
+            description='A test product',
+            base_price=Decimal('100.00'),
+            vat_price=Decimal('115.00'),
+        )
+        product.subtype = ProductSubtype.objects.get(name='Drill')
+        product.save()
+        product.refresh_from_db()
+
+        self.assertEqual(product.item_type, 'Drill')
+        self.assertEqual(product.category.name, 'Instruments')
+
+    def test_product_item_type_moves_subtype(self):
+        """Test an older client changing item type moves the subtype."""
+        Product.objects.create(
+            catalogue_id=123456,
+            profile=0.1,
+            item_type='Plate',
+            description='A test product',
+            base_price=Decimal('100.00'),
+            vat_price=Decimal('115.00'),
+        )
+        product = Product.objects.get()
+        product.item_type = 'Drill'
+        product.save()
+        product.refresh_from_db()
+
+        self.assertEqual(product.item_type, 'Drill')
+        self.assertEqual(product.subtype.name, 'Drill')
+        self.assertEqual(product.category.name, 'Instruments')
+
+    def test_product_save_skips_subtype_lookup(self):
+        """Test saves leaving the item type alone do not read subtypes."""
+        Product.objects.create(
+            catalogue_id=123456,
+            profile=0.1,
+            item_type='Plate',
+            description='A test product',
+            base_price=Decimal('100.00'),
+            vat_price=Decimal('115.00'),
+        )
+        product = Product.objects.get()
+        product.description = 'A renamed product'
+
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+
+        for query in queries:
+            self.assertNotIn('core_productsubtype', query['sql'])
+        self.assertEqual(product.subtype.name, 'Plate')
+
+    def test_product_digimed_id_stored(self):
+        """Test the database stores the formatted Digimed ID."""
+        product = Product.objects.create(
+            catalogue_id=12345678,
+            profile=0.1,
+            item_type='Plate',
+            description='A test product',
+            base_price=Decimal('100.00'),
+            vat_price=Decimal('115.00'),
+        )
+        product.refresh_from_db()
+
+        self.assertEqual(product.digimed_id, '12-345-678')
+        self.assertEqual(product.digimed_id, product.get_digimed())
+        self.assertEqual(
+            Product.objects.get(digimed_id='12-345-678'), product
+        )
+
     def test_create_tray_type(self):
         """Test creating a tray type is successful"""
         tray_type = TrayType.objects.create(
@@ -0,0 +1,129 @@
+"""
+Tests for the estimated count admin pagination.
+"""
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Hospital
+from core.pagination import EstimatedCountPaginator, estimate_count
+from event.models import Procedure
+from event.tests.helper_for_event_tests import create_procedures_buffed
+
+
+PROCEDURES_URL = reverse('admin:event_procedure_changelist')
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    """Test the paginator switches between exact and estimated counts."""
+
+    def setUp(self):
+        for index in range(3):
+            Hospital.objects.create(
+                name=f'Hospital {index}', street='1 Main St', city='City',
+                state='State', postal_code='12345', country='US',
+            )
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    @patch('core.pagination.estimate_count', return_value=250000)
+    def test_estimate_used_above_threshold(self, patched_estimate):
+        """Test large estimates are used without counting."""
+        paginator = EstimatedCountPaginator(
+            Hospital.objects.order_by('name'), 2
+        )
+
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.count, 250000)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    @patch('core.pagination.estimate_count', return_value=20)
+    def test_exact_count_below_threshold(self, patched_estimate):
+        """Test small tables are counted exactly."""
+        paginator = EstimatedCountPaginator(
+            Hospital.objects.order_by('name'), 2
+        )
+
+        self.assertEqual(paginator.count, 3)
+
+    @skipUnless(connection.vendor != 'postgresql', 'SQLite fallback.')
+    def test_no_estimate_without_postgres(self):
+        """Test other databases fall back to an exact count."""
+        self.assertIsNone(estimate_count(Hospital.objects.all()))
+        paginator = EstimatedCountPaginator(
+            Hospital.objects.order_by('name'), 2
+        )
+        self.assertEqual(paginator.count, 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL.')
+    def test_postgres_estimates(self):
+        """Test the planner estimates tables and filtered querysets."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_hospital')
+
+        self.assertIsNotNone(estimate_count(Hospital.objects.all()))
+        self.assertIsNotNone(
+            estimate_count(Hospital.objects.filter(city='City'))
+        )
+
+
+class EstimatedCountChangelistTests(TestCase):
+    """Test the changelists use estimated totals."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        for _ in range(3):
+            create_procedures_buffed(alt_user=self.admin_user)
+
+    def count_queries(self, url):
+        """Return the COUNT queries run for a changelist page."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return res, [
+            query for query in queries.captured_queries
+            if 'COUNT(' in query['sql'].upper()
+        ]
+
+    def test_unfiltered_changelist_counts_once(self):
+        """Test the unfiltered total reuses the page count."""
+        res, counts = self.count_queries(PROCEDURES_URL)
+
+        cl = res.context['cl']
+        self.assertEqual(cl.result_count, 3)
+        self.assertEqual(cl.full_result_count, 3)
+        self.assertEqual(len(counts), 1)
+
+    def test_filtered_changelist_shows_total(self):
+        """Test a filtered page shows both the result and total counts."""
+        procedure = Procedure.objects.select_related('event__hospital')[0]
+
+        res, counts = self.count_queries(
+            f'{PROCEDURES_URL}?event__hospital__name='
+            f'{procedure.event.hospital.name}'
+        )
+
+        cl = res.context['cl']
+        self.assertEqual(cl.result_count, 1)
+        self.assertEqual(cl.full_result_count, 3)
+        self.assertContains(res, '3 total')
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_THRESHOLD=1000)
+    @patch('core.pagination.estimate_count', return_value=120000)
+    def test_large_changelist_uses_estimate(self, patched_estimate):
+        """Test a large table's changelist skips COUNT(*) entirely."""
+        res, counts = self.count_queries(PROCEDURES_URL)
+
+        cl = res.context['cl']
+        self.assertEqual(cl.result_count, 120000)
+        self.assertEqual(cl.full_result_count, 120000)
+        self.assertEqual(counts, [])
@@ -0,0 +1,208 @@
+"""
+Tests for the read replica database router.
+"""
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.contrib.auth.models import AnonymousUser
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.routers import (
+    ReplicaRouter,
+    is_pinned,
+    pin_to_primary,
+    replica_reads,
+    track_writes,
+)
+from event.models import Event
+from event.tests.helper_for_event_tests import (
+    create_user, create_event, create_random_entities
+)
+
+
+# Any second database alias can stand in for a replica, e.g. one
+# configured through DB_REPLICA_HOSTS with TEST MIRROR set to default.
+REPLICA_ALIAS = next(
+    (alias for alias in settings.DATABASES if alias != 'default'), None
+)
+EVENTS_URL = reverse('event:event-list')
+ME_URL = reverse('user:me')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the routing decisions of the replica router."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        cache.clear()
+
+    def test_reads_use_primary_outside_replica_block(self):
+        """Test reads default to the primary."""
+        self.assertIsNone(self.router.db_for_read(Event))
+
+    def test_reads_use_replica_inside_replica_block(self):
+        """Test flagged reads are sent to one of the replicas."""
+        with replica_reads():
+            self.assertIn(
+                self.router.db_for_read(Event), ['replica_1', 'replica_2']
+            )
+
+    def test_writes_always_use_primary(self):
+        """Test writes go to the primary even inside a replica block."""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Event), 'default')
+
+    def test_write_pins_user_to_primary(self):
+        """Test a write sends the user's later reads to the primary."""
+        user = get_user_model()(pk=41)
+        with replica_reads(user):
+            self.router.db_for_write(Event)
+            self.assertIsNone(self.router.db_for_read(Event))
+
+        with replica_reads(user):
+            self.assertIsNone(self.router.db_for_read(Event))
+
+        with replica_reads(get_user_model()(pk=42)):
+            self.assertIsNotNone(self.router.db_for_read(Event))
+
+    def test_request_write_pins_user(self):
+        """Test a write outside a replica block pins the request's user."""
+        request = RequestFactory().post('/admin/')
+        request.user = get_user_model()(pk=44)
+        with track_writes(request):
+            self.assertEqual(self.router.db_for_write(Event), 'default')
+
+        with replica_reads(request.user):
+            self.assertIsNone(self.router.db_for_read(Event))
+
+    def test_anonymous_write_pins_nobody(self):
+        """Test writes made before authentication pin nobody."""
+        request = RequestFactory().post('/api/user/token/')
+        request.user = AnonymousUser()
+        with track_writes(request):
+            self.router.db_for_write(Event)
+
+        self.assertFalse(is_pinned(None))
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_pin_expires_after_window(self):
+        """Test reads return to the replica after the sticky window."""
+        user = get_user_model()(pk=43)
+        pin_to_primary(user.pk)
+
+        with replica_reads(user):
+            self.assertIsNotNone(self.router.db_for_read(Event))
+
+    def test_no_migrations_on_replicas(self):
+        """Test replicas never receive migrations."""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'event'))
+        self.assertIsNone(self.router.allow_migrate('default', 'event'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test everything uses the primary without replicas."""
+        with replica_reads():
+            self.assertIsNone(self.router.db_for_read(Event))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaPinMiddlewareTests(TestCase):
+    """Test writes through views without ReplicaReadMixin pin the user.
+
+    replica_1 is not a configured database here, so a list request only
+    succeeds when its reads are sent to the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_authenticate(user=self.user)
+
+    def test_write_through_other_view_pins_user(self):
+        """Test a profile update sends the user's next list to the primary."""
+        res = self.client.patch(ME_URL, {'firstname': 'Renamed'})
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(is_pinned(self.user.pk))
+
+        res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, 200)
+
+
+@skipUnless(REPLICA_ALIAS, 'Requires a second database alias.')
+@override_settings(DATABASE_REPLICAS=[REPLICA_ALIAS])
+class ReplicaRoutingApiTests(TransactionTestCase):
+    """Test the event APIs against a primary and a replica database.
+
+    Data is committed so the replica connection can see it.
+    """
+    databases = {'default', REPLICA_ALIAS} - {None}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.staff_user = create_user(
+            email='staff@example.com',
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=self.staff_user)
+        self.user, self.hospital, self.doctor = create_random_entities()
+        create_event(self.staff_user, self.doctor, self.hospital)
+
+    def test_list_reads_from_replica(self):
+        """Test the event list is served by the replica."""
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(any(
+            'event_event' in query['sql'] for query in replica.captured_queries
+        ))
+
+    def test_list_after_write_reads_from_primary(self):
+        """Test a user reads their own writes from the primary."""
+        payload = {
+            'doctor': self.doctor.id,
+            'hospital': self.hospital.id,
+            'date': '2025-03-28',
+        }
+        res = self.client.post(EVENTS_URL, payload)
+        self.assertEqual(res.status_code, 201)
+
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(len(res.data), 2)
+        self.assertFalse(any(
+            'event_event' in query['sql'] for query in replica.captured_queries
+        ))
+
+    def test_list_after_other_write_reads_from_primary(self):
+        """Test a write through a view without the mixin also pins."""
+        res = self.client.patch(ME_URL, {'firstname': 'Renamed'})
+        self.assertEqual(res.status_code, 200)
+
+        with CaptureQueriesContext(connections[REPLICA_ALIAS]) as replica:
+            res = self.client.get(EVENTS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(any(
+            'event_event' in query['sql'] for query in replica.captured_queries
+        ))
@@ -0,0 +1,94 @@
+"""
+Tests for the indexed admin and API search.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from core.models import Hospital
+from core.search import search_lookup, search_queryset
+
+
+POSTGRES = connection.vendor == 'postgresql'
+
+
+class SearchQuerysetTests(TestCase):
+    """Test the indexed search lookups."""
+
+    def setUp(self):
+        Hospital.objects.create(
+            name='Saint Mary Clinic', street='1 Main St', city='Town',
+            state='State', postal_code='12345', country='US',
+        )
+        Hospital.objects.create(
+            name='General Hospital', street='2 Main St', city='Town',
+            state='State', postal_code='12345', country='US',
+        )
+
+    def test_lookup_per_database(self):
+        """Test trigram-backed icontains on Postgres, prefixes elsewhere."""
+        expected = 'icontains' if POSTGRES else 'istartswith'
+        self.assertEqual(search_lookup(Hospital.objects.all()), expected)
+
+    def test_prefix_search_case_insensitive(self):
+        """Test a case-insensitive prefix matches on every database."""
+        results = search_queryset(Hospital.objects.all(), ['name'], 'saint')
+
+        self.assertEqual(
+            list(results.values_list('name', flat=True)),
+            ['Saint Mary Clinic']
+        )
+
+    def test_infix_search(self):
+        """Test infix matches are only available on PostgreSQL."""
+        results = search_queryset(Hospital.objects.all(), ['name'], 'mary')
+
+        self.assertEqual(results.exists(), POSTGRES)
+
+    def test_every_word_must_match(self):
+        """Test each word narrows the results."""
+        hospitals = Hospital.objects.all()
+
+        self.assertEqual(
+            search_queryset(hospitals, ['name', 'city'], 'General Town')
+            .count(), 1
+        )
+        self.assertEqual(
+            search_queryset(hospitals, ['name', 'city'], 'General Nowhere')
+            .count(), 0
+        )
+
+    def test_empty_search_returns_everything(self):
+        """Test an empty search term leaves the queryset unfiltered."""
+        results = search_queryset(Hospital.objects.all(), ['name'], '')
+
+        self.assertEqual(results.count(), 2)
+
+
+class AdminSearchTests(TestCase):
+    """Test the admin search uses the indexed lookups."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='jane@example.com',
+            password='testpass123',
+            firstname='Jane',
+            surname='Mokoena',
+        )
+
+    def test_user_admin_search(self):
+        """Test searching users by surname prefix."""
+        url = reverse('admin:core_user_changelist')
+
+        res = self.client.get(url, {'q': 'moko'})
+
+        self.assertEqual(
+            list(res.context['cl'].result_list), [self.user]
+        )
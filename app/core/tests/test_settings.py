@@ -0,0 +1,152 @@
+"""
+Tests for the environment selected settings profiles.
+"""
+import gc
+import runpy
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.test import SimpleTestCase, TestCase, override_settings, tag
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+
+SETTINGS_FILE = Path(__file__).resolve().parents[2] / 'app' / 'settings.py'
+EVENTS_URL = reverse('event:event-list')
+
+
+def load_settings(**environ):
+    """Evaluate the settings module with the given environment."""
+    with patch.dict('os.environ', environ):
+        return runpy.run_path(str(SETTINGS_FILE))
+
+
+class SettingsProfileTests(SimpleTestCase):
+    """Test the development and production settings profiles."""
+
+    def test_development_profile(self):
+        """Test the development profile keeps the quick-start settings."""
+        config = load_settings(DJANGO_ENV='development')
+
+        self.assertTrue(config['DEBUG'])
+        self.assertNotIn('CONN_MAX_AGE', config['DATABASES']['default'])
+        self.assertTrue(config['TEMPLATES'][0]['APP_DIRS'])
+
+    def test_production_profile(self):
+        """Test the production profile enables the performance settings."""
+        config = load_settings(
+            DJANGO_ENV='production',
+            DJANGO_ALLOWED_HOSTS='api.example.com,admin.example.com',
+            DB_CONN_MAX_AGE='120',
+        )
+
+        self.assertFalse(config['DEBUG'])
+        self.assertEqual(
+            config['ALLOWED_HOSTS'], ['api.example.com', 'admin.example.com']
+        )
+        database = config['DATABASES']['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertIn('default', config['CACHES'])
+
+        template = config['TEMPLATES'][0]
+        self.assertFalse(template['APP_DIRS'])
+        loader, _ = template['OPTIONS']['loaders'][0]
+        self.assertEqual(loader, 'django.template.loaders.cached.Loader')
+        self.assertEqual(
+            config['LOGGING']['loggers']['django.db.backends']['level'],
+            'WARNING'
+        )
+
+    def test_connection_pool_profile(self):
+        """Test DB_POOL configures a health checked pool per worker."""
+        config = load_settings(
+            DJANGO_ENV='production',
+            DB_POOL='true',
+            DB_POOL_MIN_SIZE='1',
+            DB_POOL_MAX_SIZE='8',
+        )
+
+        database = config['DATABASES']['default']
+        pool = database['OPTIONS']['pool']
+        self.assertEqual(pool['min_size'], 1)
+        self.assertEqual(pool['max_size'], 8)
+        self.assertTrue(callable(pool['check']))
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+    def test_connection_pool_disabled_by_default(self):
+        """Test no pool is configured unless DB_POOL is set."""
+        config = load_settings(DJANGO_ENV='production', DB_POOL='')
+
+        self.assertNotIn('OPTIONS', config['DATABASES']['default'])
+
+    def test_postgresql_driver(self):
+        """Test the postgresql backend runs on psycopg 3 in every profile."""
+        self.assertTrue(is_psycopg3)
+
+
+@tag('slow')
+class WorkerMemoryTests(TestCase):
+    """Test a worker's memory stays flat under sustained traffic."""
+
+    REQUESTS = 10000
+    WARMUP = 500
+    MAX_GROWTH_BYTES = 512 * 1024
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+        token = Token.objects.create(user=user)
+        # Drive the same WSGI handler uWSGI runs, rather than the test
+        # client, which keeps per-request bookkeeping of its own.
+        self.application = WSGIHandler()
+        self.environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': EVENTS_URL,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'HTTP_AUTHORIZATION': f'Token {token.key}',
+            'wsgi.input': BytesIO(),
+            'wsgi.url_scheme': 'http',
+        }
+        # Keep the test transaction open between requests.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def send_requests(self, count):
+        """Send GET requests for the event list through the WSGI handler."""
+        for _ in range(count):
+            response = self.application(
+                dict(self.environ), lambda status, headers: None
+            )
+            b''.join(response)
+            response.close()
+
+    @override_settings(DEBUG=False)
+    def test_memory_flat_across_requests(self):
+        """Test 10k requests do not grow memory or the query log."""
+        self.send_requests(self.WARMUP)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            self.send_requests(self.REQUESTS - self.WARMUP)
+            gc.collect()
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(len(connection.queries_log), 0)
+        self.assertLess(current - baseline, self.MAX_GROWTH_BYTES)
@@ -1,9 +1,19 @@
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from core.models import TrayType
+from core.pagination import EstimatedCountAdminMixin
+from core.search import IndexedSearchAdminMixin
 
 from event.models import (
     Event, Procedure, Allocation,
     Inventory, Usage, Order, OrderItem
 )
+from event.search import search_procedures
+from event.trays import readiness_lines, tray_readiness
 
 class BaseAdminClass(admin.ModelAdmin):
         readonly_fields = (
@@ -17,18 +27,48 @@ class BaseAdminClass(admin.ModelAdmin):
             obj.updated_by = request.user
             super().save_model(request, obj, form, change)
 
+
+class SelectRelatedFieldListFilter(admin.RelatedFieldListFilter):
+    """Related filter that loads what the choices' __str__ needs up front."""
+    select_related = ()
+
+    def field_choices(self, field, request, model_admin):
+        ordering = self.field_admin_ordering(field, request, model_admin)
+        queryset = field.related_model._default_manager.select_related(
+            *self.select_related
+        )
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return [(obj.pk, str(obj)) for obj in queryset]
+
+
+class TrayListFilter(SelectRelatedFieldListFilter):
+    """Tray filter, Tray.__str__ reads the tray type."""
+    select_related = ('tray_type',)
+
+
+class AllocationListFilter(SelectRelatedFieldListFilter):
+    """Allocation filter, Allocation.__str__ reads the tray and procedure."""
+    select_related = ('tray__tray_type', 'procedure')
+
+
 class UsageInline(admin.TabularInline):
     model = Usage
     extra = 1
-    readonly_fields = ('created_by', 'updated_by', 'created_at', 'updated_at')
+    readonly_fields = (
+        'unit_price', 'unit_vat_price',
+        'created_by', 'updated_by', 'created_at', 'updated_at',
+    )
 
     
 @admin.register(Event)
-class EventAdmin (BaseAdminClass):
+class EventAdmin (IndexedSearchAdminMixin, BaseAdminClass):
     # Fields to display in the user list view
     list_display = (
         'doctor', 'hospital', 'description', 'created_by', 
         'created_at')
+    # Doctor.__str__ reads the doctor's user
+    list_select_related = ('doctor__user', 'hospital', 'created_by')
     search_fields = (
         'created_by__firstname', 'created_by__surname', 
         'doctor__user__surname', 'description', 'hospital__name'
@@ -41,21 +81,28 @@ class EventAdmin (BaseAdminClass):
 
 
 @admin.register(Procedure)
-class ProcedureAdmin(BaseAdminClass):
+class ProcedureAdmin(EstimatedCountAdminMixin, BaseAdminClass):
     list_display = (
         'patient_name', 'patient_surname', 'case_number',
         'get_doctor', 'get_hospital', 'created_at'
     )
+    # get_doctor and get_hospital read through the event
+    list_select_related = ('event__doctor__user', 'event__hospital')
     list_filter = (
         'event__hospital__name', 
         'event__doctor__user__surname', 
         'created_by'
     )
+    # Enables the search box, the searches read ProcedureSearchIndex
     search_fields = (
         'patient_name', 'patient_surname', 'case_number',
-        'event__doctor__user__surname', 'event__hospital', 
+        'event__doctor__user__surname', 'event__hospital__name',
+        'allocations__tray__code',
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_procedures(queryset, search_term), False
+
     def get_hospital(self, obj):
         """Return the hospital associated with the procedure"""
         if obj.event.hospital is not None:
@@ -74,8 +121,11 @@ class ProcedureAdmin(BaseAdminClass):
 
 
 @admin.register(Allocation)
-class AllocationAdmin(BaseAdminClass):
-    list_display = ('tray', 'created_by')
+class AllocationAdmin(EstimatedCountAdminMixin, BaseAdminClass):
+    list_display = ('tray', 'event_date', 'created_by')
+    # The tray column and the row checkbox label (Allocation.__str__)
+    # read the tray type and the procedure
+    list_select_related = ('tray__tray_type', 'procedure', 'created_by')
     search_fields = ('tray__code',)
     list_filter = ('created_by',)
     autocomplete_fields = ['tray']
@@ -84,18 +134,81 @@ class AllocationAdmin(BaseAdminClass):
 
 
 @admin.register(Inventory)
-class InventoryAdmin(BaseAdminClass):
+class InventoryAdmin(EstimatedCountAdminMixin, BaseAdminClass):
     list_display = ('item', 'quantity', 'tray', 'created_at', 'created_by', 'updated_at', 'updated_by')
+    # Tray.__str__ reads the tray type
+    list_select_related = (
+        'item', 'tray__tray_type', 'created_by', 'updated_by'
+    )
     search_fields = ('item', 'tray__name')
-    list_filter = ('tray', 'created_at', 'updated_at')
+    list_filter = (('tray', TrayListFilter), 'created_at', 'updated_at')
     readonly_fields = ('created_at', 'updated_at')
 
+    def get_urls(self):
+        """Add the tray readiness report next to the inventory pages."""
+        urls = [
+            path(
+                'readiness/',
+                self.admin_site.admin_view(self.readiness_view),
+                name='event_inventory_readiness',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def readiness_view(self, request):
+        """Show the missing and surplus quantities of every tray.
+
+        Totals come from one grouped query over all trays and the short
+        or surplus products of the page's trays from a second one, see
+        event.trays. Pages hold ``list_per_page`` trays.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        tray_type = request.GET.get('tray_type', '')
+        ready = {'1': True, '0': False}.get(request.GET.get('ready'))
+        rows = tray_readiness(
+            tray_type_id=int(tray_type) if tray_type.isdigit() else None,
+            ready=ready,
+        )
+        page = Paginator(rows, self.list_per_page).get_page(
+            request.GET.get('page')
+        )
+        lines = readiness_lines(
+            row['id'] for row in page if not row['is_ready']
+        )
+        for row in page:
+            row['lines'] = lines.get(row['id'], [])
+
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Tray readiness',
+            'opts': self.model._meta,
+            'rows': page.object_list,
+            'page': page,
+            'tray_types': TrayType.objects.order_by('name'),
+            'tray_type': tray_type,
+            'ready': request.GET.get('ready', ''),
+        }
+        return TemplateResponse(
+            request, 'admin/event/inventory/readiness.html', context
+        )
+
 
 @admin.register(Usage)
-class UsageAdmin(BaseAdminClass):
-    list_display = ('item', 'quantity', 'allocation', 'created_at', 'created_by', 'updated_at', 'updated_by')
+class UsageAdmin(EstimatedCountAdminMixin, BaseAdminClass):
+    list_display = (
+        'item', 'quantity', 'unit_price', 'allocation', 'created_at',
+        'created_by', 'updated_at', 'updated_by',
+    )
+    # Allocation.__str__ reads the tray, its type and the procedure
+    list_select_related = (
+        'item', 'allocation__tray__tray_type', 'allocation__procedure',
+        'created_by', 'updated_by'
+    )
     search_fields = ('item', 'allocation__procedure__case_number')
-    list_filter = ('allocation', 'created_at', 'updated_at')
+    list_filter = (
+        ('allocation', AllocationListFilter), 'created_at', 'updated_at'
+    )
 
 
 class OrderItemInline(admin.TabularInline):
@@ -106,7 +219,7 @@ class OrderItemInline(admin.TabularInline):
 @admin.register(Order)
 class OrderAdmin(BaseAdminClass):
     list_display = ('supplier', 'invoice', 'order_date', 'delivery_date', 'created_at', 'created_by', 'updated_at', 'updated_by')
+    list_select_related = ('created_by', 'updated_by')
     search_fields = ('supplier', 'invoice')
     list_filter = ('order_date', 'delivery_date', 'created_at', 'updated_at')
     inlines = [OrderItemInline]
-
@@ -0,0 +1,233 @@
+"""
+Tray turnaround analytics.
+
+Each tray's uses are its allocations' event dates (Allocation.event_date,
+the copy of Event.date). A LAG window over those dates, partitioned by
+tray and ordered by date then Allocation.created_at, gives the days since
+the tray's previous use, and TrayUsageStats keeps the running totals per
+tray.
+
+Only past uses count, a booking is folded in once its date has come.
+Refreshes are incremental: AnalyticsRun remembers when the last one
+started and only trays with allocations saved since then, allocations
+whose date has come since then, or whose stats row was dropped when an
+allocation was deleted, are recomputed. The refresh_tray_analytics
+command runs them; the per tray type report is built from the stats rows
+and cached for the day.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from core.cache import bump_cache_version, cache_timeout, versioned_key
+from core.models import Tray, TrayType
+from .models import Allocation, AnalyticsRun, TrayUsageStats
+
+
+RUN_NAME = 'tray_usage'
+
+CACHE_NAMESPACE = 'tray_analytics'
+
+CACHE_SECONDS = 24 * 60 * 60
+
+CHUNK_SIZE = 1000
+
+# An allocation saved in a transaction that commits after a refresh has
+# read still has an updated_at before that refresh started, so the next
+# refresh looks back this far past the previous start.
+WATERMARK_LAG = timedelta(minutes=10)
+
+# A tray not used for this many days is reported as idle
+IDLE_DAYS = 30
+
+
+def iter_tray_stats(tray_ids, today):
+    """
+    Yield the usage stats of each tray that has been used by ``today``.
+
+    One query per call: the allocations of the trays, each with the date
+    of the tray's previous use from a LAG window. Replenishments are the
+    same use of a tray and bookings after ``today`` have not happened
+    yet, so both are left out.
+    """
+    uses = Allocation.objects.filter(
+        tray_id__in=tray_ids,
+        is_replenishment=False,
+        event_date__lte=today,
+    ).annotate(previous=Window(
+        Lag('event_date'),
+        partition_by=[F('tray_id')],
+        order_by=[F('event_date').asc(), F('created_at').asc(), F('pk')],
+    )).order_by('tray_id', 'event_date').values_list(
+        'tray_id', 'event_date', 'previous'
+    )
+
+    stats = None
+    for tray_id, event_date, previous in uses:
+        if stats is None or stats.tray_id != tray_id:
+            if stats is not None:
+                yield stats
+            stats = TrayUsageStats(
+                tray_id=tray_id, first_used=event_date, last_used=event_date
+            )
+        stats.uses += 1
+        stats.last_used = event_date
+        if previous is not None:
+            stats.total_gap_days += (event_date - previous).days
+    if stats is not None:
+        yield stats
+
+
+def refresh_tray_stats(tray_ids, today):
+    """
+    Recompute the stats rows of the given trays as of ``today``.
+
+    Returns:
+        int: The number of stats rows written.
+    """
+    tray_ids = list(tray_ids)
+    stats = list(iter_tray_stats(tray_ids, today))
+    TrayUsageStats.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['tray'],
+        update_fields=[
+            'uses', 'first_used', 'last_used', 'total_gap_days',
+            'updated_at',
+        ],
+    )
+    # Trays left without any use lose their row
+    used = {row.tray_id for row in stats}
+    TrayUsageStats.objects.filter(
+        tray_id__in=[pk for pk in tray_ids if pk not in used]
+    ).delete()
+    return len(stats)
+
+
+def refresh_usage_stats(full=False, chunk_size=CHUNK_SIZE, today=None):
+    """
+    Bring TrayUsageStats up to date with the allocations.
+
+    Args:
+        full (bool): Recompute every tray instead of only the changed
+            ones.
+        chunk_size (int): Trays recomputed per query.
+        today (date): Count uses up to this day, defaults to today.
+
+    Returns:
+        int: The number of trays recomputed.
+    """
+    started = timezone.now()
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        run, _ = AnalyticsRun.objects.select_for_update().get_or_create(
+            name=RUN_NAME
+        )
+        if full or run.watermark is None:
+            trays = Tray.objects.all()
+        else:
+            trays = Tray.objects.filter(
+                pk__in=Allocation.objects.filter(
+                    Q(updated_at__gte=run.watermark)
+                    | Q(
+                        event_date__gt=timezone.localdate(run.watermark),
+                        event_date__lte=today,
+                    )
+                ).values('tray_id')
+            ) | Tray.objects.filter(
+                allocations__is_replenishment=False,
+                allocations__event_date__lte=today,
+                usage_stats__isnull=True,
+            )
+        tray_ids = sorted(set(trays.values_list('pk', flat=True)))
+
+        for i in range(0, len(tray_ids), chunk_size):
+            refresh_tray_stats(tray_ids[i:i + chunk_size], today)
+
+        run.watermark = started - WATERMARK_LAG
+        run.finished_at = timezone.now()
+        run.save()
+        transaction.on_commit(partial(bump_cache_version, CACHE_NAMESPACE))
+    return len(tray_ids)
+
+
+def build_report(today):
+    """
+    Return the turnaround figures of every tray type.
+
+    * ``avg_days_between_uses``: mean gap between consecutive uses of a
+      tray, over every tray of the type.
+    * ``utilisation``: percentage of days since each tray was first used
+      that it was in use.
+    * ``idle_trays``: trays unused for ``IDLE_DAYS``, or never used.
+    """
+    idle_since = today - timedelta(days=IDLE_DAYS)
+    totals = defaultdict(lambda: {
+        'uses': 0, 'gaps': 0, 'gap_days': 0, 'service_days': 0,
+        'used_trays': 0, 'active_trays': 0,
+    })
+    stats = TrayUsageStats.objects.values_list(
+        'tray__tray_type_id', 'uses', 'first_used', 'last_used',
+        'total_gap_days',
+    )
+    for tray_type_id, uses, first_used, last_used, gap_days in stats:
+        total = totals[tray_type_id]
+        total['used_trays'] += 1
+        total['uses'] += uses
+        total['gaps'] += uses - 1
+        total['gap_days'] += gap_days
+        if first_used <= today:
+            total['service_days'] += (today - first_used).days + 1
+        if last_used > idle_since:
+            total['active_trays'] += 1
+
+    tray_types = TrayType.objects.annotate(
+        tray_count=Count('trays')
+    ).order_by('name').values_list('id', 'name', 'tray_count')
+    report = []
+    for tray_type_id, name, tray_count in tray_types:
+        total = totals[tray_type_id]
+        report.append({
+            'tray_type': tray_type_id,
+            'tray_type_name': name,
+            'trays': tray_count,
+            'used_trays': total['used_trays'],
+            'uses': total['uses'],
+            'avg_days_between_uses': (
+                round(total['gap_days'] / total['gaps'], 1)
+                if total['gaps'] else None
+            ),
+            'utilisation': (
+                round(100 * total['uses'] / total['service_days'], 1)
+                if total['service_days'] else 0.0
+            ),
+            'idle_trays': tray_count - total['active_trays'],
+        })
+    return report
+
+
+def tray_turnaround(today=None):
+    """
+    Return the per tray type report, cached for the day.
+
+    The report reads the stats as the last refresh_tray_analytics run left
+    them, a refresh bumps the cache version so the next request rebuilds
+    it.
+    """
+    today = today or timezone.localdate()
+    report = cache.get(versioned_key(CACHE_NAMESPACE, today))
+    if report is not None:
+        return report
+
+    report = build_report(today)
+    cache.set(
+        versioned_key(CACHE_NAMESPACE, today), report,
+        cache_timeout(CACHE_SECONDS),
+    )
+    return report
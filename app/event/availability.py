@@ -0,0 +1,66 @@
+"""
+Tray availability for scheduling.
+
+A tray is free on a date when no allocation books it that day. Asked
+for a hospital, a tray booked at another hospital within
+``settings.TRAY_TRANSIT_DAYS`` of the date is taken too, it could not be
+moved in time. Every date is answered by its own NOT EXISTS anti-join
+against the (tray, event_date) index, all of them in the one query that
+reads the trays.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from core.models import Tray
+from .models import Allocation
+
+
+MAX_DATES = 31
+
+
+def _booked(event_date, hospital=None):
+    """Return an EXISTS matching allocations that take a tray on a date."""
+    taken = Q(event_date=event_date)
+    if hospital is not None and settings.TRAY_TRANSIT_DAYS:
+        transit = timedelta(days=settings.TRAY_TRANSIT_DAYS)
+        taken |= Q(
+            event_date__range=(event_date - transit, event_date + transit),
+        ) & ~Q(procedure__event__hospital=hospital)
+    return Exists(
+        Allocation.objects.filter(taken, tray=OuterRef('pk'))
+    )
+
+
+def tray_availability(tray_type, dates, hospital=None):
+    """
+    Return the free trays of a tray type on each date, in one query.
+
+    Args:
+        tray_type (TrayType): The kind of tray needed.
+        dates (iterable): Up to ``MAX_DATES`` dates to check.
+        hospital (Hospital, optional): Where the trays are needed.
+
+    Returns:
+        list: One ``{'date', 'trays'}`` dict per date, in date order,
+            listing the free trays by code.
+    """
+    dates = sorted(set(dates))
+    if len(dates) > MAX_DATES:
+        raise ValueError(f'At most {MAX_DATES} dates can be checked at once.')
+
+    trays = Tray.objects.filter(tray_type=tray_type).annotate(**{
+        f'booked_{i}': _booked(event_date, hospital)
+        for i, event_date in enumerate(dates)
+    }).order_by('code')
+
+    free = {event_date: [] for event_date in dates}
+    for tray in trays:
+        for i, event_date in enumerate(dates):
+            if not getattr(tray, f'booked_{i}'):
+                free[event_date].append(tray)
+    return [
+        {'date': event_date, 'trays': trays}
+        for event_date, trays in free.items()
+    ]
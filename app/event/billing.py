@@ -0,0 +1,190 @@
+"""
+Procedure and event billing.
+
+Every Usage row carries its product's prices from when it was logged
+(unit_price and unit_vat_price, VAT inclusive), so repricing a product
+never changes an invoice already sent. Totals are a single grouped
+SUM(quantity * price) over Usage; the procedure, event and event date
+are reached through Allocation, whose event_date copy keeps a month's
+usages one index range away.
+"""
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
+
+from .models import Usage
+
+
+CHUNK_SIZE = 2000
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+NET = Sum(F('quantity') * F('unit_price'), output_field=MONEY)
+
+GROSS = Sum(F('quantity') * F('unit_vat_price'), output_field=MONEY)
+
+ZERO = Decimal('0.00')
+
+# Invoice header fields, read alongside each line
+HEADER = {
+    'event': F('allocation__procedure__event'),
+    'date': F('allocation__event_date'),
+    'hospital': F('allocation__procedure__event__hospital'),
+    'hospital_name': F('allocation__procedure__event__hospital__name'),
+    'doctor': F('allocation__procedure__event__doctor'),
+}
+
+
+def billed_usages(date_from=None, date_to=None, hospital_id=None,
+                  doctor_id=None, event_id=None):
+    """
+    Return the usages to bill, filtered on their event.
+
+    Args:
+        date_from (date, optional): First event date to bill.
+        date_to (date, optional): Last event date to bill.
+        hospital_id (int, optional): Only bill this hospital.
+        doctor_id (int, optional): Only bill this doctor.
+        event_id (int, optional): Only bill this event.
+
+    Returns:
+        QuerySet: The matching Usage rows.
+    """
+    usages = Usage.objects.all()
+    if date_from is not None:
+        usages = usages.filter(allocation__event_date__gte=date_from)
+    if date_to is not None:
+        usages = usages.filter(allocation__event_date__lte=date_to)
+    if hospital_id is not None:
+        usages = usages.filter(
+            allocation__procedure__event__hospital=hospital_id
+        )
+    if doctor_id is not None:
+        usages = usages.filter(
+            allocation__procedure__event__doctor=doctor_id
+        )
+    if event_id is not None:
+        usages = usages.filter(allocation__procedure__event=event_id)
+    return usages
+
+
+def _totals(row):
+    """Add the VAT, the difference of the gross and net totals."""
+    row['vat'] = row['gross'] - row['net']
+    return row
+
+
+def event_totals(usages):
+    """
+    Return the net, gross and VAT totals of each event and its procedures.
+
+    One query totals every procedure, the event totals are their sums.
+
+    Returns:
+        list: Event dicts, by date then event, each with its procedures.
+    """
+    rows = usages.values(
+        **HEADER,
+        procedure=F('allocation__procedure'),
+        case_number=F('allocation__procedure__case_number'),
+    ).annotate(net=NET, gross=GROSS).order_by('date', 'event', 'procedure')
+
+    events = []
+    for row in rows:
+        if not events or events[-1]['event'] != row['event']:
+            events.append({
+                **{key: row[key] for key in HEADER},
+                'net': ZERO, 'gross': ZERO, 'procedures': [],
+            })
+        event = events[-1]
+        event['procedures'].append(_totals({
+            'procedure': row['procedure'],
+            'case_number': row['case_number'],
+            'net': row['net'],
+            'gross': row['gross'],
+        }))
+        event['net'] += row['net']
+        event['gross'] += row['gross']
+    return [_totals(event) for event in events]
+
+
+def invoice_lines(usages):
+    """
+    Return the invoice lines of the usages, one query.
+
+    A line is a product used in a procedure at one price, the quantities
+    of its usages summed.
+    """
+    return usages.values(
+        **HEADER,
+        procedure=F('allocation__procedure'),
+        case_number=F('allocation__procedure__case_number'),
+        product=F('item'),
+        digimed_id=F('item__digimed_id'),
+        description=F('item__description'),
+        price=F('unit_price'),
+        vat_price=F('unit_vat_price'),
+    ).annotate(
+        units=Sum('quantity'), net=NET, gross=GROSS,
+    ).order_by('date', 'event', 'procedure', 'product', 'price')
+
+
+def iter_invoices(usages, chunk_size=CHUNK_SIZE):
+    """
+    Yield one invoice per event, streaming the lines from a cursor.
+
+    Invoices come in event date order and are totalled per procedure
+    and per event as their lines go by, so memory holds one invoice.
+    """
+    invoice = procedure = None
+    for row in invoice_lines(usages).iterator(chunk_size=chunk_size):
+        if invoice is None or invoice['event'] != row['event']:
+            if invoice is not None:
+                _totals(procedure)
+                yield _totals(invoice)
+            invoice = {
+                **{key: row[key] for key in HEADER},
+                'net': ZERO, 'gross': ZERO, 'procedures': [],
+            }
+            procedure = None
+        if procedure is None or procedure['procedure'] != row['procedure']:
+            if procedure is not None:
+                _totals(procedure)
+            procedure = {
+                'procedure': row['procedure'],
+                'case_number': row['case_number'],
+                'net': ZERO, 'gross': ZERO, 'lines': [],
+            }
+            invoice['procedures'].append(procedure)
+        procedure['lines'].append({
+            'product': row['product'],
+            'digimed_id': row['digimed_id'],
+            'description': row['description'],
+            'unit_price': row['price'],
+            'unit_vat_price': row['vat_price'],
+            'quantity': row['units'],
+            'net': row['net'],
+            'gross': row['gross'],
+        })
+        procedure['net'] += row['net']
+        procedure['gross'] += row['gross']
+        invoice['net'] += row['net']
+        invoice['gross'] += row['gross']
+    if invoice is not None:
+        _totals(procedure)
+        yield _totals(invoice)
+
+
+def event_invoice(event):
+    """Return the invoice of an event, empty if nothing was used."""
+    invoice = next(iter_invoices(billed_usages(event_id=event.pk)), None)
+    return invoice or _totals({
+        'event': event.pk,
+        'date': event.date,
+        'hospital': event.hospital_id,
+        'hospital_name': event.hospital.name,
+        'doctor': event.doctor_id,
+        'net': ZERO,
+        'gross': ZERO,
+        'procedures': [],
+    })
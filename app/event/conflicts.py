@@ -0,0 +1,91 @@
+"""
+Tray double-booking detection.
+
+A tray can only go to one procedure per day: it has to come back, be
+restocked and be sterilised before it is used again. Each allocation
+carries a copy of its event's date, so every question below is answered
+from the (tray, event_date) index, by an equality or range lookup,
+instead of walking allocations in Python.
+"""
+from django.db.models import Exists, OuterRef
+
+from .models import Allocation
+
+
+def tray_conflicts(tray, event_date, procedure=None):
+    """
+    Return the allocations that already book a tray on a date.
+
+    Args:
+        tray (Tray): The tray being allocated.
+        event_date (date): The date of the procedure's event.
+        procedure (Procedure, optional): The procedure being allocated.
+            Its own allocations, like replenishments, are not conflicts.
+
+    Returns:
+        QuerySet: The clashing allocations.
+    """
+    conflicts = Allocation.objects.filter(tray=tray, event_date=event_date)
+    if procedure is not None:
+        conflicts = conflicts.exclude(procedure=procedure)
+    return conflicts
+
+
+def double_bookings(date_from=None, date_to=None):
+    """
+    Return every allocation whose tray is booked twice on its date.
+
+    One query: each allocation in the date range is kept if another
+    procedure has the same tray on the same date, both looked up in the
+    (tray, event_date) index.
+
+    Args:
+        date_from (date, optional): First event date to check.
+        date_to (date, optional): Last event date to check.
+
+    Returns:
+        QuerySet: The clashing allocations, grouped by tray and date.
+    """
+    allocations = Allocation.objects.all()
+    if date_from is not None:
+        allocations = allocations.filter(event_date__gte=date_from)
+    if date_to is not None:
+        allocations = allocations.filter(event_date__lte=date_to)
+    clash = Allocation.objects.filter(
+        tray=OuterRef('tray'),
+        event_date=OuterRef('event_date'),
+    ).exclude(procedure=OuterRef('procedure'))
+    return allocations.filter(Exists(clash)).select_related(
+        'tray', 'procedure',
+    ).order_by('event_date', 'tray__code', 'id')
+
+
+def conflict_report(date_from=None, date_to=None):
+    """
+    Return the double bookings grouped per tray and date.
+
+    Returns:
+        list: One dict per clash with ``tray``, ``tray_code``,
+            ``event_date`` and the clashing ``allocations``.
+    """
+    report = []
+    for allocation in double_bookings(date_from, date_to):
+        key = (allocation.tray_id, allocation.event_date)
+        if not report or report[-1]['key'] != key:
+            report.append({
+                'key': key,
+                'tray': allocation.tray_id,
+                'tray_code': allocation.tray.code,
+                'event_date': allocation.event_date,
+                'allocations': [],
+            })
+        report[-1]['allocations'].append({
+            'id': allocation.id,
+            'procedure': allocation.procedure_id,
+            'case_number': allocation.procedure.case_number,
+            'event': allocation.procedure.event_id,
+            'is_replenishment': allocation.is_replenishment,
+        })
+    for clash in report:
+        del clash['key']
+    return report
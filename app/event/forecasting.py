@@ -0,0 +1,225 @@
+"""
+Demand forecasting and reorder points.
+
+The job reads the daily units used of every product from Usage, dated
+by Allocation.event_date, into a products x days NumPy matrix and
+forecasts every product of the block with whole-array operations:
+
+* the moving average and standard deviation of the last ``WINDOW`` days;
+* a weekday index, each weekday's mean over the history against the
+  overall mean, applied to the weekdays of the coming lead time;
+* a yearly factor, how the same lead time a year earlier (52 weeks, so
+  weekdays line up) compared with the window before it.
+
+Lead time demand is the seasonal daily rate times the lead time, safety
+stock is ``z * std * sqrt(lead time)`` and the reorder point is their
+sum. Products are read and forecast in blocks of ``BLOCK_SIZE`` so the
+matrix stays small, 50k products over three years would need 220MB at
+once. Results go to ProductForecast, which the low-stock report reads.
+"""
+import math
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    F, IntegerField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.models import Product
+from .models import Inventory, ProductForecast, Usage
+
+
+HISTORY_DAYS = 3 * 365
+
+BLOCK_SIZE = 5000
+
+# Days the moving average and deviation are taken over
+WINDOW = 28
+
+# 52 weeks, the yearly lag keeps weekdays aligned
+YEAR = 364
+
+# Bounds of the yearly factor, a quiet window a year ago is not allowed
+# to multiply this year's forecast without limit
+YEARLY_FACTOR_RANGE = (0.25, 4.0)
+
+
+def daily_usage(product_ids, start, days):
+    """
+    Return the units of each product used on each day, one query.
+
+    Args:
+        product_ids (list): Consecutive product ids, in order.
+        start (date): The first day.
+        days (int): Number of days from ``start``.
+
+    Returns:
+        ndarray: A ``(len(product_ids), days)`` float32 matrix.
+    """
+    ids = np.asarray(product_ids)
+    series = np.zeros((len(ids), days), dtype=np.float32)
+    rows = Usage.objects.filter(
+        item_id__gte=product_ids[0],
+        item_id__lte=product_ids[-1],
+        allocation__event_date__gte=start,
+        allocation__event_date__lt=start + timedelta(days=days),
+    ).values_list('item_id', 'allocation__event_date').annotate(
+        units=Sum('quantity')
+    ).order_by()
+    rows = list(rows)
+    if not rows:
+        return series
+
+    items, dates, units = zip(*rows)
+    index = np.searchsorted(ids, items)
+    # The id range may hold products left out of the block
+    known = ids[np.minimum(index, len(ids) - 1)] == items
+    day = np.fromiter(
+        ((d - start).days for d in dates), dtype=np.int64, count=len(dates)
+    )
+    series[index[known], day[known]] = np.asarray(units)[known]
+    return series
+
+
+def forecast_block(series, start, lead_time, z, window=WINDOW):
+    """
+    Forecast every product of a usage matrix at once.
+
+    Args:
+        series (ndarray): Units used per product (rows) and day
+            (columns), the last column the day before the forecast.
+        start (date): The day of the first column.
+        lead_time (int): Days from ordering to delivery.
+        z (float): Service level z-score for the safety stock.
+        window (int): Days of the moving average.
+
+    Returns:
+        dict: Arrays of ``average_daily``, ``seasonal_daily``,
+        ``std_daily``, ``lead_time_demand``, ``safety_stock`` and
+        ``reorder_point``, one value per row.
+    """
+    products, days = series.shape
+    series = series.astype(np.float64)
+    recent = series[:, -window:]
+    average = recent.mean(axis=1)
+    std = recent.std(axis=1, ddof=1) if recent.shape[1] > 1 else (
+        np.zeros(products)
+    )
+
+    # Mean units on each weekday against the overall mean
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    counts = np.maximum(np.bincount(weekdays, minlength=7), 1)
+    by_weekday = series @ np.eye(7)[weekdays] / counts
+    overall = by_weekday.mean(axis=1, keepdims=True)
+    weekday_index = np.divide(
+        by_weekday, overall,
+        out=np.ones_like(by_weekday), where=overall > 0,
+    )
+    ahead = (weekdays[-1] + 1 + np.arange(lead_time)) % 7
+    weekly = weekday_index[:, ahead].mean(axis=1)
+
+    yearly = np.ones(products)
+    if days >= YEAR + window and lead_time <= YEAR:
+        then = days - YEAR
+        year_ahead = series[:, then:then + lead_time].mean(axis=1)
+        year_recent = series[:, then - window:then].mean(axis=1)
+        np.divide(year_ahead, year_recent, out=yearly, where=year_recent > 0)
+        np.clip(yearly, *YEARLY_FACTOR_RANGE, out=yearly)
+
+    seasonal = average * weekly * yearly
+    demand = seasonal * lead_time
+    safety = np.ceil(z * std * math.sqrt(lead_time))
+    return {
+        'average_daily': average,
+        'seasonal_daily': seasonal,
+        'std_daily': std,
+        'lead_time_demand': demand,
+        'safety_stock': safety,
+        'reorder_point': np.ceil(demand + safety),
+    }
+
+
+def run_forecasts(today=None, lead_time=None, z=None,
+                  history_days=HISTORY_DAYS, block_size=BLOCK_SIZE):
+    """
+    Forecast every product used in the history and store the results.
+
+    Products without usage in the history lose their forecast.
+
+    Args:
+        today (date, optional): The day forecasts start from, the
+            history ends the day before. Defaults to today.
+        lead_time (int, optional): Defaults to REORDER_LEAD_TIME_DAYS.
+        z (float, optional): Defaults to REORDER_SERVICE_Z.
+        history_days (int): Days of usage read.
+        block_size (int): Products forecast per matrix.
+
+    Returns:
+        int: The number of products forecast.
+    """
+    today = today or timezone.localdate()
+    lead_time = lead_time or settings.REORDER_LEAD_TIME_DAYS
+    z = settings.REORDER_SERVICE_Z if z is None else z
+    start = today - timedelta(days=history_days)
+    product_ids = list(
+        Product.objects.order_by('pk').values_list('pk', flat=True)
+    )
+
+    started = timezone.now()
+    forecast = 0
+    with transaction.atomic():
+        for i in range(0, len(product_ids), block_size):
+            block = product_ids[i:i + block_size]
+            series = daily_usage(block, start, history_days)
+            used = series.any(axis=1)
+            if not used.any():
+                continue
+            results = forecast_block(series[used], start, lead_time, z)
+            used_ids = np.asarray(block)[used].tolist()
+            rows = [
+                ProductForecast(
+                    product_id=product_id,
+                    lead_time_days=lead_time,
+                    computed_at=started,
+                    **{
+                        field: values[n].item()
+                        for field, values in results.items()
+                    },
+                )
+                for n, product_id in enumerate(used_ids)
+            ]
+            ProductForecast.objects.bulk_create(
+                rows,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=[*results, 'lead_time_days', 'computed_at'],
+            )
+            forecast += len(rows)
+        ProductForecast.objects.exclude(computed_at=started).delete()
+    return forecast
+
+
+def low_stock():
+    """
+    Return the forecasts of products at or below their reorder point.
+
+    Stock is the warehouse inventory, the rows not held in a tray.
+    Annotated with ``stock`` and ``shortfall``, largest shortfall first.
+    """
+    stock = Inventory.objects.filter(
+        item=OuterRef('product'), tray__isnull=True
+    ).values('item').annotate(total=Sum('quantity')).values('total')
+    return ProductForecast.objects.annotate(
+        stock=Coalesce(
+            Subquery(stock), Value(0), output_field=IntegerField()
+        ),
+    ).filter(
+        reorder_point__gt=0, stock__lte=F('reorder_point')
+    ).annotate(
+        shortfall=F('reorder_point') - F('stock')
+    ).select_related('product').order_by('-shortfall', 'product_id')
@@ -0,0 +1,229 @@
+"""
+Month end invoice runs.
+
+The run is split by hospital and each hospital's invoices are written by
+a worker process with its own database connection, streaming its lines
+from a cursor through event.billing.iter_invoices. A hospital's file is
+written to a temporary name and moved into place once complete, and a
+manifest in the output directory records the finished hospitals, so a
+crashed run picks up where it stopped.
+"""
+import json
+import os
+import time
+from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import django
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.utils import timezone
+
+from .billing import CHUNK_SIZE, ZERO, billed_usages, iter_invoices
+
+
+MANIFEST = 'manifest.json'
+
+
+def _init_worker():
+    """Make sure Django is configured in freshly spawned worker processes."""
+    django.setup()
+
+
+def month_range(month):
+    """Return the first and last day of a ``YYYY-MM`` month."""
+    year, month = (int(part) for part in month.split('-'))
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def hospitals_to_bill(date_from, date_to):
+    """Return the ids of the hospitals with usages between two dates."""
+    return list(
+        billed_usages(date_from=date_from, date_to=date_to)
+        .values_list('allocation__procedure__event__hospital', flat=True)
+        .order_by('allocation__procedure__event__hospital')
+        .distinct()
+    )
+
+
+def write_atomic(path, write):
+    """
+    Write a file through ``write(handle)`` so it appears complete or not
+    at all.
+
+    The content goes to a temporary file next to ``path`` which replaces
+    it once flushed to disk.
+    """
+    temporary = f'{path}.tmp'
+    try:
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            result = write(handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return result
+
+
+def _dump(value):
+    return json.dumps(value, cls=DjangoJSONEncoder)
+
+
+def write_hospital_invoices(hospital_id, date_from, date_to, directory,
+                            chunk_size=CHUNK_SIZE):
+    """
+    Write the invoices of one hospital's events between two dates.
+
+    The file holds the invoices, each doctor's totals and the hospital's
+    totals. Invoices are written as they stream in, only the doctor
+    totals are kept in memory.
+
+    Returns:
+        dict: The file name and the invoice count and totals.
+    """
+    name = f'hospital-{hospital_id}.json'
+    usages = billed_usages(
+        date_from=date_from, date_to=date_to, hospital_id=hospital_id
+    )
+
+    def write(handle):
+        summary = {'invoices': 0, 'net': ZERO, 'vat': ZERO, 'gross': ZERO}
+        doctors = {}
+        handle.write(
+            f'{{"hospital": {hospital_id}, '
+            f'"date_from": {_dump(date_from)}, '
+            f'"date_to": {_dump(date_to)}, "invoices": ['
+        )
+        for invoice in iter_invoices(usages, chunk_size):
+            if summary['invoices']:
+                handle.write(', ')
+            handle.write(_dump(invoice))
+            summary['invoices'] += 1
+            doctor = doctors.setdefault(invoice['doctor'], {
+                'doctor': invoice['doctor'], 'invoices': 0,
+                'net': ZERO, 'vat': ZERO, 'gross': ZERO,
+            })
+            doctor['invoices'] += 1
+            for total in ('net', 'vat', 'gross'):
+                doctor[total] += invoice[total]
+                summary[total] += invoice[total]
+        handle.write(
+            f'], "doctors": {_dump(list(doctors.values()))}, '
+            f'"totals": {_dump(summary)}}}'
+        )
+        return summary
+
+    summary = write_atomic(os.path.join(directory, name), write)
+    return {'hospital': hospital_id, 'file': name, **summary}
+
+
+def _bill_partition(args):
+    """Pool entry point: time one hospital's invoices."""
+    start = time.perf_counter()
+    result = write_hospital_invoices(*args)
+    result['seconds'] = round(time.perf_counter() - start, 2)
+    return result
+
+
+def read_manifest(directory):
+    """Return the manifest of a run directory, empty if there is none."""
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def run_invoices(date_from, date_to, directory, processes=None,
+                 restart=False, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Write the invoices of every hospital billed between two dates.
+
+    Args:
+        date_from (date): First event date to bill.
+        date_to (date): Last event date to bill.
+        directory (str): Where the hospital files and manifest go.
+        processes (int, optional): Pool size. Defaults to the CPU count.
+            A value of 1 bills in the current process.
+        restart (bool): Ignore the manifest and bill every hospital.
+        chunk_size (int): Invoice lines fetched per cursor read.
+        progress (callable, optional): Called with each hospital's
+            result or failure, the number finished and the number to do.
+
+    Raises:
+        ValueError: If the directory holds a run for other dates.
+
+    Returns:
+        dict: The hospitals billed, skipped and failed.
+    """
+    os.makedirs(directory, exist_ok=True)
+    period = {
+        'date_from': date_from.isoformat(), 'date_to': date_to.isoformat(),
+    }
+    manifest = {} if restart else read_manifest(directory)
+    if manifest and manifest['period'] != period:
+        raise ValueError(
+            f'{directory} holds the run for {manifest["period"]}.'
+        )
+    manifest = {'period': period, 'hospitals': manifest.get('hospitals', {})}
+
+    done = manifest['hospitals']
+    billable = hospitals_to_bill(date_from, date_to)
+    hospitals = [
+        pk for pk in billable
+        if str(pk) not in done
+        or not os.path.exists(os.path.join(directory, done[str(pk)]['file']))
+    ]
+    report = {
+        'billed': [], 'failed': [],
+        'skipped': len(billable) - len(hospitals),
+    }
+
+    def finished(hospital_id, result=None, error=None):
+        if error is None:
+            result['finished_at'] = timezone.now().isoformat()
+            done[str(hospital_id)] = result
+            write_atomic(
+                os.path.join(directory, MANIFEST),
+                lambda handle: handle.write(_dump(manifest)),
+            )
+            report['billed'].append(result)
+        else:
+            result = {'hospital': hospital_id, 'error': str(error)}
+            report['failed'].append(result)
+        if progress:
+            count = len(report['billed']) + len(report['failed'])
+            progress(result, count, len(hospitals))
+
+    partitions = {
+        pk: (pk, date_from, date_to, directory, chunk_size)
+        for pk in hospitals
+    }
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(partitions) < 2:
+        for pk, args in partitions.items():
+            try:
+                finished(pk, _bill_partition(args))
+            except Exception as exc:
+                finished(pk, error=exc)
+        return report
+
+    # Workers open their own connections, none may inherit the parent's
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_worker
+    ) as executor:
+        futures = {
+            executor.submit(_bill_partition, args): pk
+            for pk, args in partitions.items()
+        }
+        for future in as_completed(futures):
+            try:
+                finished(futures[future], future.result())
+            except Exception as exc:
+                finished(futures[future], error=exc)
+    return report
@@ -0,0 +1,150 @@
+"""
+Current tray locations.
+
+A tray is wherever its latest allocation up to today is; bookings
+further ahead do not move it yet. Finding that per tray means a
+correlated lookup through Allocation, Procedure and Event, so
+TrayLocation keeps the answer: one row per allocated tray holding the
+hospital and date of that allocation. The signals in event.signals
+refresh a tray's row once an allocation, procedure or event affecting it
+commits, so reads are a single primary key lookup. A booking coming due
+changes nothing in the database, ``relocate_due_trays`` (run daily by
+``rebuild_tray_locations --due``) moves those trays.
+"""
+from django.db.models import F, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from core.models import Tray
+from .models import Allocation, TrayLocation
+
+
+CHUNK_SIZE = 1000
+
+
+def latest_allocation(allocations, today):
+    """Return a subquery for the pk of each tray's latest past allocation."""
+    return Subquery(
+        allocations.filter(
+            tray=OuterRef('pk'), event_date__lte=today
+        ).order_by('-event_date', '-pk').values('pk')[:1]
+    )
+
+
+def iter_locations(trays, allocations, today, chunk_size=CHUNK_SIZE):
+    """
+    Stream ``(tray id, allocation id, hospital id, event date)`` rows.
+
+    Trays are read in keyset paginated chunks, each with its latest
+    allocation up to ``today`` picked in the same query and one more
+    query for those allocations' hospitals. Trays without one get None
+    throughout.
+
+    Args:
+        trays (QuerySet): The trays to locate.
+        allocations (Manager): Allocation manager to read from.
+        today (date): Allocations after this day are left out.
+        chunk_size (int): Trays read per query.
+    """
+    last_pk = 0
+    while True:
+        chunk = list(
+            trays.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .annotate(latest=latest_allocation(allocations, today))
+            .values_list('pk', 'latest')[:chunk_size]
+        )
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+
+        places = {
+            pk: (hospital_id, event_date)
+            for pk, hospital_id, event_date in allocations.filter(
+                pk__in=[latest for _, latest in chunk if latest]
+            ).values_list('pk', 'procedure__event__hospital', 'event_date')
+        }
+        for tray_id, latest in chunk:
+            yield (tray_id, latest, *places.get(latest, (None, None)))
+
+
+def write_locations(location_model, locations, chunk_size=CHUNK_SIZE):
+    """
+    Upsert located trays and drop the rows of trays no longer allocated.
+
+    Returns:
+        int: The number of location rows written.
+    """
+    written = 0
+    batch, unallocated = [], []
+    for tray_id, allocation_id, hospital_id, event_date in locations:
+        if allocation_id is None:
+            unallocated.append(tray_id)
+        else:
+            batch.append(location_model(
+                tray_id=tray_id,
+                allocation_id=allocation_id,
+                hospital_id=hospital_id,
+                event_date=event_date,
+            ))
+        if len(batch) >= chunk_size:
+            written += _upsert(location_model, batch)
+            batch = []
+        if len(unallocated) >= chunk_size:
+            location_model.objects.filter(tray_id__in=unallocated).delete()
+            unallocated = []
+    if batch:
+        written += _upsert(location_model, batch)
+    if unallocated:
+        location_model.objects.filter(tray_id__in=unallocated).delete()
+    return written
+
+
+def _upsert(location_model, batch):
+    location_model.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['tray'],
+        update_fields=['allocation', 'hospital', 'event_date', 'updated_at'],
+    )
+    return len(batch)
+
+
+def refresh_tray_locations(trays, chunk_size=CHUNK_SIZE, today=None):
+    """
+    Recompute the location rows of the given trays.
+
+    Args:
+        trays (QuerySet): The trays to refresh.
+        chunk_size (int): Trays read and written per batch.
+        today (date): Locate the trays as of this day, defaults to today.
+
+    Returns:
+        int: The number of location rows written.
+    """
+    locations = iter_locations(
+        trays, Allocation.objects, today or timezone.localdate(), chunk_size
+    )
+    return write_locations(TrayLocation, locations, chunk_size)
+
+
+def rebuild_tray_locations(chunk_size=CHUNK_SIZE):
+    """Relocate every tray, returns the number of rows written."""
+    return refresh_tray_locations(Tray.objects.all(), chunk_size)
+
+
+def relocate_due_trays(chunk_size=CHUNK_SIZE, today=None):
+    """
+    Relocate the trays with a booking come due since their row was written.
+
+    Returns:
+        int: The number of location rows written.
+    """
+    today = today or timezone.localdate()
+    due = Tray.objects.filter(
+        Q(location__isnull=True)
+        | Q(allocations__event_date__gt=F('location__event_date')),
+        allocations__event_date__lte=today,
+    )
+    return refresh_tray_locations(
+        Tray.objects.filter(pk__in=due.values('pk')), chunk_size, today
+    )
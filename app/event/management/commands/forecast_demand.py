@@ -0,0 +1,50 @@
+"""
+Django command to forecast product demand and reorder points.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from event.forecasting import BLOCK_SIZE, HISTORY_DAYS, run_forecasts
+
+
+class Command(BaseCommand):
+    """Forecast every used product and store its reorder point.
+
+    Meant to run nightly, the low-stock report reads the results. Lead
+    time and service level default to the REORDER_* settings.
+    """
+    help = 'Forecast product demand, safety stock and reorder points.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lead-time', type=int, default=None,
+            help='Days from ordering to delivery.'
+        )
+        parser.add_argument(
+            '--z', type=float, default=None,
+            help='Service level z-score for the safety stock.'
+        )
+        parser.add_argument(
+            '--history-days', type=int, default=HISTORY_DAYS,
+            help='Days of usage history read.'
+        )
+        parser.add_argument(
+            '--block-size', type=int, default=BLOCK_SIZE,
+            help='Products forecast per block.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.perf_counter()
+        forecast = run_forecasts(
+            lead_time=options['lead_time'],
+            z=options['z'],
+            history_days=options['history_days'],
+            block_size=options['block_size'],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Forecast {forecast} products in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,95 @@
+"""
+Django command to provision trays from a tray type template.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from core.models import TrayType
+from event.provisioning import (
+    BATCH_SIZE,
+    generate_codes,
+    provision_trays,
+    sync_trays,
+)
+
+
+class Command(BaseCommand):
+    """Create trays of a tray type, or re-sync the existing ones.
+
+    New trays are named ``<prefix><number>`` (``--prefix MAN- --count 20``
+    gives MAN-001 to MAN-020) or listed with ``--codes``. ``--sync``
+    resets the inventory of every tray of the type to its template.
+    """
+    help = 'Bulk create trays from a tray type template or re-sync them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tray_type', help='Tray type name or id.')
+        parser.add_argument(
+            '--user', required=True,
+            help='Email of the user recorded on the inventory rows.'
+        )
+        parser.add_argument('--prefix', help='Code prefix for new trays.')
+        parser.add_argument(
+            '--count', type=int, help='Number of new trays.'
+        )
+        parser.add_argument(
+            '--start', type=int, default=None,
+            help='Number of the first new tray, by default the one after '
+                 'the highest existing code with the prefix.'
+        )
+        parser.add_argument(
+            '--codes', nargs='+', help='Explicit codes for new trays.'
+        )
+        parser.add_argument(
+            '--sync', action='store_true',
+            help='Re-sync the existing trays instead of creating new ones.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Trays written per batch.'
+        )
+
+    def get_tray_type(self, value):
+        """Look the tray type up by id or name."""
+        lookup = {'pk': value} if value.isdigit() else {'name': value}
+        try:
+            return TrayType.objects.get(**lookup)
+        except TrayType.DoesNotExist:
+            raise CommandError(f'Tray type {value} does not exist.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        tray_type = self.get_tray_type(options['tray_type'])
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        if options['sync']:
+            result = sync_trays(
+                tray_type, user, batch_size=options['batch_size']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f'Synced {result.trays} trays: {result.created} rows added, '
+                f'{result.updated} updated, {result.deleted} removed.'
+            ))
+            return
+
+        codes = options['codes']
+        if not codes:
+            if not options['prefix'] or not options['count']:
+                raise CommandError('Give --codes or --prefix and --count.')
+            codes = generate_codes(
+                options['prefix'], options['count'], start=options['start']
+            )
+        try:
+            trays = provision_trays(
+                tray_type, codes, user, batch_size=options['batch_size']
+            )
+        except IntegrityError as exc:
+            raise CommandError(f'Tray codes already exist: {exc}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Provisioned {len(trays)} {tray_type.name} trays.'
+        ))
@@ -0,0 +1,49 @@
+"""
+Django command to rebuild the current tray locations.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from event.locations import (
+    CHUNK_SIZE,
+    rebuild_tray_locations,
+    relocate_due_trays,
+)
+
+
+class Command(BaseCommand):
+    """Recompute every tray's TrayLocation row from its allocations.
+
+    Trays are streamed in primary key order and upserted a chunk at a
+    time, so memory use stays flat however many trays exist. ``--due``
+    only relocates the trays whose bookings have come due and is meant
+    to run daily, just after midnight.
+    """
+    help = 'Rebuild the current location of every tray.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Trays read and written per batch.'
+        )
+        parser.add_argument(
+            '--due', action='store_true',
+            help='Only relocate trays with bookings come due since their '
+                 'location was written.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.perf_counter()
+        if options['due']:
+            written = relocate_due_trays(chunk_size=options['chunk_size'])
+        else:
+            written = rebuild_tray_locations(
+                chunk_size=options['chunk_size']
+            )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Located {written} trays in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,37 @@
+"""
+Django command to reconcile the usage rollups with Usage.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from event.rollups import CHUNK_SIZE, rebuild_usage_rollups
+
+
+class Command(BaseCommand):
+    """Recompute every UsageRollup row from the usages.
+
+    The signals keep the rollups current, this catches up on writes
+    that sent no signals, like bulk updates, and removes rows no usage
+    backs any more.
+    """
+    help = 'Rebuild the usage rollups from the Usage table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Rollup rows read and written per batch.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.perf_counter()
+        written, removed = rebuild_usage_rollups(
+            chunk_size=options['chunk_size']
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {written} rollups, removed {removed} '
+            f'in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,39 @@
+"""
+Django command to refresh the tray turnaround analytics.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from event.analytics import CHUNK_SIZE, refresh_usage_stats
+
+
+class Command(BaseCommand):
+    """Recompute TrayUsageStats for trays with new allocations.
+
+    Meant to run nightly. Only trays with allocations saved since the
+    previous run are read again, ``--full`` recomputes every tray.
+    """
+    help = 'Refresh the tray turnaround analytics incrementally.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Recompute every tray, not only the changed ones.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Trays recomputed per query.'
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        start = time.perf_counter()
+        refreshed = refresh_usage_stats(
+            full=options['full'], chunk_size=options['chunk_size']
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {refreshed} trays in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,98 @@
+"""
+Django command to write a month's invoices for every hospital.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from event.billing import CHUNK_SIZE
+from event.invoicing import month_range, run_invoices
+
+
+class Command(BaseCommand):
+    """Write the invoices of a month, one file per hospital.
+
+    Hospitals are billed in parallel over a process pool. Each finished
+    hospital is recorded in the run directory's manifest, so running the
+    command again after a crash only bills the hospitals still missing.
+    """
+    help = 'Write a month of invoices per hospital over a process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'month', nargs='?',
+            help='Month to bill as YYYY-MM, defaults to last month.'
+        )
+        parser.add_argument(
+            '--output-dir', default='invoices',
+            help='Directory the month\'s run directory is created in.'
+        )
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Worker processes (defaults to the CPU count).'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Bill every hospital again, ignoring the manifest.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Invoice lines fetched per cursor read.'
+        )
+
+    def get_month(self, value):
+        """Return the month to bill, last month by default."""
+        if value is None:
+            first = timezone.localdate().replace(day=1)
+            return (first - timedelta(days=1)).strftime('%Y-%m')
+        try:
+            month_range(value)
+        except ValueError:
+            raise CommandError(f'{value} is not a YYYY-MM month.')
+        return value
+
+    def report(self, result, count, total):
+        """Print each hospital as it finishes."""
+        if 'error' in result:
+            self.stderr.write(
+                f"[{count}/{total}] Hospital {result['hospital']} failed: "
+                f"{result['error']}"
+            )
+        else:
+            self.stdout.write(
+                f"[{count}/{total}] Hospital {result['hospital']}: "
+                f"{result['invoices']} invoices, {result['gross']} gross "
+                f"in {result['seconds']}s"
+            )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        month = self.get_month(options['month'])
+        directory = os.path.join(options['output_dir'], month)
+        start = time.perf_counter()
+        try:
+            result = run_invoices(
+                *month_range(month),
+                directory,
+                processes=options['processes'],
+                restart=options['restart'],
+                chunk_size=options['chunk_size'],
+                progress=self.report,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+
+        if result['failed']:
+            raise CommandError(
+                f"{len(result['failed'])} hospitals failed, run the "
+                f"command again to retry them."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Billed {len(result['billed'])} hospitals "
+            f"({result['skipped']} already done) into {directory} "
+            f"in {elapsed:.2f}s."
+        ))
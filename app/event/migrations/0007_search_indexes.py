@@ -0,0 +1,59 @@
+"""
+Indexes backing the admin and API text search.
+
+PostgreSQL gets pg_trgm GIN indexes on UPPER(column), which serve
+Django's icontains lookups. SQLite gets NOCASE b-tree indexes for the
+prefix-only fallback.
+"""
+from django.db import migrations
+
+
+SEARCH_COLUMNS = {
+    'event_procedure': ('patient_name', 'patient_surname', 'case_number'),
+    'event_event': ('description',),
+}
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    elif vendor != 'sqlite':
+        return
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            if vendor == 'postgresql':
+                schema_editor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm '
+                    f'ON {table} USING gin '
+                    f'(UPPER("{column}"::text) gin_trgm_ops)'
+                )
+            else:
+                schema_editor.execute(
+                    f'CREATE INDEX IF NOT EXISTS {table}_{column}_nocase '
+                    f'ON {table} ("{column}" COLLATE NOCASE)'
+                )
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in ('postgresql', 'sqlite'):
+        return
+    suffix = 'trgm' if vendor == 'postgresql' else 'nocase'
+    for table, columns in SEARCH_COLUMNS.items():
+        for column in columns:
+            schema_editor.execute(
+                f'DROP INDEX IF EXISTS {table}_{column}_{suffix}'
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_search_indexes'),
+        ('event', '0006_alter_inventory_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.1.15 on 2026-10-19 04:57
+
+import re
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# A frozen copy of event.search's document format, so later changes to
+# that module leave this migration alone
+CHUNK_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+DOCUMENT_FIELDS = (
+    'patient_name',
+    'patient_surname',
+    'case_number',
+    'event__doctor__user__firstname',
+    'event__doctor__user__surname',
+    'event__hospital__name',
+)
+
+
+def create_document_index(apps, schema_editor):
+    # Index rows hold lowercase words, so a plain trigram index serves
+    # the LIKE ' word%' style contains lookups.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS event_proceduresearchindex_trgm '
+            'ON event_proceduresearchindex USING gin '
+            '(document gin_trgm_ops)'
+        )
+
+
+def drop_document_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS event_proceduresearchindex_trgm'
+        )
+
+
+def build_document(values, tray_codes):
+    words = set()
+    for value in [*(values[field] for field in DOCUMENT_FIELDS), *tray_codes]:
+        if value:
+            words.update(WORD_RE.findall(str(value).lower()))
+    return f" {' '.join(sorted(words))} "
+
+
+def populate_index(apps, schema_editor):
+    Procedure = apps.get_model('event', 'Procedure')
+    Allocation = apps.get_model('event', 'Allocation')
+    ProcedureSearchIndex = apps.get_model('event', 'ProcedureSearchIndex')
+    last_pk = 0
+    while True:
+        chunk = list(
+            Procedure.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values('pk', *DOCUMENT_FIELDS)
+            .distinct()[:CHUNK_SIZE]
+        )
+        if not chunk:
+            return
+        last_pk = chunk[-1]['pk']
+
+        tray_codes = defaultdict(list)
+        rows = Allocation.objects.filter(
+            procedure_id__in=[row['pk'] for row in chunk]
+        ).values_list('procedure_id', 'tray__code')
+        for procedure_id, code in rows:
+            tray_codes[procedure_id].append(code)
+
+        ProcedureSearchIndex.objects.bulk_create([
+            ProcedureSearchIndex(
+                procedure_id=row['pk'],
+                document=build_document(row, tray_codes[row['pk']]),
+            )
+            for row in chunk
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0007_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcedureSearchIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('procedure', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_index', to='event.procedure')),
+            ],
+            options={
+                'verbose_name_plural': 'Procedure Search Index',
+            },
+        ),
+        migrations.RunPython(create_document_index, drop_document_index),
+        migrations.RunPython(populate_index, migrations.RunPython.noop),
+    ]
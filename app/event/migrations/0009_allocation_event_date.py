@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_event_dates(apps, schema_editor):
+    Allocation = apps.get_model('event', 'Allocation')
+    Event = apps.get_model('event', 'Event')
+    Allocation.objects.update(event_date=Subquery(
+        Event.objects.filter(
+            procedure=OuterRef('procedure_id')
+        ).values('date')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0008_procedure_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='allocation',
+            name='event_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(copy_event_dates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='allocation',
+            index=models.Index(fields=['tray', 'event_date'], name='event_alloc_tray_date_idx'),
+        ),
+    ]
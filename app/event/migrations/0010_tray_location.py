@@ -0,0 +1,71 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+CHUNK_SIZE = 1000
+
+
+def populate_locations(apps, schema_editor):
+    # Each allocated tray's latest allocation, as event.locations picks
+    # it when this migration was written
+    Tray = apps.get_model('core', 'Tray')
+    Allocation = apps.get_model('event', 'Allocation')
+    TrayLocation = apps.get_model('event', 'TrayLocation')
+    latest = Subquery(
+        Allocation.objects.filter(tray=OuterRef('pk')).order_by(
+            F('event_date').desc(nulls_last=True), '-pk'
+        ).values('pk')[:1]
+    )
+    last_pk = 0
+    while True:
+        chunk = list(
+            Tray.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .annotate(latest=latest)
+            .values_list('pk', 'latest')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            return
+        last_pk = chunk[-1][0]
+
+        places = {
+            pk: (hospital_id, event_date)
+            for pk, hospital_id, event_date in Allocation.objects.filter(
+                pk__in=[pk for _, pk in chunk if pk]
+            ).values_list('pk', 'procedure__event__hospital', 'event_date')
+        }
+        TrayLocation.objects.bulk_create([
+            TrayLocation(
+                tray_id=tray_id,
+                allocation_id=allocation_id,
+                hospital_id=places[allocation_id][0],
+                event_date=places[allocation_id][1],
+            )
+            for tray_id, allocation_id in chunk if allocation_id
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0009_allocation_event_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrayLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_date', models.DateField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('allocation', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='event.allocation')),
+                ('hospital', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tray_locations', to='core.hospital')),
+                ('tray', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='location', to='core.tray')),
+            ],
+        ),
+        migrations.RunPython(populate_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-19 05:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0010_tray_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('watermark', models.DateTimeField(null=True)),
+                ('finished_at', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TrayUsageStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uses', models.PositiveIntegerField(default=0)),
+                ('first_used', models.DateField()),
+                ('last_used', models.DateField()),
+                ('total_gap_days', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tray', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='usage_stats', to='core.tray')),
+            ],
+            options={
+                'verbose_name_plural': 'Tray usage stats',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-19 09:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_prices(apps, schema_editor):
+    """Price past usages at their product's current prices."""
+    Usage = apps.get_model('event', 'Usage')
+    Product = apps.get_model('core', 'Product')
+    product = Product.objects.filter(pk=OuterRef('item_id'))
+    Usage.objects.update(
+        unit_price=Subquery(product.values('base_price')[:1]),
+        unit_vat_price=Subquery(product.values('vat_price')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0011_tray_usage_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usage',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='usage',
+            name='unit_vat_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=8, null=True),
+        ),
+        migrations.RunPython(snapshot_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='usage',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=8),
+        ),
+        migrations.AlterField(
+            model_name='usage',
+            name='unit_vat_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=8),
+        ),
+    ]
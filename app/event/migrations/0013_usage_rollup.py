@@ -0,0 +1,76 @@
+# Generated by Django 5.1.15 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+
+CHUNK_SIZE = 1000
+
+MONEY = models.DecimalField(max_digits=14, decimal_places=2)
+
+
+def populate_rollups(apps, schema_editor):
+    Usage = apps.get_model('event', 'Usage')
+    UsageRollup = apps.get_model('event', 'UsageRollup')
+    rows = Usage.objects.values(
+        month=TruncMonth('allocation__procedure__event__date'),
+        hospital_id=F('allocation__procedure__event__hospital'),
+        doctor_id=F('allocation__procedure__event__doctor'),
+        product_id=F('item'),
+    ).annotate(
+        usage_count=Count('pk'),
+        units=Sum('quantity'),
+        net_total=Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+        gross_total=Sum(
+            F('quantity') * F('unit_vat_price'), output_field=MONEY
+        ),
+    ).order_by()
+    batch = []
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        batch.append(UsageRollup(
+            month=row['month'],
+            hospital_id=row['hospital_id'],
+            doctor_id=row['doctor_id'],
+            product_id=row['product_id'],
+            usages=row['usage_count'],
+            quantity=row['units'],
+            net=row['net_total'],
+            gross=row['gross_total'],
+        ))
+        if len(batch) >= CHUNK_SIZE:
+            UsageRollup.objects.bulk_create(batch)
+            batch = []
+    UsageRollup.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0012_usage_price_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('usages', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='core.doctor')),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='core.hospital')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='core.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['doctor', 'month'], name='event_rollup_doctor_idx'), models.Index(fields=['hospital', 'month'], name='event_rollup_hospital_idx'), models.Index(fields=['product', 'month'], name='event_rollup_product_idx')],
+                'constraints': [models.UniqueConstraint(fields=('month', 'hospital', 'doctor', 'product'), name='event_usage_rollup_key')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
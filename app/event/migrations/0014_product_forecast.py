@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-19 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_populate_product_categories'),
+        ('event', '0013_usage_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_daily', models.FloatField()),
+                ('seasonal_daily', models.FloatField()),
+                ('std_daily', models.FloatField()),
+                ('lead_time_days', models.PositiveSmallIntegerField()),
+                ('lead_time_demand', models.FloatField()),
+                ('safety_stock', models.PositiveIntegerField()),
+                ('reorder_point', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='forecast', to='core.product')),
+            ],
+        ),
+    ]
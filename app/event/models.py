@@ -107,6 +107,23 @@ class Procedure(models.Model):
         super().save(*args, **kwargs)    
 
 
+class ProcedureSearchIndex(models.Model):
+    """Flattened search text for a procedure, see event.search."""
+    procedure = models.OneToOneField(
+        Procedure,
+        on_delete=models.CASCADE,
+        related_name='search_index',
+    )
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Procedure Search Index"
+
+    def __str__(self):
+        return f"Search index for procedure #{self.procedure_id}"
+
+
 class Allocation(models.Model):
     procedure = models.ForeignKey(
         Procedure,
@@ -119,6 +136,9 @@ class Allocation(models.Model):
         related_name='allocations'
     )
     is_replenishment = models.BooleanField(default=False)
+    # Copy of procedure.event.date, kept in step by save() and
+    # event.signals, so double bookings are found on one index.
+    event_date = models.DateField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     created_by = models.ForeignKey(
         get_user_model(), 
@@ -135,6 +155,14 @@ class Allocation(models.Model):
 
     objects = EventFlowManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['tray', 'event_date'],
+                name='event_alloc_tray_date_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.tray} for {self.procedure}"
     
@@ -142,6 +170,9 @@ class Allocation(models.Model):
         """Override save method to modify the updated_by field and handle replenishment."""
         if 'request' in kwargs:
             self.updated_by = kwargs.pop('request').user
+        self.event_date = Event.objects.filter(
+            procedure=self.procedure_id
+        ).values_list('date', flat=True).first()
         super().save(*args, **kwargs)
     
         if self.is_replenishment:
@@ -160,6 +191,63 @@ class Allocation(models.Model):
                 inventory_item.save()
 
 
+class TrayLocation(models.Model):
+    """Where each tray currently is, see event.locations."""
+    tray = models.OneToOneField(
+        Tray,
+        on_delete=models.CASCADE,
+        related_name='location',
+    )
+    allocation = models.ForeignKey(
+        Allocation,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+    )
+    hospital = models.ForeignKey(
+        Hospital,
+        on_delete=models.SET_NULL,
+        related_name='tray_locations',
+        null=True,
+    )
+    event_date = models.DateField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tray} @{self.hospital}"
+
+
+class TrayUsageStats(models.Model):
+    """Running use counts of a tray, see event.analytics."""
+    tray = models.OneToOneField(
+        Tray,
+        on_delete=models.CASCADE,
+        related_name='usage_stats',
+    )
+    uses = models.PositiveIntegerField(default=0)
+    first_used = models.DateField()
+    last_used = models.DateField()
+    # Days between consecutive uses, summed over uses - 1 gaps
+    total_gap_days = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Tray usage stats"
+
+    def __str__(self):
+        return f"{self.tray}: {self.uses} uses"
+
+
+class AnalyticsRun(models.Model):
+    """How far an incremental analytics job has read."""
+    name = models.CharField(max_length=64, unique=True)
+    watermark = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"{self.name} up to {self.watermark}"
+
+
 class Inventory(models.Model):
     tray = models.ForeignKey(
         Tray,
@@ -216,6 +304,14 @@ class Usage(models.Model):
         related_name='usage_items'
     )
     quantity = models.PositiveSmallIntegerField()
+    # The item's base_price and vat_price when it was used, set by save()
+    # so repricing a product leaves past invoices alone, see event.billing
+    unit_price = models.DecimalField(
+        max_digits=8, decimal_places=2, editable=False
+    )
+    unit_vat_price = models.DecimalField(
+        max_digits=8, decimal_places=2, editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     created_by = models.ForeignKey(
         get_user_model(), 
@@ -239,6 +335,9 @@ class Usage(models.Model):
         """Override save method to update tray item quantities and inventory."""
         if 'request' in kwargs:
             self.updated_by = kwargs.pop('request').user
+        if self.unit_price is None or self._item_changed():
+            self.unit_price = self.item.base_price
+            self.unit_vat_price = self.item.vat_price
         
         super().save(*args, **kwargs)
 
@@ -254,6 +353,90 @@ class Usage(models.Model):
             inventory.quantity -= self.quantity
             inventory.save()
 
+    def _item_changed(self):
+        """Whether a saved usage is being moved to another product."""
+        if self._state.adding:
+            return False
+        saved = Usage.objects.filter(pk=self.pk).values_list(
+            'item_id', flat=True
+        ).first()
+        return saved is not None and saved != self.item_id
+
+
+class UsageRollup(models.Model):
+    """Usage totals per month, hospital, doctor and product.
+
+    Kept in step with Usage by event.signals, see event.rollups.
+    """
+    month = models.DateField(help_text='First day of the month.')
+    hospital = models.ForeignKey(
+        Hospital,
+        on_delete=models.CASCADE,
+        related_name='usage_rollups',
+    )
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='usage_rollups',
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='usage_rollups',
+    )
+    usages = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['month', 'hospital', 'doctor', 'product'],
+                name='event_usage_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['doctor', 'month'], name='event_rollup_doctor_idx'
+            ),
+            models.Index(
+                fields=['hospital', 'month'], name='event_rollup_hospital_idx'
+            ),
+            models.Index(
+                fields=['product', 'month'], name='event_rollup_product_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} of {self.product} in {self.month:%Y-%m}"
+
+
+class ProductForecast(models.Model):
+    """Forecast demand and reorder point of a product.
+
+    Written by the forecasting job, see event.forecasting.
+    """
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='forecast',
+    )
+    # Units per day: moving average, then adjusted for the weekdays and
+    # time of year of the coming lead time
+    average_daily = models.FloatField()
+    seasonal_daily = models.FloatField()
+    std_daily = models.FloatField()
+    lead_time_days = models.PositiveSmallIntegerField()
+    lead_time_demand = models.FloatField()
+    safety_stock = models.PositiveIntegerField()
+    reorder_point = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product}: reorder at {self.reorder_point}"
+
 
 class Order(models.Model):
     """Model to log new orders"""
@@ -0,0 +1,218 @@
+"""
+Bulk tray provisioning from TrayType templates.
+
+A TrayType's TrayItem rows are the template every tray of that type is
+packed to. ``provision_trays`` registers many new trays at once and
+seeds their Inventory rows from the template, ``sync_trays`` brings the
+Inventory of existing trays back in line with the template after its
+quantities change. Both work a batch of trays at a time with the same
+few statements per batch, however many trays or template items exist.
+"""
+import re
+from dataclasses import dataclass
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from core.cache import bump_cache_version
+from core.models import Tray
+from .models import Inventory
+
+
+BATCH_SIZE = 500
+
+# Tries at numbering new trays when another provisioning takes the codes
+PROVISION_ATTEMPTS = 3
+
+
+@dataclass
+class SyncResult:
+    """Inventory rows changed by a template re-sync."""
+    trays: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+
+
+def next_code_number(prefix):
+    """Return the number after the highest ``<prefix><number>`` code."""
+    highest = Tray.objects.filter(
+        code__regex=rf'^{re.escape(prefix)}[0-9]+$'
+    ).aggregate(
+        highest=Max(Cast(Substr('code', len(prefix) + 1), IntegerField()))
+    )['highest']
+    return (highest or 0) + 1
+
+
+def generate_codes(prefix, count, start=None, width=3):
+    """
+    Return ``count`` numbered tray codes, e.g. ``MAN-001``.
+
+    Numbering starts after the highest code already using the prefix
+    unless ``start`` is given, so codes freed by deleted trays are not
+    handed out again.
+    """
+    if start is None:
+        start = next_code_number(prefix)
+    return [
+        f'{prefix}{number:0{width}d}' for number in range(start, start + count)
+    ]
+
+
+def template_quantities(tray_type):
+    """Return the template quantity of each product, keyed by product id."""
+    return dict(
+        tray_type.tray_items.values_list('product_id', 'quantity')
+    )
+
+
+def _batches(items, batch_size):
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
+
+
+def provision_trays(tray_type, codes, user, batch_size=BATCH_SIZE):
+    """
+    Create trays of a tray type and fill their Inventory from its template.
+
+    Each batch costs three statements: one insert for the trays, one
+    select for their ids and one insert for their inventory rows.
+
+    Args:
+        tray_type (TrayType): The template to pack the trays to.
+        codes (list): The codes of the new trays.
+        user (User): Recorded as the creator of the inventory rows.
+        batch_size (int): Trays written per batch.
+
+    Returns:
+        list: The new trays.
+    """
+    template = template_quantities(tray_type)
+    trays = []
+    with transaction.atomic():
+        for batch in _batches(list(codes), batch_size):
+            Tray.objects.bulk_create(
+                Tray(code=code, tray_type=tray_type) for code in batch
+            )
+            # Not every backend returns the new primary keys from a bulk
+            # insert, read them back by their unique codes instead.
+            created = list(Tray.objects.filter(code__in=batch))
+            Inventory.objects.bulk_create(
+                Inventory(
+                    tray=tray,
+                    item_id=product_id,
+                    quantity=quantity,
+                    created_by=user,
+                )
+                for tray in created
+                for product_id, quantity in template.items()
+            )
+            trays.extend(created)
+        # bulk_create sends no post_save, expire the cached tray lists
+        transaction.on_commit(partial(bump_cache_version, 'trays'))
+    return sorted(trays, key=lambda tray: tray.code)
+
+
+def provision_numbered_trays(tray_type, prefix, count, user,
+                             attempts=PROVISION_ATTEMPTS):
+    """
+    Provision ``count`` trays numbered on from the prefix's highest code.
+
+    Another provisioning may take the same numbers between reading the
+    highest code and inserting; the insert then fails on the unique code
+    and the numbers are read again.
+
+    Raises:
+        IntegrityError: If the codes were still taken after ``attempts``.
+    """
+    for attempt in range(attempts):
+        try:
+            return provision_trays(
+                tray_type, generate_codes(prefix, count), user
+            )
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def _sync_batch(tray_ids, template, user, result):
+    """Make the inventory of a batch of trays match the template."""
+    existing = {}
+    deletes = []
+    rows = Inventory.objects.filter(tray_id__in=tray_ids).order_by('id')
+    for row in rows.only('id', 'tray_id', 'item_id', 'quantity'):
+        key = (row.tray_id, row.item_id)
+        if row.item_id not in template or key in existing:
+            # Not on the template, or a duplicate of a row already kept
+            deletes.append(row.id)
+        else:
+            existing[key] = row
+
+    now = timezone.now()
+    updates, creates = [], []
+    for tray_id in tray_ids:
+        for product_id, quantity in template.items():
+            row = existing.get((tray_id, product_id))
+            if row is None:
+                creates.append(Inventory(
+                    tray_id=tray_id,
+                    item_id=product_id,
+                    quantity=quantity,
+                    created_by=user,
+                ))
+            elif row.quantity != quantity:
+                row.quantity = quantity
+                row.updated_by = user
+                row.updated_at = now
+                updates.append(row)
+
+    if deletes:
+        Inventory.objects.filter(id__in=deletes).delete()
+    if updates:
+        Inventory.objects.bulk_update(
+            updates, ['quantity', 'updated_by', 'updated_at'],
+            batch_size=len(updates),
+        )
+    if creates:
+        Inventory.objects.bulk_create(creates)
+
+    result.trays += len(tray_ids)
+    result.created += len(creates)
+    result.updated += len(updates)
+    result.deleted += len(deletes)
+
+
+def sync_trays(tray_type, user, trays=None, batch_size=BATCH_SIZE):
+    """
+    Re-sync the Inventory of existing trays with their template.
+
+    Missing products are added, quantities that differ are reset and
+    products the template no longer lists are removed. Each batch costs
+    at most four statements: one select, one delete, one update and one
+    insert.
+
+    Args:
+        tray_type (TrayType): The template to sync to.
+        user (User): Recorded on the rows created or updated.
+        trays (QuerySet, optional): The trays to sync, by default every
+            tray of the tray type.
+        batch_size (int): Trays synced per batch.
+
+    Returns:
+        SyncResult: The number of trays and rows changed.
+    """
+    if trays is None:
+        trays = tray_type.trays.all()
+    tray_ids = list(
+        trays.filter(tray_type=tray_type)
+        .order_by('id').values_list('id', flat=True)
+    )
+    template = template_quantities(tray_type)
+    result = SyncResult()
+    with transaction.atomic():
+        for batch in _batches(tray_ids, batch_size):
+            _sync_batch(batch, template, user, result)
+    return result
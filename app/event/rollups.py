@@ -0,0 +1,283 @@
+"""
+Usage rollups.
+
+UsageRollup totals the usages of each product per month, hospital and
+doctor, so reports read a handful of rows instead of joining Usage,
+Allocation, Procedure and Event. The signals in event.signals keep it in
+step, in the same transaction as the write:
+
+* a usage logged, changed or deleted adds its difference to its row
+  with F() increments;
+* an event, procedure or allocation moved to another month, hospital,
+  doctor or parent recomputes the rows its usages left and joined.
+
+Bulk writes (QuerySet.update, bulk_create) send no signals, so
+rebuild_usage_rollups recomputes the whole table from Usage and drops
+stray rows to reconcile it.
+"""
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Allocation, Usage, UsageRollup
+
+
+CHUNK_SIZE = 1000
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+GROUPS = ('month', 'hospital', 'doctor', 'product')
+
+# The rollup key of a usage, read through its allocation
+KEY = {
+    'month': TruncMonth('allocation__procedure__event__date'),
+    'hospital_id': F('allocation__procedure__event__hospital'),
+    'doctor_id': F('allocation__procedure__event__doctor'),
+    'product_id': F('item'),
+}
+
+TOTALS = ('usages', 'quantity', 'net', 'gross')
+
+
+def iter_totals(usages, chunk_size=CHUNK_SIZE):
+    """
+    Stream the rollup rows of a Usage queryset, one grouped query.
+
+    Yields:
+        dict: The key fields and the usages, quantity, net and gross.
+    """
+    rows = usages.values(**KEY).annotate(
+        usage_count=Count('pk'),
+        units=Sum('quantity'),
+        net_total=Sum(F('quantity') * F('unit_price'), output_field=MONEY),
+        gross_total=Sum(
+            F('quantity') * F('unit_vat_price'), output_field=MONEY
+        ),
+    ).order_by()
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            **{field: row[field] for field in KEY},
+            'usages': row['usage_count'],
+            'quantity': row['units'],
+            'net': row['net_total'],
+            'gross': row['gross_total'],
+        }
+
+
+def write_rollups(rollup_model, rows, chunk_size=CHUNK_SIZE):
+    """
+    Upsert rollup rows, returns the number written.
+
+    Args:
+        rollup_model (Model): The UsageRollup model to write to.
+        rows (iterable): Rollup rows as from iter_totals.
+        chunk_size (int): Rows written per query.
+    """
+    written = 0
+    batch = []
+    for row in rows:
+        batch.append(rollup_model(**row))
+        if len(batch) >= chunk_size:
+            written += _upsert(rollup_model, batch)
+            batch = []
+    if batch:
+        written += _upsert(rollup_model, batch)
+    return written
+
+
+def _upsert(rollup_model, batch):
+    rollup_model.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['month', 'hospital', 'doctor', 'product'],
+        update_fields=[*TOTALS, 'updated_at'],
+    )
+    return len(batch)
+
+
+def _key(row):
+    return tuple(row[field] for field in KEY)
+
+
+def _key_filter(key):
+    return Q(**dict(zip(KEY, key)))
+
+
+def rollup_keys(usages):
+    """Return the rollup keys the usages add to, one query."""
+    return {
+        _key(row) for row in usages.values(**KEY).order_by().distinct()
+    }
+
+
+def refresh_rollups(keys):
+    """
+    Recompute the rollup rows of the given keys from Usage.
+
+    Used when usages move between keys with the event, procedure or
+    allocation they belong to. Keys left without usages lose their row.
+
+    Returns:
+        int: The number of rows written.
+    """
+    keys = set(keys)
+    if not keys:
+        return 0
+    months = sorted(key[0] for key in keys)
+    usages = Usage.objects.filter(
+        allocation__procedure__event__date__gte=months[0],
+        allocation__procedure__event__date__lt=_next_month(months[-1]),
+        allocation__procedure__event__hospital__in={key[1] for key in keys},
+        allocation__procedure__event__doctor__in={key[2] for key in keys},
+        item__in={key[3] for key in keys},
+    )
+    rows = [row for row in iter_totals(usages) if _key(row) in keys]
+    emptied = keys - {_key(row) for row in rows}
+    if emptied:
+        UsageRollup.objects.filter(
+            reduce(or_, map(_key_filter, emptied))
+        ).delete()
+    return write_rollups(UsageRollup, rows)
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def usage_key(allocation_id, product_id):
+    """Return the rollup key of a usage, None if its allocation is gone."""
+    row = Allocation.objects.filter(pk=allocation_id).values_list(
+        TruncMonth('procedure__event__date'),
+        'procedure__event__hospital',
+        'procedure__event__doctor',
+    ).first()
+    return row and (*row, product_id)
+
+
+def add_to_rollup(key, usages, quantity, net, gross):
+    """
+    Add a difference to a key's rollup row with F() increments.
+
+    A missing row is created for a positive difference. Rows left
+    without usages are deleted.
+    """
+    changed = UsageRollup.objects.filter(_key_filter(key)).update(
+        usages=F('usages') + usages,
+        quantity=F('quantity') + quantity,
+        net=F('net') + net,
+        gross=F('gross') + gross,
+        updated_at=timezone.now(),
+    )
+    if changed:
+        if usages < 0:
+            UsageRollup.objects.filter(
+                _key_filter(key), usages__lte=0
+            ).delete()
+        return
+    if usages <= 0:
+        # Nothing to take from, rebuild_usage_rollups reconciles it
+        return
+    try:
+        with transaction.atomic():
+            UsageRollup.objects.create(
+                **dict(zip(KEY, key)),
+                usages=usages, quantity=quantity, net=net, gross=gross,
+            )
+    except IntegrityError:
+        # Another transaction created it since the update
+        add_to_rollup(key, usages, quantity, net, gross)
+
+
+def roll_up_usage(before, after):
+    """
+    Apply a usage write to the rollups.
+
+    Args:
+        before (dict): The usage's saved ``allocation_id``, ``item_id``,
+            ``quantity``, ``unit_price`` and ``unit_vat_price``, None
+            for a new usage.
+        after (dict): The same fields as written, None for a deletion.
+    """
+    changes = {}
+    for usage, sign in ((before, -1), (after, 1)):
+        if usage is None:
+            continue
+        location = (usage['allocation_id'], usage['item_id'])
+        if location not in changes:
+            changes[location] = [0, 0, 0, 0]
+        change = changes[location]
+        quantity = sign * usage['quantity']
+        change[0] += sign
+        change[1] += quantity
+        change[2] += quantity * usage['unit_price']
+        change[3] += quantity * usage['unit_vat_price']
+
+    for (allocation_id, item_id), change in changes.items():
+        if not any(change):
+            continue
+        key = usage_key(allocation_id, item_id)
+        if key is not None:
+            add_to_rollup(key, *change)
+
+
+def rebuild_usage_rollups(chunk_size=CHUNK_SIZE):
+    """
+    Recompute every rollup row and drop the rows no usage backs.
+
+    Returns:
+        tuple: The numbers of rows written and removed.
+    """
+    started = timezone.now()
+    with transaction.atomic():
+        written = write_rollups(
+            UsageRollup, iter_totals(Usage.objects.all(), chunk_size),
+            chunk_size,
+        )
+        removed, _ = UsageRollup.objects.filter(
+            updated_at__lt=started
+        ).delete()
+    return written, removed
+
+
+def usage_report(group_by, date_from=None, date_to=None, hospital_id=None,
+                 doctor_id=None, product_id=None, item_type=None):
+    """
+    Total the rollups by the given key fields, reading no Usage rows.
+
+    Args:
+        group_by (list): Fields of GROUPS to total by.
+        date_from (date, optional): Start from this date's month.
+        date_to (date, optional): Stop at this date's month.
+        hospital_id (int, optional): Only this hospital.
+        doctor_id (int, optional): Only this doctor.
+        product_id (int, optional): Only this product.
+        item_type (str, optional): Only products of this type.
+
+    Returns:
+        QuerySet: Dicts of the group fields and ``total_usages``,
+        ``total_quantity``, ``total_net`` and ``total_gross``.
+    """
+    rows = UsageRollup.objects.all()
+    if date_from is not None:
+        rows = rows.filter(month__gte=date_from.replace(day=1))
+    if date_to is not None:
+        rows = rows.filter(month__lte=date_to)
+    if hospital_id is not None:
+        rows = rows.filter(hospital=hospital_id)
+    if doctor_id is not None:
+        rows = rows.filter(doctor=doctor_id)
+    if product_id is not None:
+        rows = rows.filter(product=product_id)
+    if item_type is not None:
+        rows = rows.filter(product__item_type=item_type)
+    return rows.values(*group_by).annotate(
+        total_usages=Sum('usages'),
+        total_quantity=Sum('quantity'),
+        total_net=Sum('net'),
+        total_gross=Sum('gross'),
+    ).order_by(*group_by)
@@ -0,0 +1,165 @@
+"""
+Flattened search index for procedures.
+
+Finding a procedure by patient, case number, doctor, hospital or tray
+code would otherwise join five tables. ProcedureSearchIndex keeps one
+row per procedure holding every searchable word, lowercased, sorted and
+space separated, so a search reads a single indexed table. The signals
+in event.signals refresh the rows once each write commits.
+"""
+import re
+from collections import defaultdict
+
+from core.search import IndexedSearchFilter
+from .models import Procedure, Allocation, ProcedureSearchIndex
+
+
+CHUNK_SIZE = 1000
+
+WORD_RE = re.compile(r'\w+')
+
+# Values read from each procedure and its event for the document
+DOCUMENT_FIELDS = (
+    'patient_name',
+    'patient_surname',
+    'case_number',
+    'event__doctor__user__firstname',
+    'event__doctor__user__surname',
+    'event__hospital__name',
+)
+
+
+def tokenize(*values):
+    """Return the unique lowercase words in the values, sorted."""
+    words = set()
+    for value in values:
+        if value:
+            words.update(WORD_RE.findall(str(value).lower()))
+    return sorted(words)
+
+
+def build_document(values, tray_codes=()):
+    """
+    Return the index document for one procedure.
+
+    Args:
+        values (dict): The procedure's DOCUMENT_FIELDS values.
+        tray_codes (iterable): Codes of the trays allocated to it.
+
+    Returns:
+        str: The words wrapped in spaces, so each one can be matched
+            from its start with ``' word'``.
+    """
+    words = tokenize(
+        *(values[field] for field in DOCUMENT_FIELDS), *tray_codes
+    )
+    return f" {' '.join(words)} "
+
+
+def iter_documents(procedures, allocations, chunk_size=CHUNK_SIZE):
+    """
+    Stream ``(procedure id, document)`` pairs in primary key order.
+
+    Procedures are read in keyset paginated chunks, with one extra query
+    per chunk for the allocated tray codes.
+
+    Args:
+        procedures (QuerySet): The procedures to index.
+        allocations (Manager): Allocation manager to read tray codes from.
+        chunk_size (int): Procedures read per query.
+    """
+    last_pk = 0
+    while True:
+        chunk = list(
+            procedures.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .values('pk', *DOCUMENT_FIELDS)
+            .distinct()[:chunk_size]
+        )
+        if not chunk:
+            return
+        last_pk = chunk[-1]['pk']
+
+        tray_codes = defaultdict(list)
+        rows = allocations.filter(
+            procedure_id__in=[row['pk'] for row in chunk]
+        ).values_list('procedure_id', 'tray__code')
+        for procedure_id, code in rows:
+            tray_codes[procedure_id].append(code)
+
+        for row in chunk:
+            yield row['pk'], build_document(row, tray_codes[row['pk']])
+
+
+def write_documents(index_model, documents, chunk_size=CHUNK_SIZE):
+    """
+    Upsert the documents into the index table in batches.
+
+    Returns:
+        int: The number of index rows written.
+    """
+    written = 0
+    batch = []
+    for procedure_id, document in documents:
+        batch.append(
+            index_model(procedure_id=procedure_id, document=document)
+        )
+        if len(batch) >= chunk_size:
+            written += _upsert(index_model, batch)
+            batch = []
+    if batch:
+        written += _upsert(index_model, batch)
+    return written
+
+
+def _upsert(index_model, batch):
+    index_model.objects.bulk_create(
+        batch,
+        update_conflicts=True,
+        unique_fields=['procedure'],
+        update_fields=['document'],
+    )
+    return len(batch)
+
+
+def refresh_procedure_index(procedures, chunk_size=CHUNK_SIZE):
+    """
+    Rewrite the index rows of the given procedures.
+
+    Args:
+        procedures (QuerySet): The procedures to refresh.
+        chunk_size (int): Procedures read and written per batch.
+
+    Returns:
+        int: The number of index rows written.
+    """
+    documents = iter_documents(procedures, Allocation.objects, chunk_size)
+    return write_documents(ProcedureSearchIndex, documents, chunk_size)
+
+
+def rebuild_procedure_index(chunk_size=CHUNK_SIZE):
+    """Re-index every procedure, returns the number of rows written."""
+    return refresh_procedure_index(Procedure.objects.all(), chunk_size)
+
+
+def search_procedures(queryset, search_term):
+    """
+    Filter procedures to those whose document holds every search word.
+
+    Each word matches the start of an indexed word, so ``ndl`` finds
+    ``Ndlovu``. On PostgreSQL the trigram index on the document serves
+    the ``LIKE`` without scanning the table.
+    """
+    for word in tokenize(search_term):
+        queryset = queryset.filter(
+            search_index__document__contains=f' {word}'
+        )
+    return queryset
+
+
+class ProcedureIndexSearchFilter(IndexedSearchFilter):
+    """API ``?search=`` filter reading ProcedureSearchIndex."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_term = request.query_params.get(self.search_param, '')
+        return search_procedures(queryset, search_term)
@@ -1,11 +1,20 @@
 """
 Serializers for events APIs
 """
+from datetime import timedelta
+
 from rest_framework import serializers
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
-from .models import Event, Procedure, Allocation
-from core.models import Doctor
+from .availability import MAX_DATES
+from .conflicts import tray_conflicts
+from .models import (
+    Event, Procedure, Allocation, ProductForecast, TrayLocation,
+)
+from .provisioning import generate_codes
+from .rollups import GROUPS
+from core.models import Doctor, Hospital, Tray, TrayType
 
 
 class GenericCustomSerializer(serializers.ModelSerializer):
@@ -63,9 +72,40 @@ class AllocationSerializer(GenericCustomSerializer):
     class Meta(GenericCustomSerializer.Meta):
         model = Allocation
         fields = [
-            'id', 'procedure', 'tray', 'is_replenishment', 
+            'id', 'procedure', 'tray', 'is_replenishment', 'event_date',
             'created_at', 'updated_at', 'created_by', 'updated_by'
         ]
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.check_tray_free(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.check_tray_free(validated_data)
+            return super().update(instance, validated_data)
+
+    def check_tray_free(self, attrs):
+        """Refuse a tray already allocated to another procedure that day.
+
+        The tray row is locked for the rest of the save's transaction, so
+        concurrent requests for the same tray check and book one at a
+        time instead of both passing the check.
+        """
+        procedure = attrs.get('procedure') or self.instance.procedure
+        tray = Tray.objects.select_for_update().get(
+            pk=(attrs.get('tray') or self.instance.tray).pk
+        )
+        conflict = tray_conflicts(
+            tray, procedure.event.date, procedure=procedure
+        ).select_related('procedure').first()
+        if conflict is not None:
+            raise serializers.ValidationError({'tray': (
+                f"Tray {tray.code} is already allocated to case "
+                f"#{conflict.procedure.case_number} on "
+                f"{conflict.event_date}."
+            )})
         
 
 
@@ -98,3 +138,339 @@ class EventDetailSerializer(EventSerializer):
         fields = EventSerializer.Meta.fields + ['description']
 
 
+class ReadinessQuerySerializer(serializers.Serializer):
+    """Query parameters for the tray readiness report"""
+    tray_type = serializers.IntegerField(
+        required=False, source='tray_type_id'
+    )
+    ready = serializers.BooleanField(
+        required=False, allow_null=True, default=None
+    )
+
+
+class ReadinessLineSerializer(serializers.Serializer):
+    """A product a tray is short of or holds too many of"""
+    product = serializers.IntegerField()
+    catalogue_id = serializers.IntegerField()
+    digimed_id = serializers.CharField()
+    item_type = serializers.CharField()
+    description = serializers.CharField()
+    expected = serializers.IntegerField()
+    actual = serializers.IntegerField()
+    missing = serializers.IntegerField()
+    surplus = serializers.IntegerField()
+
+
+class TrayReadinessSerializer(serializers.Serializer):
+    """Readiness of one tray against its tray type"""
+    id = serializers.IntegerField()
+    code = serializers.CharField()
+    tray_type = serializers.IntegerField()
+    tray_type_name = serializers.CharField()
+    missing = serializers.IntegerField()
+    surplus = serializers.IntegerField()
+    is_ready = serializers.BooleanField()
+    lines = ReadinessLineSerializer(many=True)
+
+
+class TrayProvisionSerializer(serializers.Serializer):
+    """Trays to create from a tray type template"""
+    tray_type = serializers.PrimaryKeyRelatedField(
+        queryset=TrayType.objects.all()
+    )
+    codes = serializers.ListField(
+        child=serializers.CharField(max_length=25),
+        required=False,
+        min_length=1,
+        max_length=1000,
+    )
+    prefix = serializers.CharField(max_length=20, required=False)
+    count = serializers.IntegerField(
+        required=False, min_value=1, max_value=1000
+    )
+    # Defaults to the number after the highest code using the prefix
+    start = serializers.IntegerField(required=False, min_value=0)
+
+    def validate(self, attrs):
+        """Resolve the codes and make sure none are taken.
+
+        A prefix and count without a start are numbered when the trays
+        are created, see provision_numbered_trays, and leave codes unset.
+        """
+        codes = attrs.get('codes')
+        if codes is None:
+            if 'prefix' not in attrs or 'count' not in attrs:
+                raise serializers.ValidationError(
+                    "Provide either codes or a prefix and count."
+                )
+            if attrs.get('start') is None:
+                return attrs
+            codes = generate_codes(
+                attrs['prefix'], attrs['count'], start=attrs['start']
+            )
+        if len(set(codes)) != len(codes):
+            raise serializers.ValidationError(
+                {'codes': "Tray codes must be unique."}
+            )
+        taken = list(
+            Tray.objects.filter(code__in=codes).values_list('code', flat=True)
+        )
+        if taken:
+            raise serializers.ValidationError(
+                {'codes': f"Tray codes already exist: {', '.join(taken)}"}
+            )
+        attrs['codes'] = codes
+        return attrs
+
+
+class TraySyncSerializer(serializers.Serializer):
+    """Trays to re-sync with their tray type template"""
+    tray_type = serializers.PrimaryKeyRelatedField(
+        queryset=TrayType.objects.all()
+    )
+    trays = serializers.ListField(
+        child=serializers.IntegerField(), required=False, min_length=1
+    )
+
+
+class ProvisionedTraySerializer(serializers.ModelSerializer):
+    """A tray created from a template"""
+
+    class Meta:
+        model = Tray
+        fields = ['id', 'code', 'tray_type']
+        read_only_fields = fields
+
+
+class SyncResultSerializer(serializers.Serializer):
+    """Inventory rows changed by a template re-sync"""
+    trays = serializers.IntegerField()
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    deleted = serializers.IntegerField()
+
+
+class ConflictQuerySerializer(serializers.Serializer):
+    """Query parameters for the double-booking report"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+
+class ConflictAllocationSerializer(serializers.Serializer):
+    """One of the allocations booking a tray twice"""
+    id = serializers.IntegerField()
+    procedure = serializers.IntegerField()
+    case_number = serializers.CharField()
+    event = serializers.IntegerField()
+    is_replenishment = serializers.BooleanField()
+
+
+class ConflictSerializer(serializers.Serializer):
+    """A tray allocated to more than one procedure on a date"""
+    tray = serializers.IntegerField()
+    tray_code = serializers.CharField()
+    event_date = serializers.DateField()
+    allocations = ConflictAllocationSerializer(many=True)
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    """Query parameters for the tray availability search"""
+    tray_type = serializers.PrimaryKeyRelatedField(
+        queryset=TrayType.objects.all()
+    )
+    hospital = serializers.PrimaryKeyRelatedField(
+        queryset=Hospital.objects.all(), required=False
+    )
+    date = serializers.ListField(
+        child=serializers.DateField(),
+        required=False,
+        min_length=1,
+        max_length=MAX_DATES,
+        help_text='Dates to check, repeat for several.',
+    )
+    start = serializers.DateField(
+        required=False, help_text='First of a run of consecutive dates.'
+    )
+    days = serializers.IntegerField(
+        required=False, min_value=1, max_value=MAX_DATES, default=7,
+        help_text='Number of consecutive dates from start.',
+    )
+
+    def validate(self, attrs):
+        """Resolve the dates to check."""
+        if 'date' in attrs:
+            attrs['dates'] = attrs.pop('date')
+        elif 'start' in attrs:
+            attrs['dates'] = [
+                attrs['start'] + timedelta(days=n)
+                for n in range(attrs['days'])
+            ]
+        else:
+            raise serializers.ValidationError(
+                "Provide a date or a start date."
+            )
+        return attrs
+
+
+class AvailableTraySerializer(serializers.ModelSerializer):
+    """A tray free on a date"""
+
+    class Meta:
+        model = Tray
+        fields = ['id', 'code']
+        read_only_fields = fields
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    """The trays free on one date"""
+    date = serializers.DateField()
+    trays = AvailableTraySerializer(many=True)
+
+
+class LocationQuerySerializer(serializers.Serializer):
+    """Query parameters for the tray location list"""
+    hospital = serializers.IntegerField(required=False, source='hospital_id')
+    tray_type = serializers.IntegerField(
+        required=False, source='tray__tray_type_id'
+    )
+
+
+class TrayLocationSerializer(serializers.ModelSerializer):
+    """Where a tray currently is"""
+    tray_code = serializers.CharField(source='tray.code', read_only=True)
+    hospital_name = serializers.CharField(
+        source='hospital.name', read_only=True, allow_null=True
+    )
+
+    class Meta:
+        model = TrayLocation
+        fields = [
+            'tray', 'tray_code', 'hospital', 'hospital_name', 'event_date',
+            'allocation', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class TrayTurnaroundSerializer(serializers.Serializer):
+    """Turnaround figures of one tray type"""
+    tray_type = serializers.IntegerField()
+    tray_type_name = serializers.CharField()
+    trays = serializers.IntegerField()
+    used_trays = serializers.IntegerField()
+    uses = serializers.IntegerField()
+    avg_days_between_uses = serializers.FloatField(allow_null=True)
+    utilisation = serializers.FloatField(
+        help_text='Percentage of days since first use spent in use.'
+    )
+    idle_trays = serializers.IntegerField()
+
+
+class BillingQuerySerializer(serializers.Serializer):
+    """Query parameters for the billing totals"""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    hospital = serializers.IntegerField(required=False, source='hospital_id')
+    doctor = serializers.IntegerField(required=False, source='doctor_id')
+
+
+class BilledProcedureSerializer(serializers.Serializer):
+    """Totals of one procedure"""
+    procedure = serializers.IntegerField()
+    case_number = serializers.CharField()
+    net = serializers.DecimalField(max_digits=12, decimal_places=2)
+    vat = serializers.DecimalField(max_digits=12, decimal_places=2)
+    gross = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class BilledEventSerializer(serializers.Serializer):
+    """Totals of one event and its procedures"""
+    event = serializers.IntegerField()
+    date = serializers.DateField()
+    hospital = serializers.IntegerField()
+    hospital_name = serializers.CharField()
+    doctor = serializers.IntegerField()
+    net = serializers.DecimalField(max_digits=12, decimal_places=2)
+    vat = serializers.DecimalField(max_digits=12, decimal_places=2)
+    gross = serializers.DecimalField(max_digits=12, decimal_places=2)
+    procedures = BilledProcedureSerializer(many=True)
+
+
+class InvoiceLineSerializer(serializers.Serializer):
+    """A product billed on a procedure at its snapshotted price"""
+    product = serializers.IntegerField()
+    digimed_id = serializers.CharField()
+    description = serializers.CharField()
+    unit_price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    unit_vat_price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    quantity = serializers.IntegerField()
+    net = serializers.DecimalField(max_digits=12, decimal_places=2)
+    gross = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class InvoiceProcedureSerializer(BilledProcedureSerializer):
+    """A procedure on an invoice, with its lines"""
+    lines = InvoiceLineSerializer(many=True)
+
+
+class InvoiceSerializer(BilledEventSerializer):
+    """The invoice of one event"""
+    procedures = InvoiceProcedureSerializer(many=True)
+
+
+class UsageReportQuerySerializer(serializers.Serializer):
+    """Query parameters for the usage report"""
+    group_by = serializers.ListField(
+        child=serializers.ChoiceField(choices=GROUPS),
+        required=False,
+        min_length=1,
+        default=['month'],
+        help_text='Fields to total by, repeat for several.',
+    )
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    hospital = serializers.IntegerField(required=False, source='hospital_id')
+    doctor = serializers.IntegerField(required=False, source='doctor_id')
+    product = serializers.IntegerField(required=False, source='product_id')
+    item_type = serializers.CharField(required=False)
+
+    def validate_group_by(self, value):
+        """Drop repeated fields, keeping their order."""
+        return list(dict.fromkeys(value))
+
+
+class UsageReportSerializer(serializers.Serializer):
+    """Usage totals of one group, only its group fields are present"""
+    month = serializers.DateField(required=False)
+    hospital = serializers.IntegerField(required=False)
+    doctor = serializers.IntegerField(required=False)
+    product = serializers.IntegerField(required=False)
+    usages = serializers.IntegerField(source='total_usages')
+    quantity = serializers.IntegerField(source='total_quantity')
+    net = serializers.DecimalField(
+        max_digits=14, decimal_places=2, source='total_net'
+    )
+    gross = serializers.DecimalField(
+        max_digits=14, decimal_places=2, source='total_gross'
+    )
+
+
+class LowStockSerializer(serializers.ModelSerializer):
+    """A product whose warehouse stock is at or below its reorder point"""
+    digimed_id = serializers.CharField(
+        source='product.digimed_id', read_only=True
+    )
+    description = serializers.CharField(
+        source='product.description', read_only=True
+    )
+    stock = serializers.IntegerField(read_only=True)
+    shortfall = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ProductForecast
+        fields = [
+            'product', 'digimed_id', 'description', 'stock',
+            'reorder_point', 'shortfall', 'safety_stock',
+            'lead_time_demand', 'lead_time_days', 'average_daily',
+            'seasonal_daily', 'computed_at',
+        ]
+        read_only_fields = fields
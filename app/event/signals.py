@@ -0,0 +1,244 @@
+"""
+Signals keeping ProcedureSearchIndex and TrayLocation in sync with their
+source tables.
+
+Refreshes run once the surrounding transaction commits, so a rolled
+back write never reaches the index and cascading deletes have finished
+before the affected procedures and trays are read again.
+
+Allocation.event_date is copied from the event straight away instead,
+in the same transaction as the write that changed it, and so is the
+removal of a tray's TrayUsageStats when one of its allocations goes.
+UsageRollup is also kept in step straight away, see event.rollups.
+"""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Doctor, Hospital, Tray
+from .models import Event, Procedure, Allocation, TrayUsageStats, Usage
+from .locations import refresh_tray_locations
+from .rollups import refresh_rollups, roll_up_usage, rollup_keys
+from .search import refresh_procedure_index
+
+
+# Usage fields that make up its rollup contribution
+ROLLUP_FIELDS = (
+    'allocation_id', 'item_id', 'quantity', 'unit_price', 'unit_vat_price',
+)
+
+# User fields that appear in the index. Other saves, like the
+# last_login update made on every login, leave the index alone.
+INDEXED_USER_FIELDS = {'firstname', 'surname'}
+
+
+def schedule_refresh(**filters):
+    """Refresh the matching procedures' index rows after commit."""
+    transaction.on_commit(partial(
+        refresh_procedure_index, Procedure.objects.filter(**filters)
+    ))
+
+
+def schedule_relocate(*args, **filters):
+    """Refresh the matching trays' location rows after commit."""
+    transaction.on_commit(partial(
+        refresh_tray_locations, Tray.objects.filter(*args, **filters)
+    ))
+
+
+@receiver(post_save, sender=Procedure)
+def index_procedure(sender, instance, **kwargs):
+    schedule_refresh(pk=instance.pk)
+
+
+@receiver(pre_save, sender=Allocation)
+def read_allocation_procedure(sender, instance, **kwargs):
+    """Remember the procedure an allocation may be moved off."""
+    instance._saved_procedure_id = None
+    if not instance._state.adding:
+        instance._saved_procedure_id = Allocation.objects.filter(
+            pk=instance.pk
+        ).values_list('procedure_id', flat=True).first()
+
+
+@receiver(post_save, sender=Allocation)
+@receiver(post_delete, sender=Allocation)
+def index_allocation(sender, instance, **kwargs):
+    """Refresh the allocation's procedure, and the one it left if moved."""
+    schedule_refresh(pk__in={
+        instance.procedure_id,
+        getattr(instance, '_saved_procedure_id', None),
+    } - {None})
+
+
+@receiver(post_save, sender=Event)
+def index_event(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(event=instance)
+
+
+@receiver(post_save, sender=Doctor)
+def index_doctor(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(event__doctor=instance)
+
+
+@receiver(post_save, sender=get_user_model())
+def index_user(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields and not INDEXED_USER_FIELDS & set(update_fields):
+        return
+    schedule_refresh(event__doctor__user=instance)
+
+
+@receiver(post_save, sender=Hospital)
+def index_hospital(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(event__hospital=instance)
+
+
+@receiver(post_save, sender=Tray)
+def index_tray(sender, instance, created, **kwargs):
+    if not created:
+        schedule_refresh(allocations__tray=instance)
+
+
+@receiver(post_save, sender=Event)
+def copy_event_date(sender, instance, created, **kwargs):
+    """Move the event's allocations with it when its date changes."""
+    if not created:
+        Allocation.objects.filter(procedure__event=instance).exclude(
+            event_date=instance.date
+        ).update(event_date=instance.date, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Procedure)
+def copy_procedure_event_date(sender, instance, created, **kwargs):
+    """Follow the procedure to its event, which may have changed."""
+    if not created:
+        Allocation.objects.filter(procedure=instance).exclude(
+            event_date=Subquery(
+                Event.objects.filter(pk=instance.event_id).values('date')
+            )
+        ).update(
+            event_date=Subquery(
+                Event.objects.filter(pk=instance.event_id).values('date')
+            ),
+            updated_at=timezone.now(),
+        )
+
+
+@receiver(post_save, sender=Allocation)
+def relocate_allocation(sender, instance, **kwargs):
+    """Relocate the tray, and the previous tray if it was moved off one."""
+    schedule_relocate(
+        Q(pk=instance.tray_id) | Q(location__allocation=instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Allocation)
+def relocate_deleted_allocation(sender, instance, **kwargs):
+    schedule_relocate(pk=instance.tray_id)
+
+
+@receiver(post_save, sender=Event)
+def relocate_event(sender, instance, created, **kwargs):
+    if not created:
+        schedule_relocate(pk__in=Allocation.objects.filter(
+            procedure__event=instance
+        ).values('tray_id'))
+
+
+@receiver(post_save, sender=Procedure)
+def relocate_procedure(sender, instance, created, **kwargs):
+    if not created:
+        schedule_relocate(pk__in=Allocation.objects.filter(
+            procedure=instance
+        ).values('tray_id'))
+
+
+@receiver(post_delete, sender=Allocation)
+def drop_usage_stats(sender, instance, **kwargs):
+    """Leave the tray for the next analytics refresh to recompute."""
+    TrayUsageStats.objects.filter(tray_id=instance.tray_id).delete()
+
+
+def rolled_up(usage):
+    return {field: getattr(usage, field) for field in ROLLUP_FIELDS}
+
+
+@receiver(pre_save, sender=Usage)
+def read_usage_rollup(sender, instance, **kwargs):
+    """Remember what a changed usage added to its rollup."""
+    instance._rolled_up = None
+    if not instance._state.adding:
+        instance._rolled_up = Usage.objects.filter(
+            pk=instance.pk
+        ).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Usage)
+def roll_up_saved_usage(sender, instance, **kwargs):
+    roll_up_usage(getattr(instance, '_rolled_up', None), rolled_up(instance))
+
+
+@receiver(post_delete, sender=Usage)
+def roll_up_deleted_usage(sender, instance, **kwargs):
+    roll_up_usage(rolled_up(instance), None)
+
+
+# Moving an event, procedure or allocation moves its usages' rollup keys
+ROLLUP_SCOPES = {
+    Event: 'allocation__procedure__event',
+    Procedure: 'allocation__procedure',
+    Allocation: 'allocation',
+}
+
+# The fields whose change moves them
+ROLLUP_PARENT_FIELDS = {
+    Event: ('date', 'hospital_id', 'doctor_id'),
+    Procedure: ('event_id',),
+    Allocation: ('procedure_id',),
+}
+
+
+@receiver(pre_save, sender=Event)
+@receiver(pre_save, sender=Procedure)
+@receiver(pre_save, sender=Allocation)
+def read_rollup_keys(sender, instance, **kwargs):
+    """Remember the rollup keys of the usages under a moved row."""
+    instance._rollup_keys = None
+    if instance._state.adding:
+        return
+    fields = ROLLUP_PARENT_FIELDS[sender]
+    saved = sender.objects.filter(pk=instance.pk).values_list(
+        *fields
+    ).first()
+    if saved is None or saved == tuple(
+        getattr(instance, field) for field in fields
+    ):
+        return
+    instance._rollup_keys = rollup_keys(
+        Usage.objects.filter(**{ROLLUP_SCOPES[sender]: instance.pk})
+    )
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_save, sender=Procedure)
+@receiver(post_save, sender=Allocation)
+def move_rollups(sender, instance, created, **kwargs):
+    """Recompute the rollup rows the usages left and joined."""
+    before = getattr(instance, '_rollup_keys', None)
+    if created or not before:
+        return
+    after = rollup_keys(
+        Usage.objects.filter(**{ROLLUP_SCOPES[sender]: instance.pk})
+    )
+    if after != before:
+        refresh_rollups(before | after)
@@ -9,7 +9,7 @@ from core.models import (
     Doctor, Hospital, Product, TrayType, TrayItem, Tray
 )
 from event.models import (
-    Event, Procedure, Allocation
+    Event, Procedure, Allocation, Usage
 )
 
 from django_countries.fields import Country
@@ -220,3 +220,51 @@ def image_upload_url(model, id):
     """Create and return an image upload URL"""
     return reverse(f'{model}:{model}-upload-image', args=[id])
 
+
+def create_product(catalogue_id, base_price, vat_price, item_type='Screw'):
+    """Create and return a product at the given prices."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal('1.5'),
+        item_type=item_type,
+        description=f'{item_type} {catalogue_id}',
+        base_price=Decimal(base_price),
+        vat_price=Decimal(vat_price),
+    )
+
+
+class BillingTestMixin:
+    """Two products used across procedures at two hospitals."""
+
+    def setUp(self):
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.user.is_staff = True
+        self.user.save()
+        self.other_hospital = create_hospital(name='Other Hospital')
+        self.screw = create_product(1000001, '10.00', '11.50')
+        self.plate = create_product(1000002, '100.00', '115.00', 'Plate')
+        self.trays = 0
+
+    def create_event(self, event_date, hospital=None):
+        return Event.objects.create(
+            created_by=self.user,
+            doctor=self.doctor,
+            hospital=hospital or self.hospital,
+            date=event_date,
+        )
+
+    def use(self, event, *items):
+        """Log ``(product, quantity)`` usages on a new procedure."""
+        procedure = create_procedure(
+            event, **generate_random_patient_details()
+        )
+        self.trays += 1
+        allocation = create_allocation(
+            procedure, create_dummy_tray(f'TT-{self.trays}'), self.user
+        )
+        for product, quantity in items:
+            Usage.objects.create(
+                allocation=allocation, item=product, quantity=quantity,
+                created_by=self.user,
+            )
+        return procedure
@@ -0,0 +1,92 @@
+"""
+Tests for the event admin changelists.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from event.models import Inventory, Usage
+
+from .helper_for_event_tests import (
+    create_procedures_buffed,
+    create_dummy_tray,
+    create_allocation,
+    generate_random_product,
+)
+
+
+class ChangelistQueryCountTests(TestCase):
+    """Test the changelists run a constant number of queries per page."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.rows = 0
+
+    def create_rows(self, count):
+        """Create complete event chains down to usages and inventory."""
+        for _ in range(count):
+            self.rows += 1
+            user, procedure = create_procedures_buffed(
+                alt_user=self.admin_user
+            )
+            tray = create_dummy_tray(f'TRAY-{self.rows}')
+            allocation = create_allocation(procedure, tray, self.admin_user)
+            product = generate_random_product()
+            Inventory.objects.create(
+                tray=tray,
+                item=product,
+                quantity=10,
+                created_by=self.admin_user,
+                updated_by=self.admin_user,
+            )
+            Usage.objects.create(
+                allocation=allocation,
+                item=product,
+                quantity=1,
+                created_by=self.admin_user,
+                updated_by=self.admin_user,
+            )
+
+    def count_queries(self, url):
+        """Return the number of queries a changelist page runs."""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, changelist):
+        """Assert the query count does not grow with the number of rows."""
+        url = reverse(f'admin:{changelist}')
+        self.create_rows(1)
+        few = self.count_queries(url)
+        self.create_rows(4)
+        many = self.count_queries(url)
+
+        self.assertEqual(few, many)
+
+    def test_event_changelist_queries(self):
+        """Test the event changelist query count is constant."""
+        self.assertConstantQueries('event_event_changelist')
+
+    def test_procedure_changelist_queries(self):
+        """Test the procedure changelist query count is constant."""
+        self.assertConstantQueries('event_procedure_changelist')
+
+    def test_allocation_changelist_queries(self):
+        """Test the allocation changelist query count is constant."""
+        self.assertConstantQueries('event_allocation_changelist')
+
+    def test_inventory_changelist_queries(self):
+        """Test the inventory changelist query count is constant."""
+        self.assertConstantQueries('event_inventory_changelist')
+
+    def test_usage_changelist_queries(self):
+        """Test the usage changelist query count is constant."""
+        self.assertConstantQueries('event_usage_changelist')
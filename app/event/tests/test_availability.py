@@ -0,0 +1,152 @@
+"""
+Tests for the tray availability search.
+"""
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tray
+from event.availability import tray_availability
+from event.models import Event
+
+from .helper_for_event_tests import (
+    create_allocation,
+    create_dummy_tray,
+    create_hospital,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+AVAILABILITY_URL = reverse('event:tray-availability-list')
+
+MONDAY = date(2030, 6, 3)
+
+
+@override_settings(TRAY_TRANSIT_DAYS=1)
+class TrayAvailabilityTests(TestCase):
+    """Test which trays are offered as free."""
+
+    def setUp(self):
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.other_hospital = create_hospital(name='Other Hospital')
+        self.tray = create_dummy_tray('TT-1')
+        self.tray_type = self.tray.tray_type
+        self.spare = Tray.objects.create(code='TT-2', tray_type=self.tray_type)
+        # Another type's tray is never offered
+        create_dummy_tray('XX-1')
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, tray, event_date, hospital=None):
+        """Allocate a tray to a procedure on a date."""
+        event = Event.objects.create(
+            created_by=self.user,
+            doctor=self.doctor,
+            hospital=hospital or self.hospital,
+            date=event_date,
+        )
+        procedure = create_procedure(
+            event, **generate_random_patient_details()
+        )
+        return create_allocation(procedure, tray, self.user)
+
+    def codes(self, availability):
+        """Return the free tray codes per date."""
+        return {
+            day['date']: [tray.code for tray in day['trays']]
+            for day in availability
+        }
+
+    def test_booked_tray_not_free(self):
+        """Test a tray booked on a date is only free on other dates."""
+        self.book(self.tray, MONDAY)
+
+        free = self.codes(tray_availability(
+            self.tray_type, [MONDAY, MONDAY + timedelta(days=1)]
+        ))
+
+        self.assertEqual(free[MONDAY], ['TT-2'])
+        self.assertEqual(free[MONDAY + timedelta(days=1)], ['TT-1', 'TT-2'])
+
+    def test_week_in_one_query(self):
+        """Test a week of dates is answered by one query."""
+        self.book(self.tray, MONDAY + timedelta(days=2))
+        week = [MONDAY + timedelta(days=n) for n in range(7)]
+
+        with self.assertNumQueries(1):
+            free = self.codes(tray_availability(self.tray_type, week))
+
+        self.assertEqual(len(free), 7)
+        self.assertEqual(free[week[2]], ['TT-2'])
+        self.assertEqual(free[week[3]], ['TT-1', 'TT-2'])
+
+    def test_transit_to_other_hospital(self):
+        """Test trays at another hospital the day before are not free."""
+        self.book(self.tray, MONDAY, hospital=self.other_hospital)
+        self.book(self.spare, MONDAY)
+        tuesday = MONDAY + timedelta(days=1)
+
+        at_home = self.codes(tray_availability(
+            self.tray_type, [tuesday], hospital=self.hospital
+        ))
+        anywhere = self.codes(tray_availability(self.tray_type, [tuesday]))
+
+        self.assertEqual(at_home[tuesday], ['TT-2'])
+        self.assertEqual(anywhere[tuesday], ['TT-1', 'TT-2'])
+
+    def test_too_many_dates(self):
+        """Test at most a month of dates can be checked."""
+        with self.assertRaises(ValueError):
+            tray_availability(
+                self.tray_type,
+                [MONDAY + timedelta(days=n) for n in range(32)],
+            )
+
+    def test_api_dates(self):
+        """Test checking listed dates through the API."""
+        self.book(self.tray, MONDAY)
+
+        res = self.client.get(AVAILABILITY_URL, {
+            'tray_type': self.tray_type.id,
+            'date': [MONDAY.isoformat(), '2030-06-05'],
+            'hospital': self.hospital.id,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(d['date'], [t['code'] for t in d['trays']]) for d in res.data],
+            [('2030-06-03', ['TT-2']), ('2030-06-05', ['TT-1', 'TT-2'])],
+        )
+
+    def test_api_week(self):
+        """Test a start date checks the following week by default."""
+        res = self.client.get(AVAILABILITY_URL, {
+            'tray_type': self.tray_type.id, 'start': MONDAY.isoformat(),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 7)
+        self.assertEqual(res.data[-1]['date'], '2030-06-09')
+
+    def test_api_needs_dates(self):
+        """Test a request without dates is rejected."""
+        res = self.client.get(
+            AVAILABILITY_URL, {'tray_type': self.tray_type.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_api_auth_required(self):
+        """Test anonymous users cannot search availability."""
+        res = APIClient().get(AVAILABILITY_URL, {
+            'tray_type': self.tray_type.id, 'start': MONDAY.isoformat(),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,170 @@
+"""
+Tests for procedure and event billing.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from event.billing import billed_usages, event_totals, iter_invoices
+from event.models import Usage
+
+from .helper_for_event_tests import BillingTestMixin
+
+
+BILLING_URL = reverse('event:billing-list')
+
+
+def invoice_url(event_id):
+    """Create and return an event invoice URL."""
+    return reverse('event:billing-detail', args=[event_id])
+
+
+class BillingTests(BillingTestMixin, TestCase):
+    """Test the totals and invoices."""
+
+    def test_prices_snapshotted(self):
+        """Test repricing a product leaves logged usages alone."""
+        event = self.create_event(date(2030, 1, 1))
+        self.use(event, (self.screw, 2))
+
+        self.screw.base_price = Decimal('99.00')
+        self.screw.vat_price = Decimal('113.85')
+        self.screw.save()
+        self.use(event, (self.screw, 1))
+
+        totals = event_totals(billed_usages())
+
+        self.assertEqual(
+            [p['net'] for p in totals[0]['procedures']],
+            [Decimal('20.00'), Decimal('99.00')],
+        )
+        self.assertEqual(totals[0]['net'], Decimal('119.00'))
+
+    def test_changing_product_reprices(self):
+        """Test moving a usage to another product takes its prices."""
+        event = self.create_event(date(2030, 1, 1))
+        self.use(event, (self.screw, 1))
+
+        usage = Usage.objects.get()
+        usage.item = self.plate
+        usage.save()
+
+        usage.refresh_from_db()
+        self.assertEqual(usage.unit_price, Decimal('100.00'))
+        self.assertEqual(usage.unit_vat_price, Decimal('115.00'))
+
+    def test_event_totals_one_query(self):
+        """Test events and procedures are totalled by one query."""
+        first = self.create_event(date(2030, 1, 1))
+        self.use(first, (self.screw, 2), (self.plate, 1))
+        self.use(first, (self.screw, 4))
+        second = self.create_event(date(2030, 1, 2), self.other_hospital)
+        self.use(second, (self.plate, 3))
+        # Outside the month
+        self.use(self.create_event(date(2030, 2, 1)), (self.plate, 1))
+
+        with self.assertNumQueries(1):
+            totals = event_totals(billed_usages(
+                date_from=date(2030, 1, 1), date_to=date(2030, 1, 31)
+            ))
+
+        self.assertEqual([e['event'] for e in totals], [first.id, second.id])
+        self.assertEqual(
+            [(e['net'], e['vat'], e['gross']) for e in totals],
+            [
+                (Decimal('160.00'), Decimal('24.00'), Decimal('184.00')),
+                (Decimal('300.00'), Decimal('45.00'), Decimal('345.00')),
+            ],
+        )
+        self.assertEqual(
+            [p['net'] for p in totals[0]['procedures']],
+            [Decimal('120.00'), Decimal('40.00')],
+        )
+
+    def test_invoices_by_line(self):
+        """Test invoices sum each product's quantity per procedure."""
+        event = self.create_event(date(2030, 1, 1))
+        procedure = self.use(event, (self.screw, 2), (self.screw, 3))
+        self.use(
+            self.create_event(date(2030, 1, 1), self.other_hospital),
+            (self.plate, 1),
+        )
+
+        invoices = list(iter_invoices(
+            billed_usages(hospital_id=self.hospital.id)
+        ))
+
+        self.assertEqual(len(invoices), 1)
+        self.assertEqual(invoices[0]['hospital_name'], self.hospital.name)
+        billed = invoices[0]['procedures'][0]
+        self.assertEqual(billed['case_number'], procedure.case_number)
+        self.assertEqual(len(billed['lines']), 1)
+        line = billed['lines'][0]
+        self.assertEqual(line['quantity'], 5)
+        self.assertEqual(line['net'], Decimal('50.00'))
+        self.assertEqual(line['gross'], Decimal('57.50'))
+        self.assertEqual(billed['vat'], Decimal('7.50'))
+
+
+class BillingApiTests(BillingTestMixin, TestCase):
+    """Test the billing API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_totals(self):
+        """Test listing event totals for a hospital."""
+        event = self.create_event(date(2030, 1, 1))
+        self.use(event, (self.plate, 2))
+        self.use(
+            self.create_event(date(2030, 1, 1), self.other_hospital),
+            (self.plate, 1),
+        )
+
+        res = self.client.get(BILLING_URL, {
+            'date_from': '2030-01-01', 'hospital': self.hospital.id,
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['event'], event.id)
+        self.assertEqual(res.data[0]['gross'], '230.00')
+
+    def test_invoice(self):
+        """Test retrieving an event's invoice."""
+        event = self.create_event(date(2030, 1, 1))
+        self.use(event, (self.screw, 3))
+
+        res = self.client.get(invoice_url(event.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        line = res.data['procedures'][0]['lines'][0]
+        self.assertEqual(line['digimed_id'], self.screw.digimed_id)
+        self.assertEqual(line['unit_price'], '10.00')
+        self.assertEqual(res.data['net'], '30.00')
+
+    def test_empty_invoice(self):
+        """Test an event with nothing used bills nothing."""
+        event = self.create_event(date(2030, 1, 1))
+
+        res = self.client.get(invoice_url(event.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['procedures'], [])
+        self.assertEqual(res.data['gross'], '0.00')
+
+    def test_staff_required(self):
+        """Test non-staff users cannot read billing."""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(BILLING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
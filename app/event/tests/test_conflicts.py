@@ -0,0 +1,242 @@
+"""
+Tests for tray double-booking detection.
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tray
+from event.conflicts import conflict_report, tray_conflicts
+from event.models import Allocation, Event
+
+from .helper_for_event_tests import (
+    create_allocation,
+    create_dummy_tray,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+CONFLICTS_URL = reverse('event:allocation-conflicts')
+
+
+def allocation_detail_url(allocation_id):
+    """Create and return an allocation detail url"""
+    return reverse('event:allocation-detail', args=[allocation_id])
+
+
+class ConflictTestMixin:
+    """Events on two upcoming dates and two trays."""
+
+    def setUp(self):
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.user.is_staff = True
+        self.user.save()
+        self.day = timezone.localdate() + timedelta(days=7)
+        self.tray = create_dummy_tray('TT-1')
+        self.other_tray = create_dummy_tray('TT-2')
+
+    def create_procedure(self, event_date):
+        """Create a procedure in a new event on a date."""
+        event = Event.objects.create(
+            created_by=self.user,
+            doctor=self.doctor,
+            hospital=self.hospital,
+            date=event_date,
+        )
+        return create_procedure(event, **generate_random_patient_details())
+
+
+class EventDateTests(ConflictTestMixin, TestCase):
+    """Test the copy of the event date on allocations."""
+
+    def test_copied_on_save(self):
+        """Test an allocation takes its event's date."""
+        procedure = self.create_procedure(self.day)
+
+        allocation = create_allocation(procedure, self.tray, self.user)
+
+        self.assertEqual(allocation.event_date, self.day)
+
+    def test_follows_event_date(self):
+        """Test moving an event moves its allocations."""
+        procedure = self.create_procedure(self.day)
+        allocation = create_allocation(procedure, self.tray, self.user)
+
+        event = procedure.event
+        event.date = self.day + timedelta(days=1)
+        event.save()
+
+        allocation.refresh_from_db()
+        self.assertEqual(allocation.event_date, event.date)
+
+    def test_follows_procedure_to_another_event(self):
+        """Test moving a procedure to another event moves its allocations."""
+        procedure = self.create_procedure(self.day)
+        allocation = create_allocation(procedure, self.tray, self.user)
+        later = self.create_procedure(self.day + timedelta(days=3))
+
+        procedure.event = later.event
+        procedure.save()
+
+        allocation.refresh_from_db()
+        self.assertEqual(allocation.event_date, self.day + timedelta(days=3))
+
+
+class ConflictQueryTests(ConflictTestMixin, TestCase):
+    """Test the conflict queries."""
+
+    def test_tray_conflicts(self):
+        """Test only other procedures on the same date conflict."""
+        first = self.create_procedure(self.day)
+        allocation = create_allocation(first, self.tray, self.user)
+        create_allocation(
+            self.create_procedure(self.day + timedelta(days=1)),
+            self.tray, self.user,
+        )
+        second = self.create_procedure(self.day)
+
+        self.assertEqual(
+            list(tray_conflicts(self.tray, self.day, procedure=second)),
+            [allocation],
+        )
+        self.assertFalse(
+            tray_conflicts(self.tray, self.day, procedure=first).exists()
+        )
+        self.assertFalse(
+            tray_conflicts(self.other_tray, self.day).exists()
+        )
+
+    def test_conflict_report(self):
+        """Test double bookings are grouped per tray and date in one query."""
+        first = self.create_procedure(self.day)
+        second = self.create_procedure(self.day)
+        a = create_allocation(first, self.tray, self.user)
+        b = create_allocation(second, self.tray, self.user)
+        # A replenishment for the same procedure is not a double booking
+        Allocation.objects.create(
+            procedure=first, tray=self.other_tray, created_by=self.user,
+        )
+        Allocation.objects.create(
+            procedure=first, tray=self.other_tray, created_by=self.user,
+            is_replenishment=True,
+        )
+
+        with self.assertNumQueries(1):
+            report = conflict_report()
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]['tray_code'], 'TT-1')
+        self.assertEqual(report[0]['event_date'], self.day)
+        self.assertEqual(
+            [x['id'] for x in report[0]['allocations']], [a.id, b.id]
+        )
+
+    def test_conflict_report_date_range(self):
+        """Test the report only covers the requested dates."""
+        for _ in range(2):
+            create_allocation(
+                self.create_procedure(self.day), self.tray, self.user
+            )
+
+        self.assertEqual(
+            conflict_report(date_to=self.day - timedelta(days=1)), []
+        )
+        self.assertEqual(len(conflict_report(date_from=self.day)), 1)
+
+
+class ConflictApiTests(ConflictTestMixin, TestCase):
+    """Test the conflict check and report in the API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_update_to_booked_tray_rejected(self):
+        """Test moving an allocation onto a booked tray is refused."""
+        booked = self.create_procedure(self.day)
+        create_allocation(booked, self.tray, self.user)
+        allocation = create_allocation(
+            self.create_procedure(self.day), self.other_tray, self.user
+        )
+
+        res = self.client.patch(
+            allocation_detail_url(allocation.id), {'tray': self.tray.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(booked.case_number, str(res.data['tray']))
+        allocation.refresh_from_db()
+        self.assertEqual(allocation.tray, self.other_tray)
+
+    def test_update_locks_tray(self):
+        """Test a booking locks its tray before checking for conflicts."""
+        booked = self.create_procedure(self.day)
+        create_allocation(booked, self.tray, self.user)
+        allocation = create_allocation(
+            self.create_procedure(self.day), self.other_tray, self.user
+        )
+
+        with patch.object(
+            Tray.objects, 'select_for_update',
+            wraps=Tray.objects.select_for_update,
+        ) as lock:
+            res = self.client.patch(
+                allocation_detail_url(allocation.id), {'tray': self.tray.id}
+            )
+
+        lock.assert_called_once_with()
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_to_free_tray(self):
+        """Test a tray booked on another date can be allocated."""
+        create_allocation(
+            self.create_procedure(self.day + timedelta(days=1)),
+            self.tray, self.user,
+        )
+        allocation = create_allocation(
+            self.create_procedure(self.day), self.other_tray, self.user
+        )
+
+        res = self.client.patch(
+            allocation_detail_url(allocation.id), {'tray': self.tray.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['event_date'], self.day.isoformat())
+
+    def test_conflicts_report(self):
+        """Test the report lists upcoming double bookings by default."""
+        for event_date in (self.day, date(2020, 1, 1)):
+            for _ in range(2):
+                create_allocation(
+                    self.create_procedure(event_date), self.tray, self.user
+                )
+
+        res = self.client.get(CONFLICTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [c['event_date'] for c in res.data], [self.day.isoformat()]
+        )
+
+        res = self.client.get(CONFLICTS_URL, {'date_from': '2019-12-01'})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_conflicts_report_staff_only(self):
+        """Test doctors cannot read the double-booking report."""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(CONFLICTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,157 @@
+"""
+Tests for demand forecasting and the low-stock report.
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from event.forecasting import daily_usage, forecast_block, run_forecasts
+from event.models import Inventory, ProductForecast
+
+from .helper_for_event_tests import BillingTestMixin, create_dummy_tray
+
+
+LOW_STOCK_URL = reverse('event:low-stock-list')
+
+# A Monday
+START = date(2030, 1, 7)
+
+
+class ForecastBlockTests(TestCase):
+    """Test the forecast arithmetic on usage matrices."""
+
+    def test_steady_demand(self):
+        """Test constant use needs no safety stock."""
+        series = np.full((2, 56), 2, dtype=np.float32)
+        series[1] = 0
+
+        result = forecast_block(series, START, lead_time=7, z=1.65)
+
+        np.testing.assert_allclose(result['average_daily'], [2, 0])
+        np.testing.assert_allclose(result['safety_stock'], [0, 0])
+        np.testing.assert_allclose(result['reorder_point'], [14, 0])
+
+    def test_weekday_season(self):
+        """Test use on Mondays only is forecast for the next Monday."""
+        series = np.zeros((1, 56), dtype=np.float32)
+        series[0, ::7] = 4
+
+        monday = forecast_block(series, START, lead_time=1, z=0)
+        week = forecast_block(series, START, lead_time=7, z=0)
+
+        np.testing.assert_allclose(monday['seasonal_daily'], [4])
+        np.testing.assert_allclose(week['lead_time_demand'], [4])
+        sunday = forecast_block(series[:, :-1], START, lead_time=1, z=0)
+        np.testing.assert_allclose(sunday['lead_time_demand'], [0])
+
+    def test_yearly_season(self):
+        """Test a busy time of year last year raises the forecast."""
+        series = np.ones((1, 400), dtype=np.float32)
+        then = 400 - 364
+        series[0, then:then + 7] = 2
+
+        result = forecast_block(series, START, lead_time=7, z=0)
+
+        np.testing.assert_allclose(result['seasonal_daily'], [2])
+
+    def test_safety_stock(self):
+        """Test safety stock grows with the variability of demand."""
+        series = np.tile([0, 4], (1, 28)).astype(np.float32)
+
+        result = forecast_block(series, START, lead_time=4, z=2)
+
+        std = np.std([0, 4] * 14, ddof=1)
+        np.testing.assert_allclose(result['std_daily'], [std])
+        np.testing.assert_allclose(
+            result['safety_stock'], [np.ceil(2 * std * 2)]
+        )
+
+
+@override_settings(REORDER_LEAD_TIME_DAYS=7, REORDER_SERVICE_Z=0)
+class ForecastJobTests(BillingTestMixin, TestCase):
+    """Test the forecasting job and low-stock report."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = date(2030, 3, 1)
+        for n in range(1, 29):
+            self.use(
+                self.create_event(self.today - timedelta(days=n)),
+                (self.screw, 3),
+            )
+
+    def test_daily_usage(self):
+        """Test the usage matrix is read in one query."""
+        start = self.today - timedelta(days=28)
+        ids = [self.screw.id, self.plate.id]
+
+        with self.assertNumQueries(1):
+            series = daily_usage(ids, start, 28)
+
+        self.assertEqual(series.shape, (2, 28))
+        self.assertEqual(series[0].sum(), 84)
+        self.assertEqual(series[1].sum(), 0)
+
+    def test_run_forecasts(self):
+        """Test used products get a forecast, stale ones are dropped."""
+        ProductForecast.objects.create(
+            product=self.plate, average_daily=1, seasonal_daily=1,
+            std_daily=0, lead_time_days=7, lead_time_demand=7,
+            safety_stock=0, reorder_point=7, computed_at=timezone.now(),
+        )
+
+        forecast = run_forecasts(today=self.today, history_days=56)
+
+        self.assertEqual(forecast, 1)
+        row = ProductForecast.objects.get()
+        self.assertEqual(row.product, self.screw)
+        self.assertEqual(row.average_daily, 3)
+        self.assertEqual(row.reorder_point, 21)
+
+    def test_command(self):
+        """Test the command reports the products forecast."""
+        out = StringIO()
+        call_command(
+            'forecast_demand', '--history-days', '56', '--lead-time', '3',
+            stdout=out,
+        )
+
+        # The usages are in 2030, outside the history up to today
+        self.assertIn('Forecast 0 products', out.getvalue())
+
+    def test_low_stock(self):
+        """Test products at or below their reorder point are listed."""
+        run_forecasts(today=self.today, history_days=56)
+        Inventory.objects.create(
+            item=self.screw, quantity=4, created_by=self.user
+        )
+        # Stock held in trays is not in the warehouse
+        Inventory.objects.create(
+            tray=create_dummy_tray('STOCK-1'),
+            item=self.screw, quantity=50, created_by=self.user,
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(LOW_STOCK_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['product'], r['stock'], r['shortfall'])
+             for r in res.data['results']],
+            [(self.screw.id, 4, 17)],
+        )
+
+        Inventory.objects.create(
+            item=self.screw, quantity=20, created_by=self.user
+        )
+        res = client.get(LOW_STOCK_URL)
+        self.assertEqual(res.data['results'], [])
@@ -0,0 +1,136 @@
+"""
+Tests for the month end invoice run.
+"""
+import json
+import os
+from datetime import date
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from event import invoicing
+from event.invoicing import month_range, run_invoices, write_atomic
+
+from .helper_for_event_tests import BillingTestMixin
+
+
+JANUARY = month_range('2030-01')
+
+
+class InvoiceRunTests(BillingTestMixin, TestCase):
+    """Test the invoice files, manifest and resuming."""
+
+    def setUp(self):
+        super().setUp()
+        self.use(self.create_event(date(2030, 1, 5)), (self.screw, 2))
+        self.use(self.create_event(date(2030, 1, 9)), (self.plate, 1))
+        self.use(
+            self.create_event(date(2030, 1, 9), self.other_hospital),
+            (self.plate, 3),
+        )
+        # Next month is not billed
+        self.use(self.create_event(date(2030, 2, 1)), (self.plate, 1))
+
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name)) as handle:
+            return json.load(handle)
+
+    def test_file_per_hospital(self):
+        """Test each hospital gets its invoices and doctor totals."""
+        report = run_invoices(*JANUARY, self.directory, processes=1)
+
+        self.assertEqual(len(report['billed']), 2)
+        billed = self.read(f'hospital-{self.hospital.id}.json')
+        self.assertEqual(len(billed['invoices']), 2)
+        self.assertEqual(billed['totals']['net'], '120.00')
+        self.assertEqual(billed['doctors'], [{
+            'doctor': self.doctor.id, 'invoices': 2,
+            'net': '120.00', 'vat': '18.00', 'gross': '138.00',
+        }])
+        manifest = self.read(invoicing.MANIFEST)
+        self.assertEqual(
+            sorted(manifest['hospitals']),
+            sorted([str(self.hospital.id), str(self.other_hospital.id)]),
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            sorted([
+                invoicing.MANIFEST,
+                f'hospital-{self.hospital.id}.json',
+                f'hospital-{self.other_hospital.id}.json',
+            ]),
+        )
+
+    def test_resume_after_failure(self):
+        """Test a rerun only bills the hospitals that did not finish."""
+        write = invoicing.write_hospital_invoices
+
+        def crash(hospital_id, *args):
+            if hospital_id == self.other_hospital.id:
+                raise RuntimeError('Connection lost')
+            return write(hospital_id, *args)
+
+        with patch.object(invoicing, 'write_hospital_invoices', crash):
+            report = run_invoices(*JANUARY, self.directory, processes=1)
+        self.assertEqual(
+            [r['hospital'] for r in report['failed']],
+            [self.other_hospital.id],
+        )
+
+        progress = []
+        report = run_invoices(
+            *JANUARY, self.directory, processes=1,
+            progress=lambda *args: progress.append(args),
+        )
+
+        self.assertEqual(report['skipped'], 1)
+        self.assertEqual(
+            [(r['hospital'], n, total) for r, n, total in progress],
+            [(self.other_hospital.id, 1, 1)],
+        )
+        self.assertEqual(len(self.read(invoicing.MANIFEST)['hospitals']), 2)
+
+    def test_other_period_rejected(self):
+        """Test a run directory is not reused for another month."""
+        run_invoices(*JANUARY, self.directory, processes=1)
+
+        with self.assertRaises(ValueError):
+            run_invoices(*month_range('2030-02'), self.directory, processes=1)
+
+    def test_atomic_write(self):
+        """Test a failed write leaves neither the file nor a temporary."""
+        path = os.path.join(self.directory, 'broken.json')
+
+        def write(handle):
+            handle.write('{"invoices": [')
+            raise RuntimeError('Killed')
+
+        with self.assertRaises(RuntimeError):
+            write_atomic(path, write)
+
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_command(self):
+        """Test the command reports each hospital and resumes."""
+        out = StringIO()
+        call_command(
+            'run_invoices', '2030-01', '--output-dir', self.directory,
+            '--processes', '1', stdout=out,
+        )
+
+        self.assertIn('[2/2] Hospital', out.getvalue())
+        self.assertIn('Billed 2 hospitals (0 already done)', out.getvalue())
+
+        out = StringIO()
+        call_command(
+            'run_invoices', '2030-01', '--output-dir', self.directory,
+            stdout=out,
+        )
+        self.assertIn('Billed 0 hospitals (2 already done)', out.getvalue())
@@ -0,0 +1,338 @@
+"""
+Tests for bulk tray provisioning from tray type templates.
+"""
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, Tray, TrayItem, TrayType
+from event.models import Inventory
+from event.provisioning import generate_codes, provision_trays, sync_trays
+
+
+PROVISION_URL = reverse('event:tray-provision')
+SYNC_URL = reverse('event:tray-sync')
+
+
+def create_product(catalogue_id, item_type='Screw'):
+    """Create and return a product."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal('2.0'),
+        item_type=item_type,
+        description=f'{item_type} {catalogue_id}',
+        base_price=Decimal('10.00'),
+        vat_price=Decimal('11.50'),
+    )
+
+
+def inventory(tray):
+    """Return a tray's inventory as (item_type, quantity) pairs."""
+    return sorted(
+        Inventory.objects.filter(tray=tray)
+        .values_list('item__item_type', 'quantity')
+    )
+
+
+class ProvisioningTestMixin:
+    """A two product template."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.plate = create_product(10000001, 'Plate')
+        self.screw = create_product(10000002, 'Screw')
+        self.tray_type = TrayType.objects.create(
+            name='Mandible', description='Mandible set',
+        )
+        TrayItem.objects.create(
+            tray_type=self.tray_type, product=self.plate, quantity=2,
+        )
+        TrayItem.objects.create(
+            tray_type=self.tray_type, product=self.screw, quantity=10,
+        )
+
+
+class ProvisioningTests(ProvisioningTestMixin, TestCase):
+    """Test the provisioning operations."""
+
+    def test_generate_codes(self):
+        """Test numbered codes are zero padded."""
+        self.assertEqual(
+            generate_codes('MAN-', 3, start=9),
+            ['MAN-009', 'MAN-010', 'MAN-011'],
+        )
+
+    def test_provision_trays(self):
+        """Test new trays are seeded from the template."""
+        trays = provision_trays(
+            self.tray_type, generate_codes('MAN-', 5), self.user
+        )
+
+        self.assertEqual([t.code for t in trays][:2], ['MAN-001', 'MAN-002'])
+        self.assertEqual(Tray.objects.count(), 5)
+        self.assertEqual(Inventory.objects.count(), 10)
+        self.assertEqual(
+            inventory(trays[4]), [('Plate', 2), ('Screw', 10)]
+        )
+
+    def test_provision_constant_statements_per_batch(self):
+        """Test each batch costs the same statements for any size."""
+        codes = generate_codes('MAN-', 40)
+        # Template read, the savepoint and its release, then trays, ids
+        # and inventory for each of the two batches
+        with self.assertNumQueries(1 + 2 + 2 * 3):
+            provision_trays(self.tray_type, codes, self.user, batch_size=20)
+
+        self.assertEqual(Inventory.objects.count(), 80)
+
+    def test_sync_trays(self):
+        """Test a re-sync resets, adds and removes inventory rows."""
+        trays = provision_trays(
+            self.tray_type, generate_codes('MAN-', 3), self.user
+        )
+        drill = create_product(10000003, 'Drill')
+        TrayItem.objects.filter(product=self.screw).update(quantity=12)
+        TrayItem.objects.create(
+            tray_type=self.tray_type, product=drill, quantity=1,
+        )
+        TrayItem.objects.filter(product=self.plate).delete()
+        # A stray duplicate row on the first tray
+        Inventory.objects.create(
+            tray=trays[0], item=self.screw, quantity=3, created_by=self.user,
+        )
+
+        result = sync_trays(self.tray_type, self.user)
+
+        self.assertEqual(
+            (result.trays, result.created, result.updated, result.deleted),
+            (3, 3, 3, 4),
+        )
+        for tray in trays:
+            self.assertEqual(inventory(tray), [('Drill', 1), ('Screw', 12)])
+
+    def test_sync_constant_statements_per_batch(self):
+        """Test a re-sync batch costs at most four statements."""
+        provision_trays(
+            self.tray_type, generate_codes('MAN-', 40), self.user
+        )
+        TrayItem.objects.filter(product=self.screw).update(quantity=12)
+
+        # Tray ids, template, the savepoint and its release, then select
+        # and update for each of the two batches
+        with self.assertNumQueries(2 + 2 + 2 * 2):
+            result = sync_trays(self.tray_type, self.user, batch_size=20)
+
+        self.assertEqual(result.updated, 40)
+
+
+class ProvisioningApiTests(ProvisioningTestMixin, TestCase):
+    """Test the provisioning API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_staff_required(self):
+        """Test non-staff users cannot provision trays."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.post(PROVISION_URL, {
+            'tray_type': self.tray_type.id, 'codes': ['A'],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_provision_with_prefix(self):
+        """Test provisioning trays by prefix and count."""
+        res = self.client.post(PROVISION_URL, {
+            'tray_type': self.tray_type.id, 'prefix': 'MAN-', 'count': 3,
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [t['code'] for t in res.data], ['MAN-001', 'MAN-002', 'MAN-003']
+        )
+        self.assertEqual(Inventory.objects.count(), 6)
+
+    def test_prefix_codes_taken_meanwhile_renumbered(self):
+        """Test prefix codes taken by a concurrent request are renumbered."""
+        Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+
+        # The first read misses MAN-001, as if it was created meanwhile
+        with patch(
+            'event.provisioning.next_code_number', side_effect=[1, 2]
+        ):
+            res = self.client.post(PROVISION_URL, {
+                'tray_type': self.tray_type.id, 'prefix': 'MAN-',
+                'count': 1,
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([t['code'] for t in res.data], ['MAN-002'])
+
+    def test_codes_taken_meanwhile_conflict(self):
+        """Test listed codes taken after validation give a 409."""
+        with patch(
+            'event.views.provision_trays', side_effect=IntegrityError
+        ):
+            res = self.client.post(PROVISION_URL, {
+                'tray_type': self.tray_type.id, 'codes': ['MAN-001'],
+            }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Tray.objects.exists())
+
+    def test_taken_codes_rejected(self):
+        """Test codes already in use are rejected up front."""
+        Tray.objects.create(code='MAN-002', tray_type=self.tray_type)
+
+        res = self.client.post(PROVISION_URL, {
+            'tray_type': self.tray_type.id, 'codes': ['MAN-001', 'MAN-002'],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('MAN-002', str(res.data['codes']))
+        self.assertEqual(Tray.objects.count(), 1)
+
+    def test_sync(self):
+        """Test re-syncing selected trays."""
+        trays = provision_trays(
+            self.tray_type, ['MAN-001', 'MAN-002'], self.user
+        )
+        TrayItem.objects.filter(product=self.plate).update(quantity=4)
+
+        res = self.client.post(SYNC_URL, {
+            'tray_type': self.tray_type.id, 'trays': [trays[0].id],
+        }, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['updated'], 1)
+        self.assertEqual(inventory(trays[0]), [('Plate', 4), ('Screw', 10)])
+        self.assertEqual(inventory(trays[1]), [('Plate', 2), ('Screw', 10)])
+
+
+class ProvisioningAdminTests(ProvisioningTestMixin, TestCase):
+    """Test the tray type admin actions."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('admin:core_traytype_changelist')
+
+    def test_provision_action(self):
+        """Test the provisioning action numbers on from existing trays."""
+        Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+
+        self.client.post(self.url, {
+            'action': 'provision_trays',
+            '_selected_action': [self.tray_type.id],
+            'prefix': 'MAN-',
+            'count': 2,
+        })
+
+        self.assertEqual(
+            list(Tray.objects.order_by('code').values_list('code', flat=True)),
+            ['MAN-001', 'MAN-002', 'MAN-003'],
+        )
+
+    def test_provision_action_after_deleted_tray(self):
+        """Test numbering continues after the highest code, not the count."""
+        Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+        Tray.objects.create(code='MAN-003', tray_type=self.tray_type)
+
+        self.client.post(self.url, {
+            'action': 'provision_trays',
+            '_selected_action': [self.tray_type.id],
+            'prefix': 'MAN-',
+            'count': 1,
+        })
+
+        self.assertTrue(Tray.objects.filter(code='MAN-004').exists())
+
+    def test_provision_action_retries_taken_codes(self):
+        """Test codes taken by a concurrent provisioning are renumbered."""
+        Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+
+        # The first read misses MAN-001, as if it was created meanwhile
+        with patch(
+            'event.provisioning.next_code_number', side_effect=[1, 2]
+        ):
+            self.client.post(self.url, {
+                'action': 'provision_trays',
+                '_selected_action': [self.tray_type.id],
+                'prefix': 'MAN-',
+                'count': 1,
+            })
+
+        self.assertEqual(
+            list(Tray.objects.order_by('code').values_list('code', flat=True)),
+            ['MAN-001', 'MAN-002'],
+        )
+
+    def test_provision_action_reports_exhausted_retries(self):
+        """Test codes taken on every attempt give a message, not an error."""
+        Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+
+        with patch(
+            'event.provisioning.next_code_number', return_value=1
+        ):
+            res = self.client.post(self.url, {
+                'action': 'provision_trays',
+                '_selected_action': [self.tray_type.id],
+                'prefix': 'MAN-',
+                'count': 1,
+            }, follow=True)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'kept being taken')
+        self.assertEqual(Tray.objects.count(), 1)
+
+    def test_sync_action(self):
+        """Test the re-sync action resets every tray of the type."""
+        tray = Tray.objects.create(code='MAN-001', tray_type=self.tray_type)
+
+        self.client.post(self.url, {
+            'action': 'sync_trays',
+            '_selected_action': [self.tray_type.id],
+        })
+
+        self.assertEqual(inventory(tray), [('Plate', 2), ('Screw', 10)])
+
+
+class ProvisionCommandTests(ProvisioningTestMixin, TestCase):
+    """Test the provision_trays command."""
+
+    def test_provision_and_sync(self):
+        """Test creating trays and re-syncing them from the command."""
+        out = StringIO()
+        call_command(
+            'provision_trays', 'Mandible', '--user', self.user.email,
+            '--prefix', 'MAN-', '--count', '4', stdout=out,
+        )
+        self.assertIn('Provisioned 4 Mandible trays', out.getvalue())
+
+        Inventory.objects.filter(item=self.plate).delete()
+        call_command(
+            'provision_trays', str(self.tray_type.id), '--user',
+            self.user.email, '--sync', stdout=out,
+        )
+
+        self.assertIn('4 rows added', out.getvalue())
+        self.assertEqual(Inventory.objects.count(), 8)
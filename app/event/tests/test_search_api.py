@@ -0,0 +1,102 @@
+"""
+Tests for the event and procedure search parameter.
+"""
+from django.test import TestCase, Client
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .helper_for_event_tests import (
+    create_user,
+    create_event,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+EVENTS_URL = reverse('event:event-list')
+PROCEDURES_URL = reverse('event:procedure-list')
+
+
+class SearchApiTests(TestCase):
+    """Test searching events and procedures as staff."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = create_user(
+            email='staff@example.com',
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=self.staff_user)
+        user, hospital, doctor = create_random_entities()
+        self.event = create_event(self.staff_user, doctor, hospital)
+        # Procedures reach the search index once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            details = generate_random_patient_details()
+            details.update(patient_surname='Ndlovu', case_number='CASE-100')
+            self.procedure = create_procedure(self.event, **details)
+            details = generate_random_patient_details()
+            details.update(patient_surname='Smith', case_number='CASE-200')
+            create_procedure(self.event, **details)
+
+    def test_search_procedures_by_patient_surname(self):
+        """Test searching procedures by patient surname."""
+        res = self.client.get(PROCEDURES_URL, {'search': 'ndl'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in res.data], [self.procedure.id])
+
+    def test_search_procedures_by_hospital(self):
+        """Test searching procedures across the event's hospital."""
+        res = self.client.get(
+            PROCEDURES_URL, {'search': self.event.hospital.name}
+        )
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_search_events_by_doctor_surname(self):
+        """Test searching events by the doctor's surname."""
+        other_user, hospital, doctor = create_random_entities()
+        doctor.user.surname = 'Zulu'
+        doctor.user.save()
+        event = create_event(self.staff_user, doctor, hospital)
+
+        res = self.client.get(EVENTS_URL, {'search': 'zulu'})
+
+        self.assertEqual([e['id'] for e in res.data], [event.id])
+
+    def test_no_search_lists_everything(self):
+        """Test the list is unfiltered without a search term."""
+        res = self.client.get(PROCEDURES_URL)
+
+        self.assertEqual(len(res.data), 2)
+
+
+class ProcedureAdminSearchTests(TestCase):
+    """Test the procedure admin search across joined tables."""
+
+    def test_search_by_hospital_name(self):
+        """Test the admin can search procedures by hospital name."""
+        admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        client = Client()
+        client.force_login(admin_user)
+        user, hospital, doctor = create_random_entities()
+        event = create_event(admin_user, doctor, hospital)
+        with self.captureOnCommitCallbacks(execute=True):
+            procedure = create_procedure(
+                event, **generate_random_patient_details()
+            )
+
+        res = client.get(
+            reverse('admin:event_procedure_changelist'),
+            {'q': hospital.name},
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, procedure.case_number)
@@ -0,0 +1,154 @@
+"""
+Tests for the flattened procedure search index.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from event.models import Procedure, ProcedureSearchIndex
+from event.search import build_document, search_procedures, tokenize
+
+from .helper_for_event_tests import (
+    create_allocation,
+    create_dummy_tray,
+    create_event,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+class TokenizeTests(TestCase):
+    """Test the document text helpers."""
+
+    def test_tokenize_lowercases_and_splits(self):
+        """Test values are split into unique lowercase words."""
+        self.assertEqual(
+            tokenize('Saint Mary', 'CASE-100', None, 'saint'),
+            ['100', 'case', 'mary', 'saint'],
+        )
+
+    def test_document_wraps_words_in_spaces(self):
+        """Test every word in a document starts after a space."""
+        values = dict.fromkeys(
+            ('patient_name', 'patient_surname', 'case_number',
+             'event__doctor__user__firstname',
+             'event__doctor__user__surname', 'event__hospital__name'),
+            None,
+        )
+        values['patient_surname'] = 'Ndlovu'
+
+        self.assertEqual(build_document(values, ['T-1']), ' 1 ndlovu t ')
+
+
+class ProcedureSearchIndexTests(TestCase):
+    """Test the signals keep the index in sync."""
+
+    def setUp(self):
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.event = create_event(self.user, self.doctor, self.hospital)
+        details = generate_random_patient_details()
+        details.update(patient_surname='Ndlovu', case_number='CASE-100')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.procedure = create_procedure(self.event, **details)
+
+    def document(self):
+        return ProcedureSearchIndex.objects.get(
+            procedure=self.procedure
+        ).document
+
+    def search(self, term):
+        return list(search_procedures(Procedure.objects.all(), term))
+
+    def test_procedure_is_indexed(self):
+        """Test a new procedure gets a document of all its text."""
+        document = self.document()
+
+        for word in ('ndlovu', 'case', '100', self.hospital.name.lower(),
+                     self.user.surname.lower()):
+            self.assertIn(f' {word} ', document)
+
+    def test_search_matches_word_prefixes(self):
+        """Test every search word must start an indexed word."""
+        self.assertEqual(self.search('NDL'), [self.procedure])
+        self.assertEqual(self.search('ndl case-100'), [self.procedure])
+        self.assertEqual(self.search('dlovu'), [])
+        self.assertEqual(self.search('ndl case-200'), [])
+
+    def test_allocation_adds_and_removes_tray_code(self):
+        """Test tray codes follow the procedure's allocations."""
+        tray = create_dummy_tray('TRAY-77')
+        with self.captureOnCommitCallbacks(execute=True):
+            allocation = create_allocation(self.procedure, tray, self.user)
+        self.assertEqual(self.search('tray-77'), [self.procedure])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            allocation.delete()
+        self.assertEqual(self.search('tray-77'), [])
+
+    def test_moved_allocation_refreshes_both(self):
+        """Test moving an allocation moves its tray code between documents."""
+        tray = create_dummy_tray('TRAY-79')
+        with self.captureOnCommitCallbacks(execute=True):
+            allocation = create_allocation(self.procedure, tray, self.user)
+            other = create_procedure(
+                self.event, **generate_random_patient_details()
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            allocation.procedure = other
+            allocation.save()
+
+        self.assertEqual(self.search('tray-79'), [other])
+
+    def test_hospital_rename_refreshes(self):
+        """Test renaming the event's hospital updates the document."""
+        self.hospital.name = 'Groote Schuur'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.hospital.save()
+
+        self.assertEqual(self.search('groote'), [self.procedure])
+
+    def test_doctor_surname_change_refreshes(self):
+        """Test renaming the doctor's user updates the document."""
+        self.user.surname = 'Mokoena'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.search('mokoena'), [self.procedure])
+
+    def test_login_update_skips_refresh(self):
+        """Test saving unrelated user fields leaves the index alone."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save(update_fields=['last_login'])
+
+        self.assertEqual(callbacks, [])
+
+    def test_deleting_procedure_removes_row(self):
+        """Test the index row is deleted with its procedure."""
+        tray = create_dummy_tray('TRAY-78')
+        create_allocation(self.procedure, tray, self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.procedure.delete()
+
+        self.assertFalse(ProcedureSearchIndex.objects.exists())
+
+
+class RebuildSearchIndexCommandTests(TestCase):
+    """Test the rebuild_search_index command."""
+
+    def test_rebuild_restores_every_row(self):
+        """Test the command re-indexes procedures in chunks."""
+        user, hospital, doctor = create_random_entities()
+        event = create_event(user, doctor, hospital)
+        for _ in range(3):
+            create_procedure(event, **generate_random_patient_details())
+        self.assertFalse(ProcedureSearchIndex.objects.exists())
+
+        out = StringIO()
+        call_command('rebuild_search_index', chunk_size=2, stdout=out)
+
+        self.assertEqual(ProcedureSearchIndex.objects.count(), 3)
+        self.assertIn('Indexed 3 procedures', out.getvalue())
@@ -0,0 +1,285 @@
+"""
+Tests for the tray turnaround analytics.
+"""
+from datetime import date, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tray
+from core.routers import replica_reads
+from event.analytics import (
+    WATERMARK_LAG,
+    build_report,
+    refresh_usage_stats,
+)
+from event.models import (
+    Allocation,
+    AnalyticsRun,
+    Event,
+    TrayUsageStats,
+)
+
+from .helper_for_event_tests import (
+    create_dummy_tray,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+TURNAROUND_URL = reverse('event:tray-turnaround-list')
+
+# The day the stats are refreshed for in these tests
+TODAY = date(2020, 2, 1)
+
+
+class TrayAnalyticsTestMixin:
+    """Two trays of one type and one unused tray of another."""
+
+    def setUp(self):
+        cache.clear()
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.user.is_staff = True
+        self.user.save()
+        self.tray = create_dummy_tray('TT-1')
+        self.tray_type = self.tray.tray_type
+        self.second = Tray.objects.create(
+            code='TT-2', tray_type=self.tray_type
+        )
+        self.unused = create_dummy_tray('XX-1')
+
+    def book(self, tray, event_date, **kwargs):
+        """Allocate a tray to a procedure on a date."""
+        event = Event.objects.create(
+            created_by=self.user,
+            doctor=self.doctor,
+            hospital=self.hospital,
+            date=event_date,
+        )
+        procedure = create_procedure(
+            event, **generate_random_patient_details()
+        )
+        return Allocation.objects.create(
+            procedure=procedure, tray=tray, created_by=self.user, **kwargs
+        )
+
+    def settle(self):
+        """Backdate the allocations past the lag of the last refresh."""
+        Allocation.objects.update(
+            updated_at=F('updated_at') - WATERMARK_LAG - timedelta(minutes=1)
+        )
+
+    def stats(self, tray):
+        row = TrayUsageStats.objects.get(tray=tray)
+        return row.uses, row.first_used, row.last_used, row.total_gap_days
+
+
+class TrayUsageStatsTests(TrayAnalyticsTestMixin, TestCase):
+    """Test the per tray stats and their incremental refresh."""
+
+    def test_gaps_between_uses(self):
+        """Test the days between consecutive uses are summed."""
+        for day in (10, 1, 4):
+            self.book(self.tray, date(2020, 1, day))
+        # A replenishment is part of the same use
+        allocation = Allocation.objects.first()
+        Allocation.objects.create(
+            procedure=allocation.procedure, tray=self.tray,
+            created_by=self.user, is_replenishment=True,
+        )
+
+        self.assertEqual(refresh_usage_stats(today=TODAY), 3)
+
+        self.assertEqual(
+            self.stats(self.tray),
+            (3, date(2020, 1, 1), date(2020, 1, 10), 9),
+        )
+        self.assertFalse(
+            TrayUsageStats.objects.filter(tray=self.unused).exists()
+        )
+
+    def test_incremental_refresh(self):
+        """Test only trays with new allocations are recomputed."""
+        self.book(self.tray, date(2020, 1, 1))
+        self.book(self.second, date(2020, 1, 1))
+        refresh_usage_stats(today=TODAY)
+        self.settle()
+
+        self.book(self.second, date(2020, 1, 8))
+
+        self.assertEqual(refresh_usage_stats(today=TODAY), 1)
+        self.assertEqual(self.stats(self.second)[0], 2)
+        self.settle()
+        self.assertEqual(refresh_usage_stats(today=TODAY), 0)
+
+    def test_moved_event_recomputed(self):
+        """Test moving an event marks its allocations as changed."""
+        allocation = self.book(self.tray, date(2020, 1, 1))
+        self.book(self.tray, date(2020, 1, 3))
+        refresh_usage_stats(today=TODAY)
+
+        event = allocation.procedure.event
+        event.date = date(2019, 12, 30)
+        event.save()
+
+        self.assertEqual(refresh_usage_stats(today=TODAY), 1)
+        self.assertEqual(self.stats(self.tray)[3], 4)
+
+    def test_future_bookings_counted_once_past(self):
+        """Test a booking only counts as a use once its day has come."""
+        today = timezone.localdate()
+        later = today + timedelta(days=5)
+        self.book(self.tray, today - timedelta(days=30))
+        self.book(self.tray, later)
+        refresh_usage_stats(today=today)
+        self.settle()
+        self.book(self.second, later)
+
+        self.assertEqual(refresh_usage_stats(today=today), 1)
+        self.assertEqual(self.stats(self.tray)[0], 1)
+        self.assertFalse(
+            TrayUsageStats.objects.filter(tray=self.second).exists()
+        )
+
+        # Nothing was saved since, but both bookings have now happened
+        self.assertEqual(refresh_usage_stats(today=later), 2)
+        self.assertEqual(
+            self.stats(self.tray),
+            (2, today - timedelta(days=30), later, 35),
+        )
+        self.assertEqual(self.stats(self.second)[0], 1)
+
+    def test_late_commit_picked_up(self):
+        """Test an allocation saved just before a refresh started counts."""
+        self.book(self.tray, date(2020, 1, 1))
+        refresh_usage_stats(today=TODAY)
+        watermark = AnalyticsRun.objects.get().watermark
+
+        # Committed after the refresh read, saved before it started
+        allocation = self.book(self.tray, date(2020, 1, 3))
+        Allocation.objects.filter(pk=allocation.pk).update(
+            updated_at=watermark + WATERMARK_LAG - timedelta(seconds=1)
+        )
+
+        self.assertEqual(refresh_usage_stats(today=TODAY), 1)
+        self.assertEqual(self.stats(self.tray)[0], 2)
+
+    def test_deleted_allocation_recomputed(self):
+        """Test deleting an allocation gets its tray recomputed."""
+        self.book(self.tray, date(2020, 1, 1))
+        latest = self.book(self.tray, date(2020, 1, 3))
+        refresh_usage_stats(today=TODAY)
+
+        latest.delete()
+
+        self.assertEqual(refresh_usage_stats(today=TODAY), 1)
+        self.assertEqual(
+            self.stats(self.tray), (1, date(2020, 1, 1), date(2020, 1, 1), 0)
+        )
+
+    def test_command(self):
+        """Test the refresh command."""
+        self.book(self.tray, date(2020, 1, 1))
+
+        out = StringIO()
+        call_command('refresh_tray_analytics', '--full', stdout=out)
+
+        self.assertIn('Refreshed 3 trays', out.getvalue())
+
+
+class TrayTurnaroundReportTests(TrayAnalyticsTestMixin, TestCase):
+    """Test the per tray type report."""
+
+    def test_report(self):
+        """Test the average gap, utilisation and idle trays per type."""
+        for day in (1, 5, 9):
+            self.book(self.tray, date(2020, 1, day))
+        refresh_usage_stats(today=TODAY)
+
+        report = build_report(date(2020, 1, 10))
+
+        mandible = next(
+            r for r in report if r['tray_type'] == self.tray_type.id
+        )
+        self.assertEqual(mandible['trays'], 2)
+        self.assertEqual(mandible['used_trays'], 1)
+        self.assertEqual(mandible['uses'], 3)
+        self.assertEqual(mandible['avg_days_between_uses'], 4.0)
+        # Three uses in the ten days since the first one
+        self.assertEqual(mandible['utilisation'], 30.0)
+        self.assertEqual(mandible['idle_trays'], 1)
+
+        unused = next(
+            r for r in report if r['tray_type'] == self.unused.tray_type_id
+        )
+        self.assertIsNone(unused['avg_days_between_uses'])
+        self.assertEqual(unused['idle_trays'], 1)
+
+        report = build_report(date(2020, 3, 1))
+        mandible = next(
+            r for r in report if r['tray_type'] == self.tray_type.id
+        )
+        self.assertEqual(mandible['idle_trays'], 2)
+
+
+class TrayTurnaroundApiTests(TrayAnalyticsTestMixin, TestCase):
+    """Test the tray turnaround API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cached_for_the_day(self):
+        """Test the report is built once, then served from the cache."""
+        self.book(self.tray, date(2020, 1, 1))
+        refresh_usage_stats()
+
+        res = self.client.get(TURNAROUND_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(r['uses'] for r in res.data), 1)
+
+        self.book(self.tray, date(2020, 1, 2))
+        with self.assertNumQueries(0):
+            res = self.client.get(TURNAROUND_URL)
+        self.assertEqual(sum(r['uses'] for r in res.data), 1)
+
+    def test_request_does_not_refresh(self):
+        """Test reading the report leaves the refresh to the command."""
+        self.book(self.tray, date(2020, 1, 1))
+
+        res = self.client.get(TURNAROUND_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sum(r['uses'] for r in res.data), 0)
+        self.assertFalse(AnalyticsRun.objects.exists())
+        self.assertFalse(TrayUsageStats.objects.exists())
+
+    def test_served_from_replica(self):
+        """Test the report is read inside a replica block."""
+        with patch(
+            'event.views.replica_reads', wraps=replica_reads
+        ) as reads:
+            res = self.client.get(TURNAROUND_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        reads.assert_called_once_with(self.user, use_replica=True)
+
+    def test_staff_required(self):
+        """Test non-staff users cannot read the analytics."""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(TURNAROUND_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,249 @@
+"""
+Tests for the current tray location table.
+"""
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tray
+from event.locations import refresh_tray_locations, relocate_due_trays
+from event.models import Event, TrayLocation
+
+from .helper_for_event_tests import (
+    create_allocation,
+    create_dummy_tray,
+    create_hospital,
+    create_procedure,
+    create_random_entities,
+    generate_random_patient_details,
+)
+
+
+LOCATIONS_URL = reverse('event:traylocation-list')
+
+
+def location_url(tray_id):
+    """Create and return a tray location URL."""
+    return reverse('event:traylocation-detail', args=[tray_id])
+
+
+class TrayLocationTestMixin:
+    """A tray booked at two hospitals."""
+
+    def setUp(self):
+        self.user, self.hospital, self.doctor = create_random_entities()
+        self.user.is_staff = True
+        self.user.save()
+        self.other_hospital = create_hospital(name='Other Hospital')
+        self.tray = create_dummy_tray('TT-1')
+
+    def book(self, tray, event_date, hospital=None):
+        """Allocate a tray to a procedure on a date, signals included."""
+        event = Event.objects.create(
+            created_by=self.user,
+            doctor=self.doctor,
+            hospital=hospital or self.hospital,
+            date=event_date,
+        )
+        procedure = create_procedure(
+            event, **generate_random_patient_details()
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_allocation(procedure, tray, self.user)
+
+    def location(self, tray):
+        """Return the tray's (hospital, date), None if it has no row."""
+        row = TrayLocation.objects.filter(tray=tray).first()
+        return row and (row.hospital, row.event_date)
+
+
+class TrayLocationSyncTests(TrayLocationTestMixin, TestCase):
+    """Test the location rows follow the allocations."""
+
+    def test_latest_allocation_wins(self):
+        """Test the latest event date is the tray's location."""
+        self.book(self.tray, date(2020, 1, 2), self.other_hospital)
+        self.book(self.tray, date(2020, 1, 1))
+
+        self.assertEqual(
+            self.location(self.tray),
+            (self.other_hospital, date(2020, 1, 2)),
+        )
+
+    def test_future_booking_waits_for_its_day(self):
+        """Test a booking ahead only moves the tray once its day comes."""
+        today = timezone.localdate()
+        self.book(self.tray, today - timedelta(days=3))
+        self.book(self.tray, today + timedelta(days=7), self.other_hospital)
+        other = create_dummy_tray('TT-2')
+        self.book(other, today + timedelta(days=7), self.other_hospital)
+
+        self.assertEqual(
+            self.location(self.tray),
+            (self.hospital, today - timedelta(days=3)),
+        )
+        self.assertIsNone(self.location(other))
+        self.assertEqual(relocate_due_trays(), 0)
+
+        self.assertEqual(
+            relocate_due_trays(today=today + timedelta(days=7)), 2
+        )
+        self.assertEqual(
+            self.location(self.tray),
+            (self.other_hospital, today + timedelta(days=7)),
+        )
+        self.assertEqual(
+            self.location(other),
+            (self.other_hospital, today + timedelta(days=7)),
+        )
+
+    def test_delete_falls_back(self):
+        """Test deleting the latest allocation relocates the tray."""
+        self.book(self.tray, date(2020, 1, 1))
+        latest = self.book(self.tray, date(2020, 1, 2), self.other_hospital)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            latest.delete()
+        self.assertEqual(
+            self.location(self.tray), (self.hospital, date(2020, 1, 1))
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tray.allocations.all().delete()
+        self.assertIsNone(self.location(self.tray))
+
+    def test_moving_allocation_relocates_both_trays(self):
+        """Test moving an allocation to another tray updates both."""
+        allocation = self.book(self.tray, date(2020, 1, 1))
+        other = create_dummy_tray('TT-2')
+
+        allocation.tray = other
+        with self.captureOnCommitCallbacks(execute=True):
+            allocation.save()
+
+        self.assertIsNone(self.location(self.tray))
+        self.assertEqual(
+            self.location(other), (self.hospital, date(2020, 1, 1))
+        )
+
+    def test_event_change_relocates(self):
+        """Test moving an event to another hospital moves its trays."""
+        allocation = self.book(self.tray, date(2020, 1, 1))
+
+        event = allocation.procedure.event
+        event.hospital = self.other_hospital
+        with self.captureOnCommitCallbacks(execute=True):
+            event.save()
+
+        self.assertEqual(
+            self.location(self.tray),
+            (self.other_hospital, date(2020, 1, 1)),
+        )
+
+    def test_refresh_in_constant_queries(self):
+        """Test refreshing many trays costs a fixed number of queries."""
+        for n in range(5):
+            tray = Tray.objects.create(
+                code=f'X-{n}', tray_type=self.tray.tray_type
+            )
+            self.book(tray, date(2020, 1, n + 1))
+        TrayLocation.objects.all().delete()
+
+        # Trays with their latest allocation, the hospitals, the empty
+        # read ending the scan, then one upsert and one delete for TT-1
+        # which was never allocated
+        with self.assertNumQueries(5):
+            written = refresh_tray_locations(Tray.objects.all())
+
+        self.assertEqual(written, 5)
+
+    def test_rebuild_command(self):
+        """Test the rebuild command backfills missing rows."""
+        self.book(self.tray, date(2020, 1, 1))
+        TrayLocation.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_tray_locations', stdout=out)
+
+        self.assertIn('Located 1 trays', out.getvalue())
+        self.assertEqual(
+            self.location(self.tray), (self.hospital, date(2020, 1, 1))
+        )
+
+    def test_rebuild_command_due(self):
+        """Test the due option only relocates trays left behind."""
+        self.book(self.tray, date(2020, 1, 1))
+        self.book(create_dummy_tray('TT-2'), date(2020, 1, 1))
+        TrayLocation.objects.filter(tray=self.tray).delete()
+
+        out = StringIO()
+        call_command('rebuild_tray_locations', '--due', stdout=out)
+
+        self.assertIn('Located 1 trays', out.getvalue())
+        self.assertEqual(
+            self.location(self.tray), (self.hospital, date(2020, 1, 1))
+        )
+
+
+class TrayLocationApiTests(TrayLocationTestMixin, TestCase):
+    """Test the tray location API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retrieve_in_one_query(self):
+        """Test a tray's location is one primary key lookup."""
+        self.book(self.tray, date(2020, 1, 1))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(location_url(self.tray.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['tray_code'], 'TT-1')
+        self.assertEqual(res.data['hospital'], self.hospital.id)
+        self.assertEqual(res.data['event_date'], '2020-01-01')
+
+    def test_list_filtered_by_hospital(self):
+        """Test listing the trays at a hospital."""
+        self.book(self.tray, date(2020, 1, 1))
+        self.book(create_dummy_tray('TT-2'), date(2020, 1, 1),
+                  self.other_hospital)
+
+        res = self.client.get(LOCATIONS_URL, {'hospital': self.hospital.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['tray_code'] for r in res.data['results']], ['TT-1']
+        )
+
+    def test_unallocated_tray(self):
+        """Test a tray never allocated has no location."""
+        res = self.client.get(location_url(self.tray.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TrayLocationAdminTests(TrayLocationTestMixin, TestCase):
+    """Test the tray admin location column."""
+
+    def test_location_column(self):
+        """Test the tray changelist shows each tray's location."""
+        self.book(self.tray, date(2020, 1, 1))
+        create_dummy_tray('TT-2')
+        self.user.is_superuser = True
+        self.user.save()
+        client = Client()
+        client.force_login(self.user)
+
+        res = client.get(reverse('admin:core_tray_changelist'))
+
+        self.assertContains(res, f'{self.hospital.name} (2020-01-01)')
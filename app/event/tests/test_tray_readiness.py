@@ -0,0 +1,213 @@
+"""
+Tests for the tray readiness report.
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Product, Tray, TrayItem, TrayType
+from event.admin import InventoryAdmin
+from event.models import Inventory
+from event.trays import readiness_lines, tray_readiness
+
+
+READINESS_URL = reverse('event:tray-readiness-list')
+
+
+def create_product(catalogue_id, item_type='Screw'):
+    """Create and return a product."""
+    return Product.objects.create(
+        catalogue_id=catalogue_id,
+        profile=Decimal('2.0'),
+        item_type=item_type,
+        description=f'{item_type} {catalogue_id}',
+        base_price=Decimal('10.00'),
+        vat_price=Decimal('11.50'),
+    )
+
+
+class TrayReadinessTestMixin:
+    """Two tray types with a ready, a short and an over-full tray."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.plate = create_product(10000001, 'Plate')
+        self.screw = create_product(10000002, 'Screw')
+        self.drill = create_product(10000003, 'Drill')
+
+        self.mandible = TrayType.objects.create(
+            name='Mandible', description='Mandible set',
+        )
+        TrayItem.objects.create(
+            tray_type=self.mandible, product=self.plate, quantity=2,
+        )
+        TrayItem.objects.create(
+            tray_type=self.mandible, product=self.screw, quantity=10,
+        )
+        self.hand = TrayType.objects.create(
+            name='Hand', description='Hand set',
+        )
+        TrayItem.objects.create(
+            tray_type=self.hand, product=self.screw, quantity=4,
+        )
+
+        # Complete, with the screws split over two inventory rows
+        self.ready = Tray.objects.create(code='M-1', tray_type=self.mandible)
+        self.stock(self.ready, self.plate, 2)
+        self.stock(self.ready, self.screw, 6)
+        self.stock(self.ready, self.screw, 4)
+        # Three screws short and no plates at all
+        self.short = Tray.objects.create(code='M-2', tray_type=self.mandible)
+        self.stock(self.short, self.screw, 7)
+        # One screw too many and a drill the hand set does not list
+        self.full = Tray.objects.create(code='H-1', tray_type=self.hand)
+        self.stock(self.full, self.screw, 5)
+        self.stock(self.full, self.drill, 1)
+        # Warehouse stock is not in any tray
+        self.stock(None, self.plate, 50)
+
+    def stock(self, tray, product, quantity):
+        """Put a quantity of a product in a tray."""
+        Inventory.objects.create(
+            tray=tray, item=product, quantity=quantity, created_by=self.user,
+        )
+
+
+class TrayReadinessTests(TrayReadinessTestMixin, TestCase):
+    """Test the set-based readiness queries."""
+
+    def test_totals_for_every_tray(self):
+        """Test every tray gets its missing and surplus totals."""
+        with self.assertNumQueries(1):
+            rows = tray_readiness()
+
+        self.assertEqual(
+            [(r['code'], r['missing'], r['surplus'], r['is_ready'])
+             for r in rows],
+            [('H-1', 0, 2, False), ('M-1', 0, 0, True),
+             ('M-2', 5, 0, False)],
+        )
+
+    def test_filter_by_tray_type_and_status(self):
+        """Test the report can be limited by tray type and status."""
+        rows = tray_readiness(tray_type_id=self.mandible.id)
+        self.assertEqual([r['code'] for r in rows], ['M-1', 'M-2'])
+
+        rows = tray_readiness(tray_type_id=self.mandible.id, ready=False)
+        self.assertEqual([r['code'] for r in rows], ['M-2'])
+
+        rows = tray_readiness(ready=True)
+        self.assertEqual([r['code'] for r in rows], ['M-1'])
+
+    def test_lines_list_short_and_surplus_products(self):
+        """Test the lines name each product that is off."""
+        with self.assertNumQueries(1):
+            lines = readiness_lines([self.ready.id, self.short.id,
+                                     self.full.id])
+
+        self.assertNotIn(self.ready.id, lines)
+        self.assertEqual(
+            [(line['item_type'], line['expected'], line['actual'],
+              line['missing'], line['surplus'])
+             for line in lines[self.short.id]],
+            [('Plate', 2, 0, 2, 0), ('Screw', 10, 7, 3, 0)],
+        )
+        self.assertEqual(
+            [(line['item_type'], line['missing'], line['surplus'])
+             for line in lines[self.full.id]],
+            [('Screw', 0, 1), ('Drill', 0, 1)],
+        )
+
+
+class TrayReadinessApiTests(TrayReadinessTestMixin, TestCase):
+    """Test the tray readiness API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_staff_required(self):
+        """Test non-staff users cannot read the report."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(READINESS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_readiness_in_two_queries(self):
+        """Test the report costs the same two queries for any page."""
+        with self.assertNumQueries(2):
+            res = self.client.get(READINESS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 3)
+        short = res.data['results'][2]
+        self.assertEqual(short['code'], 'M-2')
+        self.assertEqual(short['missing'], 5)
+        self.assertEqual(len(short['lines']), 2)
+
+    def test_filters(self):
+        """Test filtering by tray type and readiness."""
+        res = self.client.get(
+            READINESS_URL, {'tray_type': self.mandible.id, 'ready': 'false'}
+        )
+
+        self.assertEqual(
+            [r['code'] for r in res.data['results']], ['M-2']
+        )
+
+    def test_invalid_tray_type(self):
+        """Test a non-numeric tray type is rejected."""
+        res = self.client.get(READINESS_URL, {'tray_type': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TrayReadinessAdminTests(TrayReadinessTestMixin, TestCase):
+    """Test the tray readiness admin page."""
+
+    def test_readiness_page(self):
+        """Test the admin page lists incomplete trays with their lines."""
+        client = Client()
+        client.force_login(self.user)
+
+        res = client.get(
+            reverse('admin:event_inventory_readiness'), {'ready': '0'}
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [r['code'] for r in res.context['rows']], ['H-1', 'M-2']
+        )
+        self.assertContains(res, '7 of 10')
+
+    def test_readiness_page_paginated(self):
+        """Test the admin page lists one page of trays at a time."""
+        client = Client()
+        client.force_login(self.user)
+        url = reverse('admin:event_inventory_readiness')
+
+        with patch.object(InventoryAdmin, 'list_per_page', 2):
+            first = client.get(url)
+            second = client.get(url, {'page': 2})
+
+        self.assertEqual(
+            [r['code'] for r in first.context['rows']], ['H-1', 'M-1']
+        )
+        self.assertContains(first, '?page=2')
+        self.assertEqual(
+            [r['code'] for r in second.context['rows']], ['M-2']
+        )
@@ -0,0 +1,225 @@
+"""
+Tests for the usage rollups and the usage report.
+"""
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Doctor
+from event.models import Usage, UsageRollup
+
+from .helper_for_event_tests import BillingTestMixin, create_user
+
+
+USAGE_REPORT_URL = reverse('event:usage-report-list')
+
+
+class UsageRollupTestMixin(BillingTestMixin):
+
+    def rollups(self):
+        """Return ``{(month, hospital, doctor, product): totals}``."""
+        return {
+            (r.month, r.hospital_id, r.doctor_id, r.product_id):
+            (r.usages, r.quantity, r.net, r.gross)
+            for r in UsageRollup.objects.all()
+        }
+
+    def key(self, month, product, hospital=None, doctor=None):
+        return (
+            month, (hospital or self.hospital).id,
+            (doctor or self.doctor).id, product.id,
+        )
+
+
+class UsageRollupTests(UsageRollupTestMixin, TestCase):
+    """Test the rollups follow the usages."""
+
+    def test_usage_writes(self):
+        """Test logging, changing and deleting usages."""
+        event = self.create_event(date(2030, 1, 5))
+        self.use(event, (self.screw, 2), (self.screw, 1))
+        jan = date(2030, 1, 1)
+
+        self.assertEqual(self.rollups(), {
+            self.key(jan, self.screw):
+            (2, 3, Decimal('30.00'), Decimal('34.50')),
+        })
+
+        usage = Usage.objects.order_by('pk').first()
+        usage.quantity = 5
+        usage.save()
+        self.assertEqual(self.rollups()[self.key(jan, self.screw)][1], 6)
+
+        usage.item = self.plate
+        usage.save()
+        self.assertEqual(self.rollups(), {
+            self.key(jan, self.screw):
+            (1, 1, Decimal('10.00'), Decimal('11.50')),
+            self.key(jan, self.plate):
+            (1, 5, Decimal('500.00'), Decimal('575.00')),
+        })
+
+        usage.delete()
+        self.assertEqual(list(self.rollups()), [self.key(jan, self.screw)])
+
+    def test_moved_event(self):
+        """Test moving an event to another month moves its rollups."""
+        event = self.create_event(date(2030, 1, 5))
+        self.use(event, (self.screw, 2))
+        self.use(self.create_event(date(2030, 1, 9)), (self.screw, 1))
+
+        event.date = date(2030, 2, 1)
+        event.save()
+
+        self.assertEqual(self.rollups(), {
+            self.key(date(2030, 1, 1), self.screw):
+            (1, 1, Decimal('10.00'), Decimal('11.50')),
+            self.key(date(2030, 2, 1), self.screw):
+            (1, 2, Decimal('20.00'), Decimal('23.00')),
+        })
+
+    def test_moved_procedure(self):
+        """Test moving a procedure to another doctor's event."""
+        procedure = self.use(
+            self.create_event(date(2030, 1, 5)), (self.plate, 1)
+        )
+        other = Doctor.objects.create(
+            user=create_user(email='other@example.com'),
+            practice_number=2, is_verified=True,
+        )
+        event = self.create_event(date(2030, 1, 5))
+        event.doctor = other
+        event.save()
+
+        procedure.event = event
+        procedure.save()
+
+        self.assertEqual(
+            list(self.rollups()),
+            [self.key(date(2030, 1, 1), self.plate, doctor=other)],
+        )
+
+    def test_unmoved_procedure_skips_usages(self):
+        """Test an edit that moves nothing leaves the usages unread."""
+        procedure = self.use(
+            self.create_event(date(2030, 1, 5)), (self.screw, 1)
+        )
+        procedure.description = 'Edited'
+
+        with CaptureQueriesContext(connection) as queries:
+            procedure.save()
+
+        for query in queries:
+            self.assertNotIn('"event_usage"', query['sql'])
+
+    def test_deleted_event(self):
+        """Test deleting an event takes its usages off the rollups."""
+        event = self.create_event(date(2030, 1, 5))
+        self.use(event, (self.plate, 1))
+
+        event.delete()
+
+        self.assertEqual(self.rollups(), {})
+
+    def test_rebuild_reconciles(self):
+        """Test the rebuild fixes bulk writes and stray rows."""
+        self.use(self.create_event(date(2030, 1, 5)), (self.screw, 2))
+        # Bulk updates send no signals
+        Usage.objects.update(quantity=4)
+        UsageRollup.objects.create(
+            month=date(2029, 1, 1), hospital=self.hospital,
+            doctor=self.doctor, product=self.plate, usages=1, quantity=1,
+        )
+
+        out = StringIO()
+        call_command('rebuild_usage_rollups', stdout=out)
+
+        self.assertIn('Rebuilt 1 rollups, removed 1', out.getvalue())
+        self.assertEqual(self.rollups(), {
+            self.key(date(2030, 1, 1), self.screw):
+            (1, 4, Decimal('40.00'), Decimal('46.00')),
+        })
+
+
+class UsageReportApiTests(UsageRollupTestMixin, TestCase):
+    """Test the usage report API."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_screws_per_doctor_per_month(self):
+        """Test grouping by doctor and month, filtered by item type."""
+        self.use(
+            self.create_event(date(2030, 1, 5)),
+            (self.screw, 2), (self.plate, 1),
+        )
+        self.use(
+            self.create_event(date(2030, 1, 9), self.other_hospital),
+            (self.screw, 3),
+        )
+        self.use(self.create_event(date(2030, 2, 1)), (self.screw, 1))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(USAGE_REPORT_URL, {
+                'group_by': ['doctor', 'month'], 'item_type': 'Screw',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([dict(r) for r in res.data['results']], [
+            {
+                'doctor': self.doctor.id, 'month': '2030-01-01',
+                'usages': 2, 'quantity': 5, 'net': '50.00',
+                'gross': '57.50',
+            },
+            {
+                'doctor': self.doctor.id, 'month': '2030-02-01',
+                'usages': 1, 'quantity': 1, 'net': '10.00',
+                'gross': '11.50',
+            },
+        ])
+        for query in queries:
+            self.assertNotIn('"event_usage"', query['sql'])
+
+    def test_filter_hospital(self):
+        """Test the default monthly totals for one hospital."""
+        self.use(self.create_event(date(2030, 1, 5)), (self.plate, 1))
+        self.use(
+            self.create_event(date(2030, 1, 9), self.other_hospital),
+            (self.plate, 3),
+        )
+
+        res = self.client.get(USAGE_REPORT_URL, {
+            'hospital': self.other_hospital.id, 'date_from': '2030-01-15',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(r['month'], r['quantity']) for r in res.data['results']],
+            [('2030-01-01', 3)],
+        )
+
+    def test_invalid_group(self):
+        """Test grouping by an unknown field is rejected."""
+        res = self.client.get(USAGE_REPORT_URL, {'group_by': 'patient'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_staff_required(self):
+        """Test non-staff users cannot read the report."""
+        self.user.is_staff = False
+        self.user.save()
+
+        res = self.client.get(USAGE_REPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,138 @@
+"""
+Tray readiness, computed set-based for every tray at once.
+
+A tray is ready when its Inventory rows hold exactly the quantities its
+TrayType's TrayItem rows ask for. Rather than comparing one tray at a
+time, the expected quantities (TrayItem joined to every tray of its
+type) and the counted ones (Inventory) are stacked with UNION ALL and
+grouped per tray and product. Products a tray should hold but has no
+inventory for, and inventory the tray type does not list, fall out of
+the same grouping, so nothing is fetched per tray.
+"""
+from django.db import connections, router
+
+from core.models import Product, Tray, TrayItem, TrayType
+from .models import Inventory
+
+
+def _tray_filter(tray_type_id=None, tray_ids=None):
+    """Return the WHERE clause and params restricting the trays."""
+    clauses, params = [], []
+    if tray_type_id is not None:
+        clauses.append('t.tray_type_id = %s')
+        params.append(tray_type_id)
+    if tray_ids is not None:
+        clauses.append(
+            f't.id IN ({", ".join(["%s"] * len(tray_ids))})'
+        )
+        params.extend(tray_ids)
+    if not clauses:
+        return '', []
+    return 'WHERE ' + ' AND '.join(clauses), params
+
+
+def _lines_sql(where):
+    """Return the grouped expected versus counted quantities.
+
+    Only the products where the two differ are kept.
+    """
+    return f"""
+        SELECT s.tray_id, s.product_id,
+               SUM(s.expected) AS expected, SUM(s.actual) AS actual
+        FROM (
+            SELECT t.id AS tray_id, ti.product_id AS product_id,
+                   ti.quantity AS expected, 0 AS actual
+            FROM {Tray._meta.db_table} t
+            JOIN {TrayItem._meta.db_table} ti
+                ON ti.tray_type_id = t.tray_type_id
+            {where}
+            UNION ALL
+            SELECT t.id, i.item_id, 0, i.quantity
+            FROM {Inventory._meta.db_table} i
+            JOIN {Tray._meta.db_table} t ON t.id = i.tray_id
+            {where}
+        ) s
+        GROUP BY s.tray_id, s.product_id
+        HAVING SUM(s.expected) <> SUM(s.actual)
+    """
+
+
+def _fetch(sql, params):
+    """Run a read query and return the rows as dicts."""
+    connection = connections[router.db_for_read(Tray)]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def tray_readiness(tray_type_id=None, ready=None):
+    """
+    Return the missing and surplus totals for every tray in one query.
+
+    Args:
+        tray_type_id (int, optional): Only trays of this tray type.
+        ready (bool, optional): Only ready (True) or incomplete (False)
+            trays.
+
+    Returns:
+        list: One dict per tray ordered by code, with ``id``, ``code``,
+            ``tray_type``, ``tray_type_name``, ``missing``, ``surplus``
+            and ``is_ready``.
+    """
+    where, params = _tray_filter(tray_type_id)
+    having = ''
+    if ready is not None:
+        having = 'HAVING COUNT(l.product_id) ' + ('= 0' if ready else '> 0')
+    sql = f"""
+        SELECT t.id, t.code, t.tray_type_id AS tray_type,
+               tt.name AS tray_type_name,
+               COALESCE(SUM(CASE WHEN l.expected > l.actual
+                            THEN l.expected - l.actual ELSE 0 END), 0)
+                   AS missing,
+               COALESCE(SUM(CASE WHEN l.actual > l.expected
+                            THEN l.actual - l.expected ELSE 0 END), 0)
+                   AS surplus
+        FROM {Tray._meta.db_table} t
+        JOIN {TrayType._meta.db_table} tt ON tt.id = t.tray_type_id
+        LEFT JOIN ({_lines_sql(where)}) l ON l.tray_id = t.id
+        {where}
+        GROUP BY t.id, t.code, t.tray_type_id, tt.name
+        {having}
+        ORDER BY t.code
+    """
+    rows = _fetch(sql, params * 3)
+    for row in rows:
+        row['is_ready'] = not row['missing'] and not row['surplus']
+    return rows
+
+
+def readiness_lines(tray_ids):
+    """
+    Return the products each tray is short of or holds too many of.
+
+    Args:
+        tray_ids (iterable): The trays to report on.
+
+    Returns:
+        dict: The discrepancy lines keyed by tray id, ordered by
+            catalogue ID. Ready trays are absent.
+    """
+    tray_ids = list(tray_ids)
+    if not tray_ids:
+        return {}
+    where, params = _tray_filter(tray_ids=tray_ids)
+    sql = f"""
+        SELECT l.tray_id, l.product_id AS product, p.catalogue_id,
+               p.digimed_id, p.item_type, p.description,
+               l.expected, l.actual
+        FROM ({_lines_sql(where)}) l
+        JOIN {Product._meta.db_table} p ON p.id = l.product_id
+        ORDER BY l.tray_id, p.catalogue_id
+    """
+    lines = {}
+    for row in _fetch(sql, params * 2):
+        row['missing'] = max(row['expected'] - row['actual'], 0)
+        row['surplus'] = max(row['actual'] - row['expected'], 0)
+        lines.setdefault(row.pop('tray_id'), []).append(row)
+    return lines
@@ -10,6 +10,24 @@ router = DefaultRouter()
 router.register('events', views.EventViewSet)
 router.register('procedures', views.ProcedureViewSet)
 router.register('allocations', views.AllocationViewSet)
+router.register('trays', views.TrayProvisioningViewSet)
+router.register(
+    'trays/readiness', views.TrayReadinessViewSet, basename='tray-readiness'
+)
+router.register(
+    'trays/availability', views.TrayAvailabilityViewSet,
+    basename='tray-availability',
+)
+router.register('trays/locations', views.TrayLocationViewSet)
+router.register(
+    'analytics/tray-turnaround', views.TrayTurnaroundViewSet,
+    basename='tray-turnaround',
+)
+router.register('billing', views.BillingViewSet, basename='billing')
+router.register(
+    'reports/usage', views.UsageReportViewSet, basename='usage-report'
+)
+router.register('stock/low', views.LowStockViewSet, basename='low-stock')
 
 app_name = 'event'
 
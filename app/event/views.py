@@ -1,11 +1,35 @@
 """
 Views for the recipe API
 """
-from rest_framework import viewsets, mixins
+from django.db import IntegrityError
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import viewsets, mixins, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework import permissions
+from rest_framework.decorators import action
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
 
-from .models import Event, Procedure, Allocation
+from core.models import Tray
+from core.routers import replica_reads
+from core.search import IndexedSearchFilter
+from .models import Event, Procedure, Allocation, TrayLocation
+from .analytics import tray_turnaround
+from .availability import tray_availability
+from .billing import billed_usages, event_invoice, event_totals
+from .conflicts import conflict_report
+from .forecasting import low_stock
+from .provisioning import (
+    provision_numbered_trays,
+    provision_trays,
+    sync_trays,
+)
+from .rollups import usage_report
+from .search import ProcedureIndexSearchFilter
+from .trays import readiness_lines, tray_readiness
 from . import serializers
 
 
@@ -28,10 +52,44 @@ class IsAuthorized(permissions.BasePermission):
         return False
    
 
-class EventViewSet(viewsets.ModelViewSet):
+class ReplicaReadMixin:
+    """Serve the safe list and report actions from a read replica.
+
+    Users who wrote recently keep reading from the primary, see
+    core.routers for the stickiness rules.
+    """
+    replica_actions = ('list',)
+
+    def initial(self, request, *args, **kwargs):
+        """Open the routing context once the user is authenticated."""
+        super().initial(request, *args, **kwargs)
+        self._replica_reads = replica_reads(
+            request.user,
+            use_replica=(
+                request.method in permissions.SAFE_METHODS
+                and self.action in self.replica_actions
+            ),
+        )
+        self._replica_reads.__enter__()
+
+    def dispatch(self, request, *args, **kwargs):
+        """Close the routing context opened in initial, even on errors."""
+        self._replica_reads = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_reads is not None:
+                self._replica_reads.__exit__(None, None, None)
+
+
+class EventViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """View for event API management"""
     serializer_class = serializers.EventDetailSerializer
     queryset = Event.objects.all()
+    filter_backends = [IndexedSearchFilter]
+    search_fields = (
+        'description', 'hospital__name', 'doctor__user__surname',
+    )
 
     authentication_classes = [TokenAuthentication]
     permission_classes = [IsAuthorized]
@@ -57,6 +115,7 @@ class EventViewSet(viewsets.ModelViewSet):
 
 
 class BaseEventExtensionModel( 
+    ReplicaReadMixin,
     viewsets.GenericViewSet,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
@@ -76,6 +135,8 @@ class ProcedureViewSet(BaseEventExtensionModel):
     """View for procedure API management"""
     serializer_class = serializers.ProcedureSerializer
     queryset = Procedure.objects.all()
+    # Searches ProcedureSearchIndex instead of joining five tables
+    filter_backends = [ProcedureIndexSearchFilter]
 
     def get_queryset(self):
         """Filter queryset to authenticated user"""
@@ -93,6 +154,7 @@ class AllocationViewSet(BaseEventExtensionModel):
     """View for allocation API management"""
     serializer_class = serializers.AllocationSerializer
     queryset = Allocation.objects.all()
+    replica_actions = ('list', 'conflicts')
 
     def get_queryset(self):
         """Retrieve allocations for authenticated users"""
@@ -104,5 +166,304 @@ class AllocationViewSet(BaseEventExtensionModel):
         return self.queryset.filter(
             procedure__event__doctor=user.doctor
         ).order_by('-id')
-    
-   
+
+    @extend_schema(
+        parameters=[serializers.ConflictQuerySerializer],
+        responses=serializers.ConflictSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        url_path='conflicts',
+        permission_classes=[permissions.IsAdminUser],
+    )
+    def conflicts(self, request):
+        """List trays allocated to two procedures on the same date.
+
+        Starts from today unless ``date_from`` is given.
+        """
+        params = serializers.ConflictQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        report = conflict_report(
+            date_from=params.validated_data.get(
+                'date_from', timezone.localdate()
+            ),
+            date_to=params.validated_data.get('date_to'),
+        )
+        return Response(serializers.ConflictSerializer(report, many=True).data)
+
+
+class TrayPagination(PageNumberPagination):
+    """Page through the tray reports, 100 trays at a time."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class ReportPagination(PageNumberPagination):
+    """Page through report rows, 100 at a time."""
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class TrayReadinessViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """Missing and surplus quantities for every tray, for staff."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = TrayPagination
+
+    @extend_schema(
+        parameters=[serializers.ReadinessQuerySerializer],
+        responses=serializers.TrayReadinessSerializer(many=True),
+    )
+    def list(self, request):
+        """Return the readiness of every tray, filterable by tray type.
+
+        One grouped query totals every tray, a second one lists the
+        short and surplus products for the trays on the page.
+        """
+        params = serializers.ReadinessQuerySerializer(
+            data=request.query_params.dict()
+        )
+        params.is_valid(raise_exception=True)
+        rows = tray_readiness(**params.validated_data)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        lines = readiness_lines(
+            row['id'] for row in page if not row['is_ready']
+        )
+        for row in page:
+            row['lines'] = lines.get(row['id'], [])
+        serializer = serializers.TrayReadinessSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class TrayProvisioningViewSet(viewsets.GenericViewSet):
+    """Create and re-sync trays from their tray type template, for staff."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    queryset = Tray.objects.all()
+
+    @extend_schema(
+        request=serializers.TrayProvisionSerializer,
+        responses=serializers.ProvisionedTraySerializer(many=True),
+    )
+    @action(detail=False, methods=['post'], url_path='provision')
+    def provision(self, request):
+        """Create trays and seed their inventory from the template."""
+        serializer = serializers.TrayProvisionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            if 'codes' in data:
+                trays = provision_trays(
+                    data['tray_type'], data['codes'], request.user
+                )
+            else:
+                trays = provision_numbered_trays(
+                    data['tray_type'], data['prefix'], data['count'],
+                    request.user,
+                )
+        except IntegrityError:
+            # Another provisioning took the codes after validation
+            return Response(
+                {'codes': ['Tray codes were taken meanwhile, try again.']},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(
+            serializers.ProvisionedTraySerializer(trays, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @extend_schema(
+        request=serializers.TraySyncSerializer,
+        responses=serializers.SyncResultSerializer,
+    )
+    @action(detail=False, methods=['post'], url_path='sync')
+    def sync(self, request):
+        """Bring the inventory of existing trays back to the template."""
+        serializer = serializers.TraySyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        trays = None
+        if 'trays' in serializer.validated_data:
+            trays = Tray.objects.filter(
+                id__in=serializer.validated_data['trays']
+            )
+        result = sync_trays(
+            serializer.validated_data['tray_type'], request.user, trays=trays
+        )
+        return Response(serializers.SyncResultSerializer(result).data)
+
+
+class TrayAvailabilityViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """Trays of a type free on up to a month of dates."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthorized]
+
+    @extend_schema(
+        parameters=[serializers.AvailabilityQuerySerializer],
+        responses=serializers.AvailabilitySerializer(many=True),
+    )
+    def list(self, request):
+        """Return the free trays of a type for each requested date.
+
+        Pass ``date`` once per date, or ``start`` with ``days`` (default
+        7) for a run of dates. With ``hospital``, trays booked at another
+        hospital within the transit window are left out.
+        """
+        params = serializers.AvailabilityQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        availability = tray_availability(
+            params.validated_data['tray_type'],
+            params.validated_data['dates'],
+            hospital=params.validated_data.get('hospital'),
+        )
+        return Response(
+            serializers.AvailabilitySerializer(availability, many=True).data
+        )
+
+
+class TrayLocationViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
+    """Current tray locations, looked up by tray id.
+
+    Reads the TrayLocation rows kept by event.signals, see
+    event.locations, so no allocations are walked per tray.
+    """
+    serializer_class = serializers.TrayLocationSerializer
+    queryset = TrayLocation.objects.select_related(
+        'tray', 'hospital'
+    ).order_by('tray__code')
+    lookup_field = 'tray'
+    pagination_class = TrayPagination
+    replica_actions = ('list', 'retrieve')
+
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthorized]
+
+    @extend_schema(parameters=[serializers.LocationQuerySerializer])
+    def list(self, request, *args, **kwargs):
+        """List tray locations, optionally only those at one hospital."""
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        """Filter to ``?hospital=`` and ``?tray_type=`` when given"""
+        params = serializers.LocationQuerySerializer(
+            data=self.request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        return self.queryset.filter(**params.validated_data)
+
+
+class TrayTurnaroundViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """Turnaround analytics per tray type, for staff."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses=serializers.TrayTurnaroundSerializer(many=True))
+    def list(self, request):
+        """Return average days between uses, utilisation and idle trays.
+
+        Built from the stats the refresh_tray_analytics command keeps and
+        cached for the day, see event.analytics.
+        """
+        return Response(serializers.TrayTurnaroundSerializer(
+            tray_turnaround(), many=True
+        ).data)
+
+
+class BillingViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """Procedure and event totals and invoices, for staff.
+
+    Priced from the prices snapshotted on each usage, see event.billing.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    replica_actions = ('list', 'retrieve')
+
+    @extend_schema(
+        parameters=[serializers.BillingQuerySerializer],
+        responses=serializers.BilledEventSerializer(many=True),
+    )
+    def list(self, request):
+        """Return the totals of each event and its procedures.
+
+        Starts from the first of this month unless ``date_from`` is given.
+        """
+        params = serializers.BillingQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        params.validated_data.setdefault(
+            'date_from', timezone.localdate().replace(day=1)
+        )
+        totals = event_totals(billed_usages(**params.validated_data))
+        return Response(
+            serializers.BilledEventSerializer(totals, many=True).data
+        )
+
+    @extend_schema(
+        parameters=[OpenApiParameter(
+            'id', OpenApiTypes.INT, OpenApiParameter.PATH,
+            description='The event to invoice.',
+        )],
+        responses=serializers.InvoiceSerializer,
+    )
+    def retrieve(self, request, pk=None):
+        """Return the invoice of an event, line by line."""
+        event = get_object_or_404(
+            Event.objects.select_related('hospital'), pk=pk
+        )
+        return Response(
+            serializers.InvoiceSerializer(event_invoice(event)).data
+        )
+
+
+class UsageReportViewSet(ReplicaReadMixin, viewsets.ViewSet):
+    """Usage totals per month, hospital, doctor and product, for staff.
+
+    Reads only the UsageRollup rows, see event.rollups.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = ReportPagination
+
+    @extend_schema(
+        parameters=[serializers.UsageReportQuerySerializer],
+        responses=serializers.UsageReportSerializer(many=True),
+    )
+    def list(self, request):
+        """Total usage by the ``group_by`` fields, by month by default.
+
+        ``?group_by=doctor&group_by=month&item_type=Screw`` gives the
+        screws used per doctor per month.
+        """
+        params = serializers.UsageReportQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        rows = usage_report(**params.validated_data)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        serializer = serializers.UsageReportSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class LowStockViewSet(ReplicaReadMixin, viewsets.GenericViewSet,
+                      mixins.ListModelMixin):
+    """Products to reorder, for staff.
+
+    Compares warehouse stock with the reorder points stored by the
+    forecasting job, see event.forecasting.
+    """
+    serializer_class = serializers.LowStockSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = ReportPagination
+
+    def get_queryset(self):
+        """Largest shortfall first"""
+        return low_stock()
@@ -10,6 +10,12 @@ from django.utils.translation import gettext as _
 from rest_framework import serializers
 # from rest_framework.authtoken.models import Token
 
+from core.bulk import bulk_import_users
+
+
+# Rows accepted per API import, larger lists go through import_users
+MAX_IMPORT_ROWS = 500
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Handling serialization and deserialization of user data."""
@@ -111,3 +117,38 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    """Serializer for a single row of a bulk user import."""
+    email = serializers.EmailField()
+    password = serializers.CharField(min_length=5, write_only=True)
+    firstname = serializers.CharField(required=False, allow_blank=True)
+    surname = serializers.CharField(required=False, allow_blank=True)
+    phone_number = serializers.CharField(required=False, allow_blank=True)
+    is_staff = serializers.BooleanField(required=False, default=False)
+    practice_number = serializers.IntegerField(required=False)
+    comments = serializers.CharField(required=False, allow_blank=True)
+    is_verified = serializers.BooleanField(required=False, default=False)
+
+
+class BulkUserImportSerializer(serializers.Serializer):
+    """Serializer for importing a whole staff list in one request."""
+    users = BulkUserRowSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=MAX_IMPORT_ROWS,
+        error_messages={'max_length': _(
+            'Import at most {max_length} users per request, use the '
+            'import_users command for longer lists.'
+        )},
+    )
+
+    def create(self, validated_data):
+        """Import the users and return the import statistics."""
+        try:
+            # Request sized lists are hashed in this worker, a process
+            # pool is left to the import_users command
+            return bulk_import_users(validated_data['users'], processes=1)
+        except ValueError as exc:
+            raise serializers.ValidationError({'users': [str(exc)]})
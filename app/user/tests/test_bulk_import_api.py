@@ -0,0 +1,170 @@
+"""
+Tests for the bulk user import API
+"""
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core.bulk import hash_passwords
+from core.models import Doctor
+from user.serializers import MAX_IMPORT_ROWS
+
+
+BULK_IMPORT_URL = reverse('user:bulk-import')
+
+
+class BulkUserImportApiTests(TestCase):
+    """Test importing staff lists through the API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.staff_user = get_user_model().objects.create_user(
+            email='staff@example.com',
+            password='testpass123',
+            is_staff=True,
+        )
+        self.client.force_authenticate(user=self.staff_user)
+
+    def test_bulk_import_creates_users_and_doctors(self):
+        """Test importing users creates users and doctor profiles."""
+        payload = {'users': [
+            {
+                'email': 'nurse@EXAMPLE.com',
+                'password': 'nursepass123',
+                'firstname': 'Nora',
+                'surname': 'Nurse',
+            },
+            {
+                'email': 'doctor@example.com',
+                'password': 'doctorpass123',
+                'firstname': 'Derek',
+                'surname': 'Doctor',
+                'practice_number': 4455,
+                'is_verified': True,
+            },
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['users'], 2)
+        self.assertEqual(res.data['doctors'], 1)
+        self.assertIn('users_per_second', res.data)
+
+        nurse = get_user_model().objects.get(email='nurse@example.com')
+        self.assertTrue(nurse.check_password('nursepass123'))
+        doctor = Doctor.objects.get(practice_number=4455)
+        self.assertEqual(doctor.user.email, 'doctor@example.com')
+        self.assertTrue(doctor.is_verified)
+        self.assertTrue(doctor.user.check_password('doctorpass123'))
+
+    def test_bulk_import_existing_email_error(self):
+        """Test importing an already registered email imports nothing."""
+        payload = {'users': [
+            {'email': 'new@example.com', 'password': 'testpass123'},
+            {'email': 'staff@example.com', 'password': 'testpass123'},
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(
+            get_user_model().objects.filter(email='new@example.com').exists()
+        )
+
+    def test_bulk_import_duplicate_email_error(self):
+        """Test a staff list repeating an email is rejected."""
+        payload = {'users': [
+            {'email': 'twin@example.com', 'password': 'testpass123'},
+            {'email': 'twin@example.com', 'password': 'testpass456'},
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_import_duplicate_practice_number_error(self):
+        """Test a practice number repeated in the list is a 400."""
+        payload = {'users': [
+            {
+                'email': f'doctor{n}@example.com', 'password': 'testpass123',
+                'firstname': 'Derek', 'surname': 'Doctor',
+                'practice_number': 4455,
+            }
+            for n in range(2)
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('4455 (rows 1, 2)', res.data['users'][0])
+        self.assertFalse(Doctor.objects.exists())
+
+    def test_bulk_import_existing_practice_number_error(self):
+        """Test a practice number already registered is a 400."""
+        Doctor.objects.create(
+            user=get_user_model().objects.create_user(
+                email='old@example.com', password='testpass123',
+                firstname='Olive', surname='Doctor',
+            ),
+            practice_number=4455,
+        )
+        payload = {'users': [
+            {'email': 'new@example.com', 'password': 'testpass123'},
+            {
+                'email': 'doctor@example.com', 'password': 'testpass123',
+                'firstname': 'Derek', 'surname': 'Doctor',
+                'practice_number': 4455,
+            },
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('4455 (row 2)', res.data['users'][0])
+        self.assertFalse(
+            get_user_model().objects.filter(email='new@example.com').exists()
+        )
+
+    def test_bulk_import_row_limit(self):
+        """Test longer lists are refused and pointed at the command."""
+        payload = {'users': [
+            {'email': f'user{i}@example.com', 'password': 'testpass123'}
+            for i in range(MAX_IMPORT_ROWS + 1)
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('import_users', str(res.data['users']))
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_bulk_import_requires_staff(self):
+        """Test non staff users cannot import users."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.client.force_authenticate(user=user)
+        payload = {'users': [
+            {'email': 'new@example.com', 'password': 'testpass123'},
+        ]}
+
+        res = self.client.post(BULK_IMPORT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_hash_passwords_process_pool(self):
+        """Test passwords hashed across a pool keep their order."""
+        passwords = ['first-pass', 'second-pass', 'third-pass']
+        user = get_user_model()(email='hash@example.com')
+
+        hashes = hash_passwords(passwords, processes=2)
+
+        self.assertEqual(len(hashes), len(passwords))
+        for password, encoded in zip(passwords, hashes):
+            user.password = encoded
+            self.assertTrue(user.check_password(password))
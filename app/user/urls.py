@@ -7,5 +7,12 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
-    path('upload-image/', views.UserImageUploadView.as_view(), name='upload-image')
+    path(
+        'upload-image/', views.UserImageUploadView.as_view(),
+        name='upload-image',
+    ),
+    path(
+        'bulk-import/', views.BulkUserImportView.as_view(),
+        name='bulk-import',
+    ),
 ]
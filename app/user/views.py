@@ -1,12 +1,18 @@
 """
 Views for the user API
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.parsers import MultiPartParser, FormParser
 
-from .serializers import UserSerializer, AuthTokenSerializer, UserImageSerializer
+from .serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    UserImageSerializer,
+    BulkUserImportSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -40,3 +46,18 @@ class UserImageUploadView(generics.UpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+
+class BulkUserImportView(generics.GenericAPIView):
+    """Import a staff list of users for staff members."""
+    serializer_class = BulkUserImportSerializer
+    authentication_classes = [authentication.TokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        """Create the users in bulk and report the import throughput."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = serializer.save()
+
+        return Response(result, status=status.HTTP_201_CREATED)